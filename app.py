@@ -1,21 +1,48 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, abort, session, stream_with_context
 from dotenv import load_dotenv
+import atexit
 import os
 import time
 import google.generativeai as genai
 import json
 
+from backend.streaming import SSE_HEADERS, StreamTimer, format_sse
+from backend.quiz_bank import QuizBank, extract_json, normalize_track
+from backend.academy_progress import AcademyProgress, TrackProgress
+from backend.response_cache import ResponseCache, is_cacheable, persona_version
+from backend.singleflight import SingleFlight
+from backend.ledger import CATEGORIES, ExpenseLedger, LedgerBusy
+from backend.importer import ExpenseImporter, RuleEngine, save_upload
+from backend.calculator import CalculatorError, answer_question, calculate
+from backend.spending import SpendingAggregates, parse_date
+from backend.leaderboard import Leaderboard
+from backend.assets import AssetBundle
+from backend.upstream import CircuitBreaker, CircuitOpen, RetryBudget, Upstream
+from backend.metrics import (CALCULATOR_ANSWERS, CONTENT_TYPE, MOCK_FALLBACKS, REGISTRY, SlowRequestSampler, cache_collector,
+                             instrument_flask, record_usage, track_llm)
+
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev_key')
 
+# Request metrics for /metrics; SLOW_REQUEST_MS=500 also samples the stacks of slow requests.
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 0))
+slow_requests = SlowRequestSampler(
+    threshold=SLOW_REQUEST_MS / 1000, keep=int(os.getenv('SLOW_REQUEST_KEEP', 20))
+).start() if SLOW_REQUEST_MS > 0 else None
+instrument_flask(app, slow_requests)
+
 
 # Configure Gemini
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL')  # e.g. the fake server used by benchmarks/loadtest.py
 if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+    if GEMINI_BASE_URL:
+        genai.configure(api_key=GEMINI_API_KEY, transport='rest', client_options={'api_endpoint': GEMINI_BASE_URL})
+    else:
+        genai.configure(api_key=GEMINI_API_KEY)
 
 # --- API Endpoints ---
 
@@ -31,107 +58,597 @@ def get_firebase_config():
         'appId': os.getenv('FIREBASE_APP_ID')
     })
 
+COACH_MODEL = 'gemini-pro'
+COACH_PROMPT = "You are a helpful financial coach named FinSenseAI. Mode: {mode}. User says: {user_msg}. Keep it short and helpful."
+COACH_PERSONA_VERSION = persona_version(COACH_PROMPT, COACH_MODEL)
+
+# Coach answers are stateless, so identical questions share one cached answer.
+response_cache = ResponseCache(
+    os.getenv('RESPONSE_CACHE_PATH', os.path.join('data', 'response_cache.sqlite3')),
+    max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 5000)),
+    ttl_seconds=int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 24 * 3600)),
+)
+coach_flight = SingleFlight(default_timeout=float(os.getenv('COALESCE_TIMEOUT_SECONDS', 60)))
+
+# Deadlines, budgeted retries and a circuit breaker around every Gemini call;
+# while the circuit is open the coach and quiz go straight to their mock content.
+gemini = Upstream(
+    'gemini',
+    attempt_timeout=float(os.getenv('GEMINI_ATTEMPT_TIMEOUT_SECONDS', 30)),
+    deadline=float(os.getenv('GEMINI_DEADLINE_SECONDS', 60)),
+    max_attempts=int(os.getenv('GEMINI_MAX_ATTEMPTS', 2)),
+    hedge_after=float(os.getenv('GEMINI_HEDGE_AFTER_SECONDS', 0)),
+    retry_budget=RetryBudget(ratio=float(os.getenv('GEMINI_RETRY_BUDGET_RATIO', 0.1))),
+    breaker=CircuitBreaker('gemini', failure_threshold=int(os.getenv('GEMINI_BREAKER_FAILURES', 5)),
+                           reset_timeout=float(os.getenv('GEMINI_BREAKER_RESET_SECONDS', 30))),
+)
+REGISTRY.add_collector(gemini.collect)
+
+
+def gemini_request_options():
+    # The SDK's own timeout ends calls the wrapper has stopped waiting for
+    return {'timeout': gemini.attempt_timeout}
+
+
+def build_coach_prompt(user_msg, mode):
+    return COACH_PROMPT.format(mode=mode, user_msg=user_msg)
+
+
+def mock_coach_response(user_msg, mode):
+    if mode == 'explain':
+        return "I see you're asking about a specific concept. Let me break it down: [Explanation Placeholder]"
+    elif "budget" in user_msg.lower():
+        return "Budgeting is key! Try the 50/30/20 rule: 50% Needs, 30% Wants, 20% Savings."
+    return f"That's interesting! You said: '{user_msg}'. As your AI coach, I recommend checking your spending snapshot."
+
+
+def generate_coach_answer(user_msg, mode, cache_key=None):
+    model = genai.GenerativeModel(COACH_MODEL)
+    prompt = build_coach_prompt(user_msg, mode)
+    with track_llm(COACH_MODEL, 'coach'):
+        result = gemini.call(lambda: model.generate_content(prompt, request_options=gemini_request_options()))
+    record_usage(COACH_MODEL, result)
+    response = result.text
+    if cache_key:
+        response_cache.set(cache_key, response)
+    return response
+
+
 @app.route('/api/coach/chat', methods=['POST'])
 def chat_with_coach():
     """Mock LLM Chat Endpoint (or Real if Key exists)."""
     data = request.json
     user_msg = data.get('message', '')
     mode = data.get('mode', 'quick')
-    
+
+    # "How much will ₹5000/month become in 20 years?" is answered exactly, without the model
+    calculated = answer_question(user_msg)
+    if calculated is not None:
+        CALCULATOR_ANSWERS.labels('coach_chat').inc()
+        return jsonify({'response': calculated, 'calculated': True})
+
     if GEMINI_API_KEY:
+        flight_key = response_cache.make_key(user_msg, mode, COACH_PERSONA_VERSION)
+        cache_key = flight_key if is_cacheable(mode) else None
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return jsonify({'response': cached, 'cached': True})
         try:
-            model = genai.GenerativeModel('gemini-pro')
-            prompt = f"You are a helpful financial coach named FinSenseAI. Mode: {mode}. User says: {user_msg}. Keep it short and helpful."
-            response = model.generate_content(prompt).text
+            # Identical questions already on their way to Gemini share that one call
+            response = coach_flight.do(flight_key, lambda: generate_coach_answer(user_msg, mode, cache_key))
             return jsonify({'response': response})
+        except CircuitOpen:
+            # Gemini is failing; answer from the mock right away
+            MOCK_FALLBACKS.labels('coach_chat', 'circuit_open').inc()
+            return jsonify({'response': mock_coach_response(user_msg, mode), 'fallback': True})
         except Exception as e:
             print(f"Gemini Error: {e}")
-            # Fallback to mock
-            pass
+            # Fallback to mock (the failed call already took its time)
+            MOCK_FALLBACKS.labels('coach_chat', 'upstream_error').inc()
+            return jsonify({'response': mock_coach_response(user_msg, mode), 'fallback': True})
 
     # Mock Responses
+    MOCK_FALLBACKS.labels('coach_chat', 'no_api_key').inc()
     time.sleep(1)
-    if mode == 'explain':
-        response = "I see you're asking about a specific concept. Let me break it down: [Explanation Placeholder]"
-    elif "budget" in user_msg.lower():
-        response = "Budgeting is key! Try the 50/30/20 rule: 50% Needs, 30% Wants, 20% Savings."
-    else:
-        response = f"That's interesting! You said: '{user_msg}'. As your AI coach, I recommend checking your spending snapshot."
-        
-    return jsonify({'response': response})
+    return jsonify({'response': mock_coach_response(user_msg, mode)})
 
-@app.route('/api/academy/quiz', methods=['GET'])
-def get_quiz():
-    """Dynamic Quiz Generation using Gemini."""
-    track = request.args.get('track', 'general')
-    
-    if GEMINI_API_KEY:
-        try:
-            model = genai.GenerativeModel('gemini-pro')
-            prompt = f"""
-            Generate 5 multiple-choice questions about '{track}' in finance.
-            Return ONLY valid JSON in this format:
+@app.route('/api/coach/chat/stream', methods=['POST'])
+def chat_with_coach_stream():
+    """Streams the coach's answer as Server-Sent Events, chunk by chunk."""
+    data = request.json
+    user_msg = data.get('message', '')
+    mode = data.get('mode', 'quick')
+
+    def generate():
+        timer = StreamTimer()
+        calculated = answer_question(user_msg)
+        if calculated is not None:
+            CALCULATOR_ANSWERS.labels('coach_chat_stream').inc()
+            timer.mark_chunk()
+            yield format_sse({'delta': calculated})
+            yield format_sse(dict(timer.summary(), calculated=True), event='done')
+            return
+
+        fallback_reason = 'no_api_key'
+        if GEMINI_API_KEY:
+            flight_key = response_cache.make_key(user_msg, mode, COACH_PERSONA_VERSION)
+            cache_key = flight_key if is_cacheable(mode) else None
+            cached = response_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                timer.mark_chunk()
+                yield format_sse({'delta': cached})
+                yield format_sse(dict(timer.summary(), cached=True), event='done')
+                return
+
+            call, leader = coach_flight.begin(flight_key)
+            if not leader:
+                # Someone is already streaming this exact question; reuse their answer
+                try:
+                    answer = coach_flight.wait(call)
+                    timer.mark_chunk()
+                    yield format_sse({'delta': answer})
+                    yield format_sse(dict(timer.summary(), coalesced=True), event='done')
+                    return
+                except Exception as e:
+                    fallback_reason = 'circuit_open' if isinstance(e, CircuitOpen) else 'upstream_error'
+                    print(f"Gemini Stream Error: {e}")
+            else:
+                parts = []
+                outcome = {}
+                try:
+                    # A stream can't be retried once it starts, so only the breaker applies
+                    gemini.admit()
+                    model = genai.GenerativeModel(COACH_MODEL)
+                    chunk = None
+                    with track_llm(COACH_MODEL, 'coach_stream'):
+                        for chunk in model.generate_content(build_coach_prompt(user_msg, mode), stream=True,
+                                                            request_options=gemini_request_options()):
+                            if not chunk.text:
+                                continue
+                            timer.mark_chunk()
+                            parts.append(chunk.text)
+                            yield format_sse({'delta': chunk.text})
+                    gemini.record_success()
+                    # Usage metadata is cumulative; the last chunk carries the totals
+                    record_usage(COACH_MODEL, chunk)
+                    outcome['result'] = ''.join(parts)
+                    if cache_key:
+                        response_cache.set(cache_key, outcome['result'])
+                    yield format_sse(timer.summary(), event='done')
+                    return
+                except Exception as e:
+                    outcome['error'] = e
+                    if isinstance(e, CircuitOpen):
+                        fallback_reason = 'circuit_open'
+                    else:
+                        fallback_reason = 'upstream_error'
+                        gemini.record_failure(e)
+                    print(f"Gemini Stream Error: {e}")
+                    # Fall back to mock, unless part of the answer already went out
+                    if timer.chunks:
+                        yield format_sse({'detail': 'The coach was interrupted. Please try again.'}, event='error')
+                        return
+                finally:
+                    # Also runs if the client disconnects mid-stream, so followers never hang
+                    if 'result' not in outcome and 'error' not in outcome:
+                        outcome['error'] = RuntimeError('Coach stream aborted')
+                    coach_flight.finish(flight_key, call, **outcome)
+
+        # Mock responses are streamed word by word so the UI path is the same
+        MOCK_FALLBACKS.labels('coach_chat_stream', fallback_reason).inc()
+        for word in mock_coach_response(user_msg, mode).split(' '):
+            time.sleep(0.05)
+            timer.mark_chunk()
+            yield format_sse({'delta': word + ' '})
+        yield format_sse(timer.summary(), event='done')
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+@app.route('/api/calculator/<kind>', methods=['POST'])
+def run_calculator(kind):
+    """
+    SIP, lump sum, EMI, PPF and NPS projections. Send {"scenarios": [...]}
+    for a batch (one vectorized pass) or a single scenario object.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Send a JSON object'}), 400
+    scenarios = data['scenarios'] if 'scenarios' in data else [data]
+    try:
+        results = calculate(kind, scenarios)
+    except CalculatorError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'kind': kind, 'count': len(results), 'results': results})
+
+# Fallback Mock Questions
+FALLBACK_QUESTIONS = [
+    {
+        "id": 1,
+        "question": "What is the 50/30/20 rule of budgeting?",
+        "options": ["50% Needs, 30% Wants, 20% Savings", "50% Savings, 30% Needs, 20% Wants", "50% Wants, 30% Savings, 20% Needs", "None of the above"],
+        "correct": 0
+    },
+    {
+        "id": 2,
+        "question": "Which factor has the highest impact on your credit score?",
+        "options": ["Credit Mix", "New Credit", "Payment History", "Length of Credit History"],
+        "correct": 2
+    },
+    {
+        "id": 3,
+        "question": "What is a 'Bear Market'?",
+        "options": ["A market where prices are rising", "A market where prices are falling", "A market for trading animals", "A stable market"],
+        "correct": 1
+    },
+    {
+        "id": 4,
+        "question": "What does ROI stand for?",
+        "options": ["Rate of Inflation", "Return on Investment", "Risk of Investment", "Real Owner Interest"],
+        "correct": 1
+    },
+    {
+        "id": 5,
+        "question": "Which account typically offers the highest interest rate?",
+        "options": ["Checking Account", "Savings Account", "Certificate of Deposit (CD)", "Under the mattress"],
+        "correct": 2
+    }
+]
+
+
+QUIZ_MODEL = 'gemini-pro'
+
+
+def generate_quiz_questions(track, count):
+    """Asks Gemini for `count` raw questions; the quiz bank validates them."""
+    model = genai.GenerativeModel(QUIZ_MODEL)
+    prompt = f"""
+    Generate {count} multiple-choice questions about '{track}' in finance.
+    Return ONLY valid JSON in this format:
+    {{
+        "questions": [
             {{
-                "questions": [
-                    {{
-                        "id": 1,
-                        "question": "Question text",
-                        "options": ["Option A", "Option B", "Option C", "Option D"],
-                        "correct": 0
-                    }}
-                ]
+                "id": 1,
+                "question": "Question text",
+                "options": ["Option A", "Option B", "Option C", "Option D"],
+                "correct": 0
             }}
-            The 'correct' field should be the index (0-3) of the correct option.
-            """
-            response = model.generate_content(prompt).text
-            # Clean up markdown code blocks if present
-            cleaned_response = response.replace('json', '').replace('', '').strip()
-            return jsonify(json.loads(cleaned_response))
-        except Exception as e:
-            print(f"Gemini Quiz Error: {e}")
-            # Fallback to mock
-            pass
-
-    # Fallback Mock Questions
-    questions = [
-        {
-            "id": 1,
-            "question": "What is the 50/30/20 rule of budgeting?",
-            "options": ["50% Needs, 30% Wants, 20% Savings", "50% Savings, 30% Needs, 20% Wants", "50% Wants, 30% Savings, 20% Needs", "None of the above"],
-            "correct": 0
-        },
-        {
-            "id": 2,
-            "question": "Which factor has the highest impact on your credit score?",
-            "options": ["Credit Mix", "New Credit", "Payment History", "Length of Credit History"],
-            "correct": 2
-        },
-        {
-            "id": 3,
-            "question": "What is a 'Bear Market'?",
-            "options": ["A market where prices are rising", "A market where prices are falling", "A market for trading animals", "A stable market"],
-            "correct": 1
-        },
-        {
-            "id": 4,
-            "question": "What does ROI stand for?",
-            "options": ["Rate of Inflation", "Return on Investment", "Risk of Investment", "Real Owner Interest"],
-            "correct": 1
-        },
-        {
-            "id": 5,
-            "question": "Which account typically offers the highest interest rate?",
-            "options": ["Checking Account", "Savings Account", "Certificate of Deposit (CD)", "Under the mattress"],
-            "correct": 2
-        }
-    ]
-    return jsonify({'questions': questions})
+        ]
+    }}
+    The 'correct' field should be the index (0-3) of the correct option.
+    """
+    with track_llm(QUIZ_MODEL, 'quiz'):
+        result = gemini.call(lambda: model.generate_content(prompt, request_options=gemini_request_options()))
+    record_usage(QUIZ_MODEL, result)
+    response = result.text
+    return extract_json(response).get('questions', [])
+
+
+# Questions are generated ahead of time and served from memory; the bank
+# refills a track in the background when it runs low.
+quiz_bank = QuizBank(
+    generator=generate_quiz_questions if GEMINI_API_KEY else None,
+    path=os.getenv('QUIZ_BANK_PATH', os.path.join('data', 'quiz_bank.json')),
+)
+quiz_bank.start()
+
+# Seen/correct question bitsets per user and track; answers are graded here, not in the browser.
+academy_progress = AcademyProgress(
+    os.getenv('ACADEMY_PROGRESS_PATH', os.path.join('data', 'academy.sqlite3')),
+    xp_per_correct=int(os.getenv('ACADEMY_XP_PER_CORRECT', 10)),
+)
+atexit.register(academy_progress.close)
+# Progress for FALLBACK_QUESTIONS is kept under its own key (their IDs aren't the bank's); normalize_track()
+# strips underscores, so no bank track can ever be named this.
+FALLBACK_TRACK = '__fallback__'
+MAX_QUIZ_ANSWERS = 50
+# Guests have no progress row, so the IDs of the last quiz served per track are kept in their
+# (signed) session cookie; only those are graded, so the answer key can't be scraped by ID.
+MAX_GUEST_QUIZ_TRACKS = 5
+
+def remember_guest_quiz(track, questions):
+    issued = {t: ids for t, ids in session.get('guest_quiz', {}).items() if t != track}
+    issued[track] = [q['id'] for q in questions]
+    session['guest_quiz'] = dict(list(issued.items())[-MAX_GUEST_QUIZ_TRACKS:])
+
+def quiz_user_id():
+    """The user whose academy progress is recorded, or None for guests (nothing is recorded)."""
+    user_id = current_user_id()
+    return None if user_id == 'guest' else user_id
+
+def public_question(question):
+    return {key: question[key] for key in ('id', 'question', 'options')}
+
+@app.route('/api/academy/quiz', methods=['GET'])
+def get_quiz():
+    """Serves a quiz from the pre-generated question bank, questions the user hasn't seen first."""
+    track = normalize_track(request.args.get('track', 'general'))
+    user_id = quiz_user_id()
+    progress = academy_progress.get(user_id, track) if user_id else TrackProgress()
+
+    first_live_id = quiz_bank.first_live_id(track)  # before serving, so it is <= every ID served below
+    questions = quiz_bank.get_quiz(track, seen=progress.seen, correct=progress.correct, base=progress.base)
+    if not questions:
+        # Bank still warming up for this track (refill already requested)
+        MOCK_FALLBACKS.labels('academy_quiz', 'warming_up').inc()
+        track, questions, first_live_id = FALLBACK_TRACK, [public_question(q) for q in FALLBACK_QUESTIONS], 0
+    if user_id:
+        progress = academy_progress.mark_seen(user_id, track, (q['id'] for q in questions), first_live_id)
+    else:
+        remember_guest_quiz(track, questions)
+    return jsonify({'track': track, 'questions': questions,
+                    'progress': progress.summary() if user_id else None})
+
+@app.route('/api/academy/submit', methods=['POST'])
+def submit_quiz():
+    """
+    Grades a whole quiz: {"track": "budgeting", "answers": [{"id": 12, "choice": 2}, ...]}.
+    XP is added to the leaderboard for questions answered correctly for the first time.
+    """
+    data = request.get_json(silent=True) or {}
+    answers = data.get('answers')
+    if not isinstance(answers, list) or not 0 < len(answers) <= MAX_QUIZ_ANSWERS:
+        return jsonify({'error': f'answers must be a list of 1 to {MAX_QUIZ_ANSWERS} items'}), 400
+    choices = {}
+    for answer in answers:
+        question_id, choice = (answer.get('id'), answer.get('choice')) if isinstance(answer, dict) else (None, None)
+        valid = all(isinstance(v, int) and not isinstance(v, bool) for v in (question_id, choice))
+        if not valid or not 0 <= choice <= 3:
+            return jsonify({'error': 'each answer needs an integer "id" and a "choice" from 0 to 3'}), 400
+        choices[question_id] = choice
+
+    if data.get('track') == FALLBACK_TRACK:
+        track, first_live_id = FALLBACK_TRACK, 0
+        answer_key = {q['id']: q['correct'] for q in FALLBACK_QUESTIONS}
+    else:
+        track = normalize_track(data.get('track', 'general'))
+        first_live_id = quiz_bank.first_live_id(track)
+        answer_key = quiz_bank.answer_key(track, choices)
+
+    user_id = quiz_user_id()
+    if user_id is None:
+        # Guests see how they did on the quiz they were served, but nothing is recorded and no XP is earned.
+        issued = set(session.get('guest_quiz', {}).get(track, ()))
+        results = [{'id': qid, 'status': 'unknown'} if qid not in answer_key else
+                   {'id': qid, 'status': 'not_served'} if qid not in issued else
+                   {'id': qid, 'status': 'graded', 'correct': choice == answer_key[qid], 'answer': answer_key[qid],
+                    'xp': 0}
+                   for qid, choice in choices.items()]
+        graded = [r for r in results if r['status'] == 'graded']
+        return jsonify({'track': track, 'results': results, 'score': sum(r['correct'] for r in graded),
+                        'graded': len(graded), 'xp_awarded': 0, 'progress': None, 'leaderboard': None})
+
+    result = academy_progress.grade(user_id, track, choices, answer_key, first_live_id)
+    entry = None
+    if result['xp_awarded']:
+        entry = leaderboard.add_xp(user_id, result['xp_awarded'], name=str(data.get('name') or '')[:40])
+    return jsonify({'track': track, **result, 'leaderboard': entry})
+
+@app.route('/api/academy/progress')
+def get_academy_progress():
+    """Questions seen and answered correctly, and XP earned, per track for the current user."""
+    user_id = quiz_user_id()
+    tracks = academy_progress.tracks(user_id) if user_id else {}
+    available = {**quiz_bank.stats()['tracks'], FALLBACK_TRACK: len(FALLBACK_QUESTIONS)}
+    return jsonify({'tracks': {track: {**progress.summary(), 'available': available.get(track, 0)}
+                               for track, progress in tracks.items()}})
+
+# --- Expenses ---
+
+# Expenses are queued and group-committed to SQLite by the ledger's writer thread.
+ledger = ExpenseLedger(
+    os.getenv('LEDGER_DB_PATH', os.path.join('data', 'finsense.sqlite3')),
+    batch_size=int(os.getenv('LEDGER_BATCH_SIZE', 500)),
+    flush_interval=int(os.getenv('LEDGER_FLUSH_INTERVAL_MS', 50)) / 1000,
+    max_queue=int(os.getenv('LEDGER_MAX_QUEUE', 100_000)),
+)
+atexit.register(ledger.close)
+MAX_BULK_EXPENSES = 5000
+spending = SpendingAggregates(utc_offset_minutes=int(os.getenv('SPENDING_UTC_OFFSET_MINUTES', 330)))
+spending.attach(ledger)
+
+# CSV / bank statement uploads are imported by a background thread in batches.
+importer = ExpenseImporter(
+    ledger,
+    rules=RuleEngine.from_file(os.getenv('IMPORT_RULES_PATH')),
+    batch_size=int(os.getenv('IMPORT_BATCH_SIZE', 1000)),
+    utc_offset_minutes=int(os.getenv('SPENDING_UTC_OFFSET_MINUTES', 330)),
+    day_first=os.getenv('IMPORT_DAY_FIRST', '1') != '0',
+)
+atexit.register(importer.close)  # runs before ledger.close (atexit is LIFO)
+IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_MB', 50)) * 1024 * 1024
+
+def current_user_id():
+    return request.headers.get('X-User-ID') or request.values.get('user_id') or 'guest'
+
+@app.route('/log_expense', methods=['GET', 'POST'])
+def log_expense():
+    """Form for logging one expense (templates/log_expense.html)."""
+    if request.method == 'GET':
+        return render_template('log_expense.html', user_id=request.args.get('user_id', ''))
+    try:
+        ledger.log(current_user_id(), request.form.get('amount'), request.form.get('category'),
+                   request.form.get('note'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LedgerBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    return redirect(url_for('dashboard'))
+
+@app.route('/dashboard')
+def dashboard():
+    """The dashboard is a screen of the SPA."""
+    return redirect(url_for('index'))
+
+@app.route('/api/expenses', methods=['GET', 'POST'])
+def expenses():
+    """GET: the user's recent expenses. POST: queue one expense (202)."""
+    if request.method == 'GET':
+        limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+        return jsonify({'expenses': ledger.recent(current_user_id(), limit=limit), 'categories': CATEGORIES})
+    data = request.get_json(silent=True) or {}
+    try:
+        expense = ledger.log(current_user_id(), data.get('amount'), data.get('category'),
+                             data.get('note'), data.get('timestamp'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LedgerBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    return jsonify({'status': 'queued', 'expense': expense}), 202
+
+@app.route('/api/expenses/bulk', methods=['POST'])
+def expenses_bulk():
+    """Queues a list of expenses in one request: {"expenses": [{amount, category, note?, timestamp?}]}."""
+    items = (request.get_json(silent=True) or {}).get('expenses')
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return jsonify({'error': 'expenses must be a list of objects'}), 400
+    if len(items) > MAX_BULK_EXPENSES:
+        return jsonify({'error': f'At most {MAX_BULK_EXPENSES} expenses per request.'}), 413
+    try:
+        queued = ledger.log_many(current_user_id(), items)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LedgerBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    return jsonify({'status': 'queued', 'count': len(queued), 'ids': [e['id'] for e in queued]}), 202
+
+@app.route('/api/expenses/import', methods=['POST'])
+def import_expenses():
+    """
+    Starts importing a CSV export or bank statement: a multipart "file" field
+    or a raw text/csv body. Returns 202 with the job; poll its Location.
+    """
+    if request.content_length and request.content_length > IMPORT_MAX_BYTES:
+        return jsonify({'error': f'File is larger than {IMPORT_MAX_BYTES // (1024 * 1024)} MB.'}), 413
+    upload = request.files.get('file')
+    if upload is None and request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        return jsonify({'error': 'Attach the CSV file as "file".'}), 400
+    try:
+        path, size = save_upload(upload.stream if upload is not None else request.stream, IMPORT_MAX_BYTES)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 413
+    if size == 0:
+        os.remove(path)
+        return jsonify({'error': 'The file is empty.'}), 400
+    filename = (upload.filename if upload is not None else None) or 'upload.csv'
+    job = importer.submit(current_user_id(), path, filename)
+    return jsonify(job.to_dict()), 202, {'Location': url_for('import_status', job_id=job.id)}
+
+@app.route('/api/expenses/import/<job_id>')
+def import_status(job_id):
+    """Progress and result of an import started by the current user."""
+    job = importer.get(job_id, current_user_id())
+    if job is None:
+        return jsonify({'error': 'Import not found.'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/spending/snapshot')
+def spending_snapshot():
+    """Category totals, 50/30/20 ratios and daily/weekly/monthly rollups (?start=&end=YYYY-MM-DD)."""
+    try:
+        return jsonify(spending.snapshot(current_user_id(), parse_date(request.args.get('start')),
+                                         parse_date(request.args.get('end'))))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+# --- Leaderboard ---
+
+# XP ranking kept in memory (skip list) and snapshotted to disk every few seconds.
+leaderboard = Leaderboard(
+    path=os.getenv('LEADERBOARD_PATH', os.path.join('data', 'leaderboard.json')),
+    snapshot_interval=float(os.getenv('LEADERBOARD_SNAPSHOT_SECONDS', 30)),
+)
+leaderboard.start()
+atexit.register(leaderboard.stop)
+# XP is only awarded by the server (graded academy quizzes); there is no client-facing XP endpoint.
+MAX_LEADERBOARD_PAGE = 100
+
+@app.route('/api/leaderboard/top')
+def leaderboard_top():
+    k = max(1, min(request.args.get('k', 10, type=int), MAX_LEADERBOARD_PAGE))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    return jsonify({'entries': leaderboard.top(k, offset), 'total': len(leaderboard)})
+
+@app.route('/api/leaderboard/rank')
+def leaderboard_rank():
+    entry = leaderboard.rank(current_user_id())
+    if entry is None:
+        return jsonify({'error': 'No XP recorded for this user yet.'}), 404
+    return jsonify({**entry, 'total': len(leaderboard)})
+
+@app.route('/api/leaderboard/around')
+def leaderboard_around():
+    """The current user and their neighbours in the ranking."""
+    radius = max(0, min(request.args.get('radius', 5, type=int), MAX_LEADERBOARD_PAGE // 2))
+    return jsonify({'entries': leaderboard.around(current_user_id(), radius), 'total': len(leaderboard)})
+
+@app.route('/api/health')
+def health_check():
+    """Reports cache and question-bank counters."""
+    return jsonify({
+        'status': 'ok',
+        'gemini': 'configured' if GEMINI_API_KEY else 'mock',
+        'response_cache': response_cache.stats(),
+        'coalescing': coach_flight.snapshot(),
+        'quiz_bank': quiz_bank.stats(),
+        'academy': academy_progress.stats(),
+        'ledger': ledger.stats(),
+        'imports': importer.stats(),
+        'spending': spending.stats(),
+        'leaderboard': leaderboard.stats(),
+        'upstream': gemini.stats(),
+        'assets': assets.stats(),
+    })
+
+REGISTRY.add_collector(cache_collector('coach_responses', response_cache.stats))
+REGISTRY.add_collector(cache_collector('quiz_bank', quiz_bank.stats, hits_key='served'))
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of request, Gemini, cache and fallback metrics."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/debug/slow-requests')
+def slow_request_samples():
+    """The slowest requests seen with their most frequent stacks (needs SLOW_REQUEST_MS)."""
+    if slow_requests is None:
+        return jsonify({'error': 'Set SLOW_REQUEST_MS to enable slow request sampling.'}), 404
+    return jsonify({'threshold_ms': SLOW_REQUEST_MS, 'requests': slow_requests.slowest()})
 
 @app.route('/api/mail/welcome', methods=['POST'])
 def send_welcome():
     """Mock Welcome Email."""
     return jsonify({'status': 'sent', 'message': 'Welcome email queued.'})
 
+# --- Static Asset Bundle ---
+
+# Built by `python -m backend.assets` into static/dist/; templates fall back to the source files without a build.
+assets = AssetBundle(app.static_folder, url_prefix='/dist/', static_url=app.static_url_path + '/')
+ASSET_MAX_AGE = int(os.getenv('ASSET_MAX_AGE_SECONDS', 365 * 24 * 3600))
+
+@app.context_processor
+def inject_assets():
+    return {'assets': assets}
+
+@app.route('/dist/<path:filename>')
+def bundled_asset(filename):
+    """Serves a fingerprinted bundle, precompressed when the client accepts it; cacheable forever."""
+    found = assets.lookup(filename, (encoding for encoding, quality in request.accept_encodings if quality > 0))
+    if found is None:
+        abort(404)
+    body, encoding, etag, mimetype = found
+    response = Response(body, mimetype=mimetype)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.set_etag(etag)
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        assets.not_modified += 1
+    return response
+
 # --- Main Route ---
 
 @app.route('/')
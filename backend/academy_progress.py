@@ -0,0 +1,239 @@
+# backend/academy_progress.py
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+
+# ==============================================================================
+# 1. BITSETS
+# ==============================================================================
+# A user's progress on a track is two bitsets over the track's question IDs
+# (QuizBank IDs are per-track counters and never reused): bit i of `seen` is
+# set once question `base + i` was served to the user, bit i of `correct`
+# once they answered it correctly. Python ints are the bitsets; SQLite stores
+# them as little-endian BLOBs, so 200 questions cost 25 bytes per set.
+#
+# IDs keep growing as the bank retires questions, so on every write the sets
+# are rebased to the bank's lowest live ID (QuizBank.first_live_id): bits of
+# questions that can no longer be served or graded are shifted out, and a
+# blob's size follows the range of live questions, not every question ever
+# generated.
+
+def bits_of(ids: Iterable[int], base: int = 0) -> int:
+    bits = 0
+    for question_id in ids:
+        if question_id >= base:
+            bits |= 1 << (question_id - base)
+    return bits
+
+
+def has_bit(bits: int, question_id: int, base: int = 0) -> bool:
+    return question_id >= base and (bits >> (question_id - base)) & 1 == 1
+
+
+def to_blob(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def from_blob(blob: Optional[bytes]) -> int:
+    return int.from_bytes(blob, "little") if blob else 0
+
+
+class TrackProgress(NamedTuple):
+    seen: int = 0
+    correct: int = 0
+    xp: int = 0
+    base: int = 0
+
+    def rebased(self, first_live_id: int) -> "TrackProgress":
+        """Drops the bits of question IDs below `first_live_id` (never moves the base down)."""
+        shift = first_live_id - self.base
+        if shift <= 0:
+            return self
+        return self._replace(seen=self.seen >> shift, correct=self.correct >> shift, base=first_live_id)
+
+    def summary(self) -> Dict[str, int]:
+        """Counts over the questions still live on the track, plus all XP ever earned on it."""
+        return {"seen": self.seen.bit_count(), "correct": self.correct.bit_count(), "xp": self.xp}
+
+
+# ==============================================================================
+# 2. PROGRESS STORE
+# ==============================================================================
+
+class AcademyProgress:
+    """
+    Which quiz questions each user has seen and answered correctly, per track.
+
+    One row per (user, track) in SQLite (WAL), holding the two bitsets and
+    the XP earned on the track. Updates are read-modify-write under SQLite's
+    write lock (BEGIN IMMEDIATE), so several threads or worker processes can
+    share the file.
+
+    grade() only awards XP for questions that were served to the user
+    (their `seen` bit is set) and that they had not answered correctly
+    before, so replaying a quiz or submitting made-up IDs earns nothing.
+    """
+
+    def __init__(self, path: str, xp_per_correct: int = 10):
+        self.path = path
+        self.xp_per_correct = xp_per_correct
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS academy_progress ("
+            " user_id TEXT NOT NULL,"
+            " track TEXT NOT NULL,"
+            " seen BLOB NOT NULL,"
+            " correct BLOB NOT NULL,"
+            " xp INTEGER NOT NULL DEFAULT 0,"
+            " base INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (user_id, track)) WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(academy_progress)")}
+        if "base" not in columns:  # databases created before the bitsets were offset
+            self._conn.execute("ALTER TABLE academy_progress ADD COLUMN base INTEGER NOT NULL DEFAULT 0")
+        self._lock = threading.Lock()
+
+        self.served = 0
+        self.submissions = 0
+        self.graded = 0
+        self.rejected_unseen = 0
+        self.xp_awarded = 0
+
+    # --- queries ---
+
+    def get(self, user_id: str, track: str) -> TrackProgress:
+        with self._lock:
+            return self._get(user_id, track)
+
+    def tracks(self, user_id: str) -> Dict[str, TrackProgress]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT track, seen, correct, xp, base FROM academy_progress WHERE user_id = ? ORDER BY track",
+                (user_id,),
+            ).fetchall()
+        return {track: TrackProgress(from_blob(seen), from_blob(correct), xp, base)
+                for track, seen, correct, xp, base in rows}
+
+    # --- updates ---
+
+    def mark_seen(self, user_id: str, track: str, question_ids: Iterable[int],
+                  first_live_id: int = 0) -> TrackProgress:
+        """Records that these questions were served to the user, compacting below `first_live_id`."""
+        question_ids = list(question_ids)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                stored = self._get(user_id, track)
+                progress = stored.rebased(first_live_id)
+                progress = progress._replace(seen=progress.seen | bits_of(question_ids, progress.base))
+                if progress != stored:
+                    self._put(user_id, track, progress)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self.served += 1
+        return progress
+
+    def grade(self, user_id: str, track: str, answers: Mapping[int, int],
+              answer_key: Mapping[int, int], first_live_id: int = 0) -> Dict[str, Any]:
+        """
+        Grades a whole quiz in one transaction. `answers` maps question ID to
+        the chosen option, `answer_key` question ID to the correct one.
+        Questions missing from the key (unknown IDs) are reported as such.
+        The bitsets are compacted below `first_live_id` on the way.
+        """
+        results: List[Dict[str, Any]] = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                stored = self._get(user_id, track)
+                progress = stored.rebased(first_live_id)
+                newly_correct = 0
+                for question_id, choice in answers.items():
+                    expected = answer_key.get(question_id)
+                    if expected is None:
+                        results.append({"id": question_id, "status": "unknown"})
+                        continue
+                    if not has_bit(progress.seen, question_id, progress.base):
+                        self.rejected_unseen += 1
+                        results.append({"id": question_id, "status": "not_served"})
+                        continue
+                    right = choice == expected
+                    first_time = right and not has_bit(progress.correct, question_id, progress.base)
+                    if first_time:
+                        newly_correct |= 1 << (question_id - progress.base)
+                    results.append({"id": question_id, "status": "graded", "correct": right, "answer": expected,
+                                    "xp": self.xp_per_correct if first_time else 0})
+                earned = newly_correct.bit_count() * self.xp_per_correct
+                if newly_correct:
+                    progress = progress._replace(correct=progress.correct | newly_correct, xp=progress.xp + earned)
+                if progress != stored:
+                    self._put(user_id, track, progress)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self.submissions += 1
+            self.graded += sum(1 for r in results if r["status"] == "graded")
+            self.xp_awarded += earned
+
+        graded = [r for r in results if r["status"] == "graded"]
+        return {
+            "results": results,
+            "score": sum(1 for r in graded if r["correct"]),
+            "graded": len(graded),
+            "xp_awarded": earned,
+            "progress": progress.summary(),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows, users, stored = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT user_id), COALESCE(SUM(LENGTH(seen) + LENGTH(correct)), 0)"
+                " FROM academy_progress"
+            ).fetchone()
+        return {
+            "users": users,
+            "user_tracks": rows,
+            "bitset_bytes": stored,
+            "quizzes_served": self.served,
+            "submissions": self.submissions,
+            "graded": self.graded,
+            "rejected_unseen": self.rejected_unseen,
+            "xp_awarded": self.xp_awarded,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- internal helpers (caller holds the lock) ---
+
+    def _get(self, user_id: str, track: str) -> TrackProgress:
+        row = self._conn.execute(
+            "SELECT seen, correct, xp, base FROM academy_progress WHERE user_id = ? AND track = ?", (user_id, track)
+        ).fetchone()
+        if row is None:
+            return TrackProgress()
+        return TrackProgress(from_blob(row[0]), from_blob(row[1]), row[2], row[3])
+
+    def _put(self, user_id: str, track: str, progress: TrackProgress) -> None:
+        self._conn.execute(
+            "INSERT INTO academy_progress (user_id, track, seen, correct, xp, base, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(user_id, track) DO UPDATE SET"
+            " seen = excluded.seen, correct = excluded.correct, xp = excluded.xp, base = excluded.base,"
+            " updated_at = excluded.updated_at",
+            (user_id, track, to_blob(progress.seen), to_blob(progress.correct), progress.xp, progress.base,
+             time.time()),
+        )
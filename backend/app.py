@@ -5,16 +5,34 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # --------------------------------------------------------------------------
 
-import uvicorn
-from fastapi import FastAPI, HTTPException, status, Header, Depends
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, status, Header, Depends, BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from google import genai
-from google.genai import types
-from typing import Annotated, Optional
+from typing import Annotated, Any, Dict, List, Optional, Tuple
 
 # Import secure settings
 from backend.settings import settings
+from backend.sessions import ChatSessionManager
+from backend.state_store import open_store
+from backend.concurrency import Saturated
+from backend.scheduler import LLMScheduler, RateLimited
+from backend.streaming import SSE_HEADERS, StreamTimer, TTFTStats, format_sse
+from backend.response_cache import ResponseCache, is_cacheable, persona_version
+from backend.singleflight import AsyncSingleFlight
+from backend.history import ConversationHistory, build_summary_prompt, estimate_tokens, fallback_summary
+from backend.ledger import ExpenseLedger, LedgerBusy
+from backend.spending import SpendingAggregates, parse_date
+from backend.arena import ArenaError, ArenaHub
+from backend.calculator import CalculatorError, answer_question, calculate
+from backend.context_cache import ContextCache, expiry_of, is_missing_cache_error
+from backend.upstream import CircuitBreaker, CircuitOpen, RetryBudget, Upstream
+from backend.metrics import (CALCULATOR_ANSWERS, CONTENT_TYPE, LLM_QUEUE_WAIT, REGISTRY, MetricsMiddleware, SlowRequestSampler,
+                             cache_collector, record_usage, track_llm)
 
 # ==============================================================================
 # 1. SYSTEM INSTRUCTION (UPDATED for Tone and Professional Formatting)
@@ -69,6 +87,9 @@ DB_Session = Annotated[None, Depends(get_db)]
 
 class ChatMessage(BaseModel):
     message: str
+    # "quick"/"explain" ask a one-shot question outside the user's conversation;
+    # those answers are cacheable. Omit it to continue the conversation.
+    mode: Optional[str] = None
 
 
 class AuthDetails(BaseModel):
@@ -76,6 +97,23 @@ class AuthDetails(BaseModel):
     password: str
 
 
+class ExpenseIn(BaseModel):
+    amount: float
+    category: str
+    note: Optional[str] = None
+    # Unix seconds; defaults to the time the expense is received.
+    timestamp: Optional[float] = None
+
+
+class ExpenseBatch(BaseModel):
+    expenses: List[ExpenseIn]
+
+
+class CalculatorBatch(BaseModel):
+    # Each scenario holds the calculator's fields, e.g. {"monthly": 5000, "annual_rate": 12, "years": 20}.
+    scenarios: List[Dict[str, Any]]
+
+
 # ==============================================================================
 # 5. FASTAPI SETUP & INITIALIZATION
 # ==============================================================================
@@ -91,36 +129,331 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variables for AI chat
+# Outermost middleware, so /metrics latency includes CORS handling. With
+# SLOW_REQUEST_MS set, stacks of slow requests are sampled as well.
+slow_requests = SlowRequestSampler(
+    threshold=settings.SLOW_REQUEST_MS / 1000, keep=settings.SLOW_REQUEST_KEEP
+).start() if settings.SLOW_REQUEST_MS > 0 else None
+app.add_middleware(MetricsMiddleware, sampler=slow_requests)
+
+# Global variables for AI chat. The Gemini SDK is imported and the client
+# created in the background after the server starts accepting connections;
+# until then /health reports "starting" and chat endpoints answer 503.
 client = None
-chat_session = None
+chat_sessions = None
+service_state = "starting"  # -> "ready", or "degraded" if Gemini could not be set up
+service_error = None
+startup_seconds = None
+_process_started = time.perf_counter()
+# Conversations and rate-limit buckets live here when several workers must share them.
+state_store = open_store(settings.STATE_STORE_URL)
+# Gemini calls queue here, keyed by X-User-ID: per-user rate limits, fair
+# turns between users, and global request/token-per-minute ceilings (split
+# between workers, since each process enforces its own share).
+chat_scheduler = LLMScheduler(
+    max_concurrency=settings.CHAT_MAX_CONCURRENCY,
+    max_queue=settings.CHAT_MAX_QUEUE,
+    user_rpm=settings.CHAT_USER_RPM,
+    user_burst=settings.CHAT_USER_BURST,
+    user_max_queue=settings.CHAT_USER_MAX_QUEUE,
+    global_rpm=settings.LLM_GLOBAL_RPM / settings.WORKERS,
+    global_tpm=settings.LLM_GLOBAL_TPM / settings.WORKERS,
+    store=state_store,
+)
+chat_ttft = TTFTStats()
+
+CHAT_MODEL = "gemini-2.5-flash"
+CHAT_TEMPERATURE = 0.3
+# Sent instead of an answer when Gemini returns no text (blocked or empty candidates); never cached.
+NO_ANSWER = "Sorry, Finny couldn't answer that. Please try rephrasing your question."
+PERSONA_VERSION = persona_version(SYSTEM_INSTRUCTION, CHAT_MODEL, str(CHAT_TEMPERATURE))
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_PATH,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+REGISTRY.add_collector(cache_collector("chat_responses", response_cache.stats))
+# The persona is registered once as a Gemini cached context and referenced by
+# handle, instead of being resent as prefix tokens with every request.
+persona_cache = ContextCache(
+    ttl_seconds=settings.PERSONA_CACHE_TTL_SECONDS,
+    retry_after_failure=settings.PERSONA_CACHE_RETRY_SECONDS,
+)
+# Gemini would refuse to cache a persona below its minimum size; don't ask on every request.
+PERSONA_CACHEABLE = (settings.PERSONA_CACHE_ENABLED
+                     and estimate_tokens(SYSTEM_INSTRUCTION) >= settings.PERSONA_CACHE_MIN_TOKENS)
+if settings.PERSONA_CACHE_ENABLED and not PERSONA_CACHEABLE:
+    print(f"Persona cache skipped: SYSTEM_INSTRUCTION is ~{estimate_tokens(SYSTEM_INSTRUCTION)} tokens, "
+          f"below PERSONA_CACHE_MIN_TOKENS={settings.PERSONA_CACHE_MIN_TOKENS}.")
+chat_flight = AsyncSingleFlight(default_timeout=settings.COALESCE_TIMEOUT_SECONDS)
+
+# Every Gemini call goes through this: deadlines, budgeted retries, optional
+# hedging, and a breaker that fails fast while Gemini is down.
+gemini = Upstream(
+    "gemini",
+    attempt_timeout=settings.GEMINI_ATTEMPT_TIMEOUT_SECONDS,
+    deadline=settings.GEMINI_DEADLINE_SECONDS,
+    max_attempts=settings.GEMINI_MAX_ATTEMPTS,
+    hedge_after=settings.GEMINI_HEDGE_AFTER_SECONDS,
+    retry_budget=RetryBudget(ratio=settings.GEMINI_RETRY_BUDGET_RATIO),
+    breaker=CircuitBreaker("gemini", failure_threshold=settings.GEMINI_BREAKER_FAILURES,
+                           reset_timeout=settings.GEMINI_BREAKER_RESET_SECONDS),
+)
+REGISTRY.add_collector(gemini.collect)
+
+# Expenses are written behind the request by the ledger's writer thread.
+ledger = ExpenseLedger(
+    settings.LEDGER_DB_PATH,
+    batch_size=settings.LEDGER_BATCH_SIZE,
+    flush_interval=settings.LEDGER_FLUSH_INTERVAL_MS / 1000,
+    max_queue=settings.LEDGER_MAX_QUEUE,
+)
+MAX_BULK_EXPENSES = 5000
+# Per-user spending rollups, updated as each batch of expenses is committed.
+# They are rebuilt from the ledger during background startup (see init_services).
+# With several workers each one also catches up on rows the others committed.
+spending = SpendingAggregates(utc_offset_minutes=settings.SPENDING_UTC_OFFSET_MINUTES)
+spending_ready = False
+
+# Arena rooms are held in memory on this process and fanned out over WebSockets.
+# uvicorn's workers share one listening socket, so with WORKERS > 1 players of
+# one room would land on different hubs; the arena is turned off instead (see
+# start_server for running it with several processes).
+ARENA_ENABLED = settings.WORKERS == 1
+arena_hub = ArenaHub(
+    max_rooms=settings.ARENA_MAX_ROOMS,
+    max_players=settings.ARENA_MAX_PLAYERS,
+    messages_per_second=settings.ARENA_MESSAGES_PER_SECOND,
+    message_burst=settings.ARENA_MESSAGE_BURST,
+    max_score_delta=settings.ARENA_MAX_SCORE_DELTA,
+    broadcast_interval=settings.ARENA_BROADCAST_INTERVAL_MS / 1000,
+    room_ttl_seconds=settings.ARENA_ROOM_TTL_SECONDS,
+    player_grace_seconds=settings.ARENA_PLAYER_GRACE_SECONDS,
+)
 
 
-# 5.1. STARTUP EVENT -> Initialize ONLY Gemini
-@app.on_event("startup")
-def initialize_services():
-    global client, chat_session
+def chat_config(cached_content: Optional[str] = None):
+    from google.genai import types  # loaded by init_services before any chat runs
+
+    if cached_content:
+        # The cached context already carries SYSTEM_INSTRUCTION.
+        return types.GenerateContentConfig(temperature=CHAT_TEMPERATURE, cached_content=cached_content)
+    return types.GenerateContentConfig(
+        temperature=CHAT_TEMPERATURE,
+        system_instruction=SYSTEM_INSTRUCTION,
+    )
+
+
+async def register_persona() -> Tuple[str, float]:
+    from google.genai import types
+
+    cached = await gemini.acall(lambda: client.aio.caches.create(
+        model=CHAT_MODEL,
+        config=types.CreateCachedContentConfig(
+            system_instruction=SYSTEM_INSTRUCTION,
+            ttl=f"{settings.PERSONA_CACHE_TTL_SECONDS}s",
+            display_name="finsense-persona",
+        ),
+    ))
+    return cached.name, expiry_of(cached, settings.PERSONA_CACHE_TTL_SECONDS)
+
+
+async def persona_handle() -> Optional[str]:
+    """Handle of the cached persona, or None to send SYSTEM_INSTRUCTION inline."""
+    if not PERSONA_CACHEABLE:
+        return None
+    return await persona_cache.aensure(CHAT_MODEL, SYSTEM_INSTRUCTION, register_persona)
 
-    # --- DATABASE BYPASSED ---
+
+async def generate_chat(contents):
+    """One chat call with the persona by handle when possible; a stale handle is retried inline."""
+    handle = await persona_handle()
+    try:
+        return await gemini.acall(lambda: client.aio.models.generate_content(
+            model=CHAT_MODEL,
+            contents=contents,
+            config=chat_config(handle),
+        ))
+    except Exception as e:
+        if handle is None or not is_missing_cache_error(e):
+            raise
+        # The cached persona expired early or was deleted; resend it inline this once.
+        persona_cache.invalidate(handle)
+        return await gemini.acall(lambda: client.aio.models.generate_content(
+            model=CHAT_MODEL,
+            contents=contents,
+            config=chat_config(),
+        ))
+
+
+async def open_chat_stream(contents, handle: Optional[str]):
+    stream = await client.aio.models.generate_content_stream(
+        model=CHAT_MODEL,
+        contents=contents,
+        config=chat_config(handle),
+    )
+    chunks = aiter(stream)
+    # Request errors surface with the first chunk, not when the stream is opened.
+    return chunks, await anext(chunks, None)
+
+
+async def stream_chat(contents):
+    """Chunks of one streamed answer; like generate_chat, a stale handle is retried before anything is sent."""
+    handle = await persona_handle()
+    try:
+        chunks, first = await open_chat_stream(contents, handle)
+    except Exception as e:
+        if handle is None or not is_missing_cache_error(e):
+            raise
+        persona_cache.invalidate(handle)
+        chunks, first = await open_chat_stream(contents, None)
+    if first is None:
+        return
+    yield first
+    async for chunk in chunks:
+        yield chunk
+
+
+def create_chat_session():
+    """Starts a fresh conversation; the persona travels by cached-context handle or in chat_config()."""
+    return ConversationHistory(
+        keep_turns=settings.CHAT_HISTORY_KEEP_TURNS,
+        token_budget=settings.CHAT_HISTORY_TOKEN_BUDGET,
+        summary_max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+    )
+
+
+def load_chat_session(data):
+    """Rebuilds a conversation saved in the shared state store."""
+    return ConversationHistory.from_dict(
+        data,
+        keep_turns=settings.CHAT_HISTORY_KEEP_TURNS,
+        token_budget=settings.CHAT_HISTORY_TOKEN_BUDGET,
+        summary_max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+    )
+
+
+@asynccontextmanager
+async def llm_slot(user_id: int, kind: str, prompt_tokens: int,
+                   output_tokens: int = settings.LLM_EXPECTED_OUTPUT_TOKENS, charge: bool = True):
+    """Waits for this user's turn at Gemini; the ticket reports the queue wait."""
+    async with chat_scheduler.slot(user_id, prompt_tokens + output_tokens, charge=charge) as ticket:
+        LLM_QUEUE_WAIT.labels(kind).observe(ticket.wait_seconds)
+        yield ticket
+
+
+def total_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) if usage is not None else None
+
+
+def record_prompt_tokens(history: ConversationHistory, response) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and usage.prompt_token_count:
+        history.last_prompt_tokens = usage.prompt_token_count
+
+
+async def compact_history(user_id: int, history: ConversationHistory) -> None:
+    """Folds older turns into the rolling summary once the token budget is exceeded."""
+    if not history.needs_compaction():
+        return
+    from google.genai import types
+
+    folded = history.take_foldable()
+    prompt = build_summary_prompt(history.summary, folded)
+    try:
+        # Housekeeping for a reply the user already got: not charged to their rate limit.
+        async with llm_slot(user_id, "summary", estimate_tokens(prompt), history.summary_max_tokens,
+                            charge=False) as ticket:
+            with track_llm(CHAT_MODEL, "summary"):
+                response = await gemini.acall(lambda: client.aio.models.generate_content(
+                    model=CHAT_MODEL,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        temperature=0.2,
+                        max_output_tokens=history.summary_max_tokens,
+                        system_instruction=history.summary_instruction(),
+                    ),
+                ))
+            ticket.used_tokens = total_tokens(response)
+        record_usage(CHAT_MODEL, response)
+        summary = response.text or fallback_summary(history.summary, folded, history.summary_max_tokens * 4)
+    except Exception as e:
+        print(f"History compaction fell back to extractive summary: {e}")
+        summary = fallback_summary(history.summary, folded, history.summary_max_tokens * 4)
+    history.fold(folded, summary)
+    await chat_sessions.arecord_turn(user_id, history)
+
+
+# 5.1. STARTUP -> Gemini and rollups load in the background
+def init_services():
+    """Slow startup work, run in a worker thread once the server is listening."""
+    global client, chat_sessions, spending_ready, service_state, service_error, startup_seconds
+
+    # --- DATABASE BYPASSED (expenses use the local SQLite ledger) ---
     print("--- DATABASE INITIALIZATION BYPASSED FOR SUBMISSION ---")
+    try:
+        spending.attach(ledger, shared=settings.WORKERS > 1)
+        spending_ready = True
+    except Exception as e:
+        print(f"Spending rollups failed to load: {e}")
+        service_error = f"spending: {e}"
 
     # --- GEMINI AI INITIALIZATION ---
     try:
+        # Importing the SDK alone takes ~0.5s, which is why it happens here.
+        from google import genai
+        from google.genai import types
+
         # **CRITICAL:** Ensure your GEMINI_API_KEY in settings.py is valid!
-        client = genai.Client(api_key=settings.GEMINI_API_KEY)
-        chat_session = client.chats.create(
-            model="gemini-2.5-flash",
-            config=types.GenerateContentConfig(
-                temperature=0.3,
-                system_instruction=SYSTEM_INSTRUCTION,
-            ),
+        # The SDK's own timeout ends calls the Upstream wrapper has stopped waiting for.
+        http_options = types.HttpOptions(base_url=settings.GEMINI_BASE_URL,
+                                         timeout=int(settings.GEMINI_ATTEMPT_TIMEOUT_SECONDS * 1000))
+        client = genai.Client(api_key=settings.GEMINI_API_KEY, http_options=http_options)
+        # Each X-User-ID gets its own conversation; sessions are created lazily.
+        chat_sessions = ChatSessionManager(
+            factory=create_chat_session,
+            max_sessions=settings.CHAT_MAX_SESSIONS,
+            ttl_seconds=settings.CHAT_SESSION_TTL_SECONDS,
+            max_session_bytes=settings.CHAT_SESSION_MAX_BYTES,
+            max_total_bytes=settings.CHAT_POOL_MAX_BYTES,
+            store=state_store if state_store.shared else None,
+            loader=load_chat_session,
         )
+        service_state = "ready" if spending_ready else "degraded"
         print("Gemini AI Initialized Successfully")
     except Exception as e:
         print(f"\n*** FATAL AI ERROR: Gemini Initialization Failed. Reason: {e} ***")
-        # If the AI fails to initialize, we MUST ensure the app doesn't start broken.
-        # However, for a submission, we will let it continue running to show the server is up.
-        pass
+        # Keep serving expenses, arena and health so the app is usable without chat.
+        service_error = str(e)
+        service_state = "degraded"
+    startup_seconds = round(time.perf_counter() - _process_started, 3)
+
+
+@app.on_event("startup")
+async def initialize_services():
+    # Not awaited: uvicorn starts accepting connections as soon as this returns.
+    app.state.init_task = asyncio.create_task(asyncio.to_thread(init_services))
+
+
+def require_chat():
+    """Raises the 503 chat endpoints return while Gemini is starting up or unavailable."""
+    if chat_sessions is not None:
+        return
+    if service_state == "starting":
+        raise HTTPException(status_code=503, detail="Finny is starting up. Please try again in a moment.",
+                            headers={"Retry-After": "1"})
+    raise HTTPException(
+        status_code=503,
+        detail="AI service is not initialized. Check GEMINI_API_KEY in settings.py."
+    )
+
+
+# 5.2. SHUTDOWN EVENT -> Commit queued expenses
+@app.on_event("shutdown")
+def close_services():
+    ledger.close()
+    state_store.close()
 
 
 # ==============================================================================
@@ -151,55 +484,351 @@ def login_disabled(data: AuthDetails, db: DB_Session):
 
 
 # ==============================================================================
-# 8. DATA ENDPOINTS (TEMPORARILY DISABLED)
+# 8. DATA ENDPOINTS
 # ==============================================================================
 
 @app.post("/onboard")
 def onboard_disabled(user_id: CurrentUserID, db: DB_Session):
     raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database disabled for demo.")
 
-@app.post("/log_expense")
-def log_expense_disabled(user_id: CurrentUserID, db: DB_Session):
-    raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database disabled for demo.")
+# Expenses are accepted once validated and queued (202); the ledger commits
+# them in batches a few milliseconds later.
+@app.post("/log_expense", status_code=status.HTTP_202_ACCEPTED)
+def log_expense(data: ExpenseIn, user_id: CurrentUserID):
+    try:
+        expense = ledger.log(user_id, data.amount, data.category, data.note, data.timestamp)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except LedgerBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e),
+                            headers={"Retry-After": "1"})
+    return {"status": "queued", "expense": expense}
+
+@app.post("/log_expense/bulk", status_code=status.HTTP_202_ACCEPTED)
+def log_expense_bulk(data: ExpenseBatch, user_id: CurrentUserID):
+    if len(data.expenses) > MAX_BULK_EXPENSES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"At most {MAX_BULK_EXPENSES} expenses per request.")
+    try:
+        expenses = ledger.log_many(user_id, [item.model_dump() for item in data.expenses])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except LedgerBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e),
+                            headers={"Retry-After": "1"})
+    return {"status": "queued", "count": len(expenses), "ids": [e["id"] for e in expenses]}
+
+@app.get("/expenses")
+def list_expenses(user_id: CurrentUserID, limit: int = 50):
+    return {"expenses": ledger.recent(user_id, limit=max(1, min(limit, 500)))}
+
+@app.get("/spending/snapshot")
+def spending_snapshot(user_id: CurrentUserID, start: Optional[str] = None, end: Optional[str] = None):
+    """Category totals, 50/30/20 ratios and rollups; the window defaults to the current month."""
+    if not spending_ready:
+        raise HTTPException(status_code=503, detail="Spending totals are still loading.",
+                            headers={"Retry-After": "1"})
+    try:
+        return spending.snapshot(user_id, parse_date(start), parse_date(end))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+# Plain def: a large batch runs in the threadpool instead of on the event loop.
+@app.post("/calculator/{kind}")
+def run_calculator(kind: str, data: CalculatorBatch):
+    """SIP, lump sum, EMI, PPF and NPS projections for many scenarios in one vectorized pass."""
+    try:
+        results = calculate(kind, data.scenarios)
+    except CalculatorError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"kind": kind, "count": len(results), "results": results}
 
 
 # ==============================================================================
 # 9. CORE CHAT ENDPOINT
 # ==============================================================================
 
-@app.post("/chat")
-async def chat_api(data: ChatMessage, user_id: CurrentUserID):
-    global chat_session
+async def answer_one_shot(user_id: int, user_message: str, mode: str) -> Tuple[str, int]:
+    """
+    Answers a stateless question, served from the response cache when possible.
+    Returns the answer and how long it queued for Gemini in ms (0 for cache hits).
+    """
+    cache_key = response_cache.make_key(user_message, mode, PERSONA_VERSION)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached, 0
+    # A miss counts against the user's rate limit even if it joins someone else's call.
+    await chat_scheduler.acharge(user_id)
+
+    async def generate() -> Tuple[str, int]:
+        async with llm_slot(user_id, "one_shot", estimate_tokens(user_message), charge=False) as ticket:
+            with track_llm(CHAT_MODEL, "one_shot"):
+                response = await generate_chat(user_message)
+            ticket.used_tokens = total_tokens(response)
+        record_usage(CHAT_MODEL, response)
+        if not response.text:
+            return NO_ANSWER, ticket.wait_ms
+        response_cache.set(cache_key, response.text)
+        return response.text, ticket.wait_ms
+
+    # Identical questions already on their way to Gemini share that one call.
+    return await chat_flight.do(cache_key, generate)
+
+
+async def calculated_answer(user_id: int, user_message: str, mode: Optional[str], endpoint: str) -> Optional[str]:
+    """
+    Exact answer to a numeric question ("₹5000/month for 20 years?") from the
+    local calculator, or None. No Gemini call; in conversation mode the
+    exchange is still added to the user's history.
+    """
+    answer = answer_question(user_message)
+    if answer is None:
+        return None
+    CALCULATOR_ANSWERS.labels(endpoint).inc()
+    if chat_sessions is not None and not is_cacheable(mode):
+        history = await chat_sessions.aget(user_id)
+        history.add_exchange(user_message, answer)
+        await chat_sessions.arecord_turn(user_id, history)
+    return answer
 
-    if not chat_session:
-        # If AI failed to initialize, return a clear error message
-        raise HTTPException(
-            status_code=503,
-            detail="AI service is not initialized. Check GEMINI_API_KEY in settings.py."
-        )
 
+@app.post("/chat")
+async def chat_api(data: ChatMessage, user_id: CurrentUserID, background_tasks: BackgroundTasks,
+                   http_response: Response):
     user_message = data.message.strip()
+    calculated = await calculated_answer(user_id, user_message, data.mode, "chat")
+    if calculated is not None:
+        return {"response": calculated, "calculated": True}
+
+    # If AI is still starting or failed to initialize, return a clear error message
+    require_chat()
+
     try:
-        response = chat_session.send_message(user_message)
+        if is_cacheable(data.mode):
+            answer, wait_ms = await answer_one_shot(user_id, user_message, data.mode)
+            http_response.headers["X-Queue-Wait-Ms"] = str(wait_ms)
+            return {"response": answer}
+
+        # The async client keeps the event loop free while Gemini is thinking.
+        history = await chat_sessions.aget(user_id)
+        prompt_tokens = history.token_count() + estimate_tokens(user_message)
+        async with llm_slot(user_id, "chat", prompt_tokens) as ticket:
+            with track_llm(CHAT_MODEL, "chat"):
+                response = await generate_chat(history.contents(user_message))
+            ticket.used_tokens = total_tokens(response)
+        http_response.headers["X-Queue-Wait-Ms"] = str(ticket.wait_ms)
+        record_usage(CHAT_MODEL, response)
+        if not response.text:
+            return {"response": NO_ANSWER}
+        history.add_exchange(user_message, response.text)
+        record_prompt_tokens(history, response)
+        await chat_sessions.arecord_turn(user_id, history)
+        # Summarize old turns after the reply has gone out, not before it.
+        background_tasks.add_task(compact_history, user_id, history)
         return {"response": response.text}
+    except RateLimited as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="You're sending messages too quickly. Please wait a moment.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except Saturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Finny is busy right now. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except CircuitOpen as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Finny is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Finny took too long to answer. Please try again.",
+        )
     except Exception as e:
         print("Gemini Error:", e)
         raise HTTPException(status_code=500, detail="Finny encountered an error while processing the message.")
 
 
-# 10. HEALTH CHECK ENDPOINT
+@app.post("/chat/stream")
+async def chat_stream_api(data: ChatMessage, user_id: CurrentUserID):
+    """Same as /chat, but forwards the answer as Server-Sent Events while it is generated."""
+    user_message = data.message.strip()
+    calculated = await calculated_answer(user_id, user_message, data.mode, "chat_stream")
+    if calculated is not None:
+        async def calculated_stream():
+            timer = StreamTimer()
+            timer.mark_chunk()
+            yield format_sse({"delta": calculated})
+            yield format_sse(dict(timer.summary(), calculated=True), event="done")
+
+        return StreamingResponse(calculated_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    require_chat()
+
+    try:
+        # Only the user's rate limit is checked before the response starts (a real 429). The
+        # slot itself is taken inside the stream, so it is released however the stream ends,
+        # including a client that disconnects before the first byte.
+        await chat_scheduler.acharge(user_id)
+    except RateLimited as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="You're sending messages too quickly. Please wait a moment.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    history = await chat_sessions.aget(user_id)
+    prompt_tokens = history.token_count() + estimate_tokens(user_message)
+
+    async def event_stream():
+        timer = StreamTimer()
+        parts = []
+        chunk = None
+        admitted = False
+        try:
+            async with llm_slot(user_id, "chat_stream", prompt_tokens, charge=False) as ticket:
+                # Streams can't be retried once they start, so only the breaker applies. It is
+                # asked once the slot is ours, so a half-open probe isn't spent in the queue.
+                gemini.admit()
+                admitted = True
+                with track_llm(CHAT_MODEL, "chat_stream"):
+                    async for chunk in stream_chat(history.contents(user_message)):
+                        record_prompt_tokens(history, chunk)
+                        if not chunk.text:
+                            continue
+                        timer.mark_chunk()
+                        parts.append(chunk.text)
+                        yield format_sse({"delta": chunk.text})
+                gemini.record_success()
+                # Usage metadata is cumulative; the last chunk carries the totals.
+                record_usage(CHAT_MODEL, chunk)
+                ticket.used_tokens = total_tokens(chunk)
+            if not parts:
+                yield format_sse({"detail": NO_ANSWER}, event="error")
+                return
+            history.add_exchange(user_message, "".join(parts))
+            await chat_sessions.arecord_turn(user_id, history)
+            chat_ttft.record(timer)
+            yield format_sse(dict(timer.summary(), queue_wait_ms=ticket.wait_ms), event="done")
+        except RateLimited as e:
+            yield format_sse({"detail": "You're sending messages too quickly. Please wait a moment.",
+                              "retry_after": e.retry_after}, event="error")
+            return
+        except Saturated as e:
+            yield format_sse({"detail": "Finny is busy right now. Please try again shortly.",
+                              "retry_after": e.retry_after}, event="error")
+            return
+        except CircuitOpen as e:
+            yield format_sse({"detail": "Finny is temporarily unavailable. Please try again shortly.",
+                              "retry_after": e.retry_after}, event="error")
+            return
+        except Exception as e:
+            if admitted:
+                gemini.record_failure(e)
+            print("Gemini Stream Error:", e)
+            yield format_sse({"detail": "Finny encountered an error while processing the message."}, event="error")
+        # The client already has the full answer; compact with the slot released.
+        await compact_history(user_id, history)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ==============================================================================
+# 10. ARENA ROOMS (WEBSOCKET)
+# ==============================================================================
+
+# Browsers can't set headers on a WebSocket, so the player identifies itself
+# in the query string: /ws/arena/ABC123?uid=...&name=...&create=1
+# Client messages: {"t": "score", "d": 10}, {"t": "state"}, {"t": "ping"}.
+@app.websocket("/ws/arena/{code}")
+async def arena_socket(websocket: WebSocket, code: str, uid: str = "", name: str = "Player", create: bool = False):
+    await websocket.accept()
+    try:
+        if not ARENA_ENABLED:
+            raise ArenaError("arena_unavailable", "Arena rooms need a single worker (WORKERS=1).", close_code=4503)
+        conn = arena_hub.join(code, uid, name, create=create)
+    except ArenaError as e:
+        await websocket.send_text(json.dumps({"t": "error", "code": e.code, "detail": str(e)}))
+        await websocket.close(code=e.close_code)
+        return
+
+    pump = asyncio.create_task(arena_hub.pump(conn, websocket.send_text, lambda code: websocket.close(code=code)))
+    try:
+        while True:
+            arena_hub.handle(conn, await websocket.receive_text())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        arena_hub.leave(conn)
+        pump.cancel()
+
+
+@app.get("/arena/rooms/{code}")
+def arena_room(code: str):
+    """Current state of a room, e.g. to check a code before joining."""
+    if not ARENA_ENABLED:
+        raise HTTPException(status_code=503, detail="Arena rooms need a single worker (WORKERS=1).")
+    room = arena_hub.rooms.get(code.strip().upper())
+    if room is None:
+        raise HTTPException(status_code=404, detail="Room not found.")
+    return room.state()
+
+
+# 11. HEALTH CHECK & METRICS ENDPOINTS
 @app.get("/health")
 def health_check():
-    gemini_status = "ready" if chat_session else "failed"
-    db_status = "disabled"
-    return {"status": "ok", "service": "FinSenseAI Backend", "gemini": gemini_status, "db": db_status}
+    """Always 200 once the server listens; `status` is starting, ready or degraded."""
+    if chat_sessions is not None:
+        gemini_status = "ready"
+    else:
+        gemini_status = "starting" if service_state == "starting" else "failed"
+    db_status = "sqlite"
+    sessions = chat_sessions.stats() if chat_sessions is not None else None
+    return {"status": service_state, "service": "FinSenseAI Backend", "gemini": gemini_status,
+            "error": service_error, "startup_seconds": startup_seconds, "db": db_status,
+            "sessions": sessions, "state_store": state_store.stats(), "chat_scheduler": chat_scheduler.stats(),
+            "chat_stream_ttft": chat_ttft.snapshot(), "response_cache": response_cache.stats(),
+            "persona_cache": persona_cache.stats(),
+            "coalescing": chat_flight.snapshot(), "ledger": ledger.stats(),
+            "spending": spending.stats(), "arena": arena_hub.stats(), "upstream": gemini.stats()}
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of request, Gemini and cache metrics."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/debug/slow-requests")
+def slow_request_samples():
+    """The slowest requests seen with their most frequent stacks (needs SLOW_REQUEST_MS)."""
+    if slow_requests is None:
+        raise HTTPException(status_code=404, detail="Set SLOW_REQUEST_MS to enable slow request sampling.")
+    return {"threshold_ms": settings.SLOW_REQUEST_MS, "requests": slow_requests.slowest()}
 
 
 # ==============================================================================
-# 11. SERVER RUNNER
+# 12. SERVER RUNNER
 # ==============================================================================
 def start_server():
-    uvicorn.run(app, host="127.0.0.1", port=5000, log_level="info")
+    import uvicorn
+
+    if settings.WORKERS > 1:
+        # Arena rooms live in one process's memory and uvicorn's workers can't
+        # route by room code, so the arena is off here (ARENA_ENABLED). To serve
+        # it from several processes, run single-worker instances on separate
+        # ports behind a proxy that sends /ws/arena/{code} and /arena/rooms/{code}
+        # for a given code to the same instance (sticky routing by room code).
+        print("Arena rooms are disabled with WORKERS > 1.")
+        # Each worker imports the app on its own, so it has to be passed by name.
+        uvicorn.run("backend.app:app", host="127.0.0.1", port=settings.PORT, log_level="info",
+                    workers=settings.WORKERS)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=settings.PORT, log_level="info")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,339 @@
+# backend/arena.py
+import asyncio
+import json
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+# ==============================================================================
+# 1. ERRORS
+# ==============================================================================
+
+class ArenaError(Exception):
+    """A join or message the hub refuses. `close_code` is the WebSocket close code to use."""
+
+    def __init__(self, code: str, detail: str, close_code: int = 4000):
+        super().__init__(detail)
+        self.code = code
+        self.close_code = close_code
+
+
+ROOM_CODE = re.compile(r"^[A-Z0-9]{4,12}$")
+ROOM_SWEEP_SECONDS = 5  # how often empty rooms are checked for expiry
+
+
+def normalize_room_code(code: str) -> str:
+    code = (code or "").strip().upper()
+    if not ROOM_CODE.match(code):
+        raise ArenaError("bad_room_code", "Room codes are 4-12 letters or digits.", close_code=4400)
+    return code
+
+
+# ==============================================================================
+# 2. ROOM STATE
+# ==============================================================================
+
+class Connection:
+    """One subscriber: an outgoing message queue plus a token bucket for incoming messages."""
+
+    __slots__ = ("room", "uid", "queue", "tokens", "refilled_at", "dropped")
+
+    def __init__(self, room: "Room", uid: str, queue_size: int, burst: float):
+        self.room = room
+        self.uid = uid
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=queue_size)
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.dropped = False
+
+
+class Player:
+    __slots__ = ("uid", "name", "score", "left_at")
+
+    def __init__(self, uid: str, name: str):
+        self.uid = uid
+        self.name = name
+        self.score = 0
+        self.left_at: Optional[float] = None
+
+
+class Room:
+    """
+    In-memory state of one arena room.
+
+    Players keep their score when they disconnect; `connections` holds the
+    live subscribers. Every remembered player, connected or not, counts
+    toward the hub's `max_players`. `version` increases with every change
+    so clients can spot a missed diff and ask for the full state again.
+    """
+
+    __slots__ = ("code", "host", "players", "connections", "version", "pending_scores",
+                 "created_at", "empty_since")
+
+    def __init__(self, code: str, host: str, now: float):
+        self.code = code
+        self.host = host
+        self.players: Dict[str, Player] = {}
+        self.connections: Dict[str, Connection] = {}
+        self.version = 0
+        self.pending_scores: Dict[str, int] = {}
+        self.created_at = now
+        self.empty_since: Optional[float] = now
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "t": "state",
+            "v": self.version,
+            "room": self.code,
+            "host": self.host,
+            "players": [[p.uid, p.name, p.score, p.uid in self.connections] for p in self.players.values()],
+        }
+
+
+# ==============================================================================
+# 3. ROOM HUB (FAN-OUT + COALESCED SCORE DIFFS)
+# ==============================================================================
+
+class ArenaHub:
+    """
+    Holds every arena room in memory and fans updates out to subscribers.
+
+    All state changes happen on the event loop without awaiting in between,
+    so a score delta is applied atomically: there is no read-modify-write of
+    a shared document. Score changes are coalesced per room and broadcast
+    every `broadcast_interval` seconds as one compact diff
+    ({"t": "score", "v": version, "s": {uid: score}}); joins and leaves go out
+    immediately. Each diff is serialized once and queued to every subscriber;
+    a subscriber whose queue fills up (a stalled client) is disconnected
+    instead of slowing the room down.
+
+    `max_players` caps the players a room remembers, connected or not. When
+    a full room gets a new player, those who left more than
+    `player_grace_seconds` ago without scoring are dropped to make space
+    ({"t": "gone", "v": version, "u": [uid, ...]}).
+    """
+
+    def __init__(self, max_rooms: int = 2000, max_players: int = 50, messages_per_second: float = 10,
+                 message_burst: int = 20, max_score_delta: int = 100, broadcast_interval: float = 0.05,
+                 room_ttl_seconds: float = 600, send_queue_size: int = 256, player_grace_seconds: float = 30):
+        self.max_rooms = max_rooms
+        self.max_players = max_players
+        self.messages_per_second = messages_per_second
+        self.message_burst = message_burst
+        self.max_score_delta = max_score_delta
+        self.broadcast_interval = broadcast_interval
+        self.room_ttl_seconds = room_ttl_seconds
+        self.send_queue_size = send_queue_size
+        self.player_grace_seconds = player_grace_seconds
+
+        self.rooms: Dict[str, Room] = {}
+        self._dirty: Dict[str, Room] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+        self.connections = 0
+        self.messages_in = 0
+        self.messages_out = 0
+        self.broadcasts = 0
+        self.rate_limited = 0
+        self.slow_disconnects = 0
+        self.players_dropped = 0
+
+    # --- membership ---
+
+    def join(self, code: str, uid: str, name: str, create: bool = False) -> Connection:
+        """Subscribes `uid` to a room (creating it if asked) and queues the full room state."""
+        code = normalize_room_code(code)
+        uid = str(uid)[:64]
+        if not uid:
+            raise ArenaError("missing_uid", "A uid is required to join a room.", close_code=4400)
+        self._ensure_flusher()
+        now = time.monotonic()
+
+        room = self.rooms.get(code)
+        if room is None:
+            if not create:
+                raise ArenaError("room_not_found", "Room not found.", close_code=4404)
+            if len(self.rooms) >= self.max_rooms:
+                raise ArenaError("too_many_rooms", "No rooms available right now.", close_code=4503)
+            room = self.rooms[code] = Room(code, uid, now)
+
+        if uid not in room.players and len(room.players) >= self.max_players:
+            self._drop_idle_players(room, now)
+            if len(room.players) >= self.max_players:
+                raise ArenaError("room_full", "This room is full.", close_code=4409)
+
+        previous = room.connections.get(uid)
+        if previous is not None:
+            # Same player connecting again (e.g. a second tab): the newer connection wins.
+            self._disconnect(previous)
+
+        player = room.players.get(uid)
+        if player is None:
+            player = room.players[uid] = Player(uid, (name or "Player")[:40])
+        player.left_at = None
+        conn = Connection(room, uid, self.send_queue_size, self.message_burst)
+        room.connections[uid] = conn
+        room.empty_since = None
+        room.version += 1
+        self.connections += 1
+
+        self._send(conn, json.dumps(room.state(), separators=(",", ":")))
+        self._broadcast(room, {"t": "join", "v": room.version, "p": [player.uid, player.name, player.score]},
+                        skip=uid)
+        return conn
+
+    def leave(self, conn: Connection) -> None:
+        room = conn.room
+        if room.connections.get(conn.uid) is not conn:
+            return
+        del room.connections[conn.uid]
+        self.connections -= 1
+        room.version += 1
+        now = time.monotonic()
+        room.players[conn.uid].left_at = now
+        if not room.connections:
+            room.empty_since = now
+        self._broadcast(room, {"t": "leave", "v": room.version, "u": conn.uid})
+
+    # --- incoming messages ---
+
+    def handle(self, conn: Connection, text: str) -> None:
+        """Applies one client message. Raises nothing; problems are reported to the client."""
+        if conn.dropped:
+            return
+        self.messages_in += 1
+        if not self._take_token(conn):
+            self.rate_limited += 1
+            self._send(conn, '{"t":"error","code":"rate_limited"}')
+            return
+        try:
+            message = json.loads(text)
+            kind = message.get("t")
+        except (ValueError, AttributeError):
+            self._send(conn, '{"t":"error","code":"bad_message"}')
+            return
+
+        if kind == "score":
+            delta = message.get("d")
+            if not isinstance(delta, int) or isinstance(delta, bool) or abs(delta) > self.max_score_delta:
+                self._send(conn, '{"t":"error","code":"bad_delta"}')
+                return
+            self.add_score(conn.room, conn.uid, delta)
+        elif kind == "state":
+            self._send(conn, json.dumps(conn.room.state(), separators=(",", ":")))
+        elif kind == "ping":
+            self._send(conn, '{"t":"pong"}')
+        else:
+            self._send(conn, '{"t":"error","code":"unknown_type"}')
+
+    def add_score(self, room: Room, uid: str, delta: int) -> int:
+        player = room.players[uid]
+        player.score += delta
+        room.pending_scores[uid] = player.score
+        self._dirty[room.code] = room
+        return player.score
+
+    # --- outgoing messages ---
+
+    async def pump(self, conn: Connection, send: Callable[[str], Awaitable[None]],
+                   close: Callable[[int], Awaitable[None]]) -> None:
+        """Forwards queued messages to the socket until the connection is dropped."""
+        while True:
+            message = await conn.queue.get()
+            if message is None:
+                await close(4008)
+                return
+            await send(message)
+            self.messages_out += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rooms": len(self.rooms),
+            "connections": self.connections,
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "broadcasts": self.broadcasts,
+            "rate_limited": self.rate_limited,
+            "slow_disconnects": self.slow_disconnects,
+            "players_dropped": self.players_dropped,
+        }
+
+    # --- internal helpers ---
+
+    def _take_token(self, conn: Connection) -> bool:
+        now = time.monotonic()
+        conn.tokens = min(self.message_burst, conn.tokens + (now - conn.refilled_at) * self.messages_per_second)
+        conn.refilled_at = now
+        if conn.tokens < 1:
+            return False
+        conn.tokens -= 1
+        return True
+
+    def _broadcast(self, room: Room, diff: Dict[str, Any], skip: Optional[str] = None) -> None:
+        message = json.dumps(diff, separators=(",", ":"))
+        self.broadcasts += 1
+        for uid, conn in list(room.connections.items()):
+            if uid != skip:
+                self._send(conn, message)
+
+    def _drop_idle_players(self, room: Room, now: float) -> None:
+        """Forgets players who left over `player_grace_seconds` ago with nothing scored."""
+        idle = [p.uid for p in room.players.values()
+                if p.score == 0 and p.left_at is not None and now - p.left_at >= self.player_grace_seconds]
+        if not idle:
+            return
+        for uid in idle:
+            del room.players[uid]
+            room.pending_scores.pop(uid, None)
+        self.players_dropped += len(idle)
+        room.version += 1
+        self._broadcast(room, {"t": "gone", "v": room.version, "u": idle})
+
+    def _send(self, conn: Connection, message: str) -> None:
+        if conn.dropped:
+            return
+        try:
+            conn.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.slow_disconnects += 1
+            self._disconnect(conn)
+
+    def _disconnect(self, conn: Connection) -> None:
+        """Drops a subscriber: clears its backlog and tells its pump to close the socket."""
+        conn.dropped = True
+        while not conn.queue.empty():
+            conn.queue.get_nowait()
+        conn.queue.put_nowait(None)
+        self.leave(conn)
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        expired_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self.broadcast_interval)
+            self.flush()
+            if time.monotonic() - expired_at > ROOM_SWEEP_SECONDS:
+                self._expire_rooms()
+                expired_at = time.monotonic()
+
+    def flush(self) -> None:
+        """Broadcasts one coalesced score diff per room that changed since the last flush."""
+        dirty, self._dirty = self._dirty, {}
+        for room in dirty.values():
+            if not room.pending_scores:
+                continue
+            room.version += 1
+            scores, room.pending_scores = room.pending_scores, {}
+            self._broadcast(room, {"t": "score", "v": room.version, "s": scores})
+
+    def _expire_rooms(self) -> None:
+        now = time.monotonic()
+        expired = [code for code, room in self.rooms.items()
+                   if room.empty_since is not None and now - room.empty_since > self.room_ttl_seconds]
+        for code in expired:
+            del self.rooms[code]
+            self._dirty.pop(code, None)
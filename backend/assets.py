@@ -0,0 +1,384 @@
+# backend/assets.py
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:  # Optional: `pip install brotli` adds .br files next to the .gz ones.
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "static"))
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Output name -> source files (relative to static/), concatenated in order.
+# core.js is what the SPA shell needs to boot and to render the dashboard;
+# the rest are loaded by the router the first time their screen is shown.
+BUNDLES: Dict[str, List[str]] = {
+    "app.css": ["assets/styles.css"],
+    "forms.css": ["css/styles.css"],
+    "core.js": ["js/firebase-config.js", "js/router.js", "js/auth.js", "js/dashboard.js", "js/hall-of-fame.js"],
+    "academy.js": ["js/academy.js"],
+    "arcade.js": ["js/arcade.js"],
+    "arena.js": ["js/arena.js"],
+    "coach.js": ["js/coach.js"],
+    "profile.js": ["js/profile.js"],
+}
+
+ROUTE_CHUNKS: Dict[str, str] = {
+    "academyScreen": "academy.js",
+    "arcadeScreen": "arcade.js",
+    "arenaScreen": "arena.js",
+    "coachScreen": "coach.js",
+    "profileScreen": "profile.js",
+}
+
+# Precompressed variants, in order of preference when the client accepts several.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+# ==============================================================================
+# 1. MINIFIERS
+# ==============================================================================
+# Conservative on purpose: string, template and regex literals are set aside
+# untouched, comments are dropped, and whitespace is only removed where it
+# cannot change meaning. Line breaks between statements are kept, so
+# automatic semicolon insertion behaves exactly as in the source.
+
+_HOLE = "\0{}\0"
+_HOLE_RE = re.compile("\0(\\d+)\0")
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+                   "instanceof", "yield", "await"}
+_JS_PUNCT = re.compile(r" ?([{}()\[\];,:=<>?!&|*%]) ?")
+_JS_JOIN_AFTER = tuple("{;,([")
+_JS_JOIN_BEFORE = tuple("})].,;")
+
+
+def _skip_string(src: str, i: int) -> int:
+    """Index just past the quoted string starting at src[i]."""
+    quote, i = src[i], i + 1
+    while i < len(src) and src[i] != quote:
+        i += 2 if src[i] == "\\" else 1
+    return i + 1
+
+
+def _skip_template(src: str, i: int) -> int:
+    """Index just past the template literal starting at src[i], `${...}` included."""
+    i += 1
+    while i < len(src) and src[i] != "`":
+        if src[i] == "\\":
+            i += 2
+        elif src.startswith("${", i):
+            depth, i = 1, i + 2
+            while i < len(src) and depth:
+                c = src[i]
+                if c in "'\"":
+                    i = _skip_string(src, i)
+                elif c == "`":
+                    i = _skip_template(src, i)
+                else:
+                    depth += (c == "{") - (c == "}")
+                    i += 1
+        else:
+            i += 1
+    return i + 1
+
+
+def _skip_regex(src: str, i: int) -> int:
+    """Index just past the regex literal (flags included) starting at src[i]."""
+    i, in_class = i + 1, False
+    while i < len(src) and src[i] != "\n":
+        c = src[i]
+        if c == "\\":
+            i += 1
+        elif c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            break
+        i += 1
+    i += 1
+    while i < len(src) and (src[i].isalnum() or src[i] == "_"):
+        i += 1
+    return i
+
+
+def _starts_regex(code: str) -> bool:
+    """Whether a `/` following `code` (literals already set aside) opens a regex rather than dividing."""
+    stripped = code.rstrip()
+    if not stripped:
+        return True
+    if stripped[-1] in _REGEX_AFTER:
+        return True
+    word = re.search(r"[A-Za-z_$][\w$]*$", stripped)
+    return bool(word) and word.group(0) in _REGEX_KEYWORDS
+
+
+def _set_aside_literals(src: str, css: bool = False) -> Tuple[str, List[str]]:
+    """Replaces literals with numbered holes and drops comments."""
+    out: List[str] = []
+    literals: List[str] = []
+    i, start = 0, 0
+    while i < len(src):
+        c = src[i]
+        if c in "'\"" or (c == "`" and not css):
+            end = _skip_string(src, i) if c != "`" else _skip_template(src, i)
+        elif src.startswith("/*", i):
+            end = src.find("*/", i + 2)
+            end = len(src) if end < 0 else end + 2
+            out.append(src[start:i])
+            out.append("\n" if "\n" in src[i:end] else " ")
+            i = start = end
+            continue
+        elif not css and src.startswith("//", i):
+            end = src.find("\n", i)
+            end = len(src) if end < 0 else end
+            out.append(src[start:i])
+            i = start = end
+            continue
+        elif not css and c == "/" and _starts_regex("".join(out[-4:]) + src[start:i]):
+            end = _skip_regex(src, i)
+        else:
+            i += 1
+            continue
+        out.append(src[start:i])
+        out.append(_HOLE.format(len(literals)))
+        literals.append(src[i:end])
+        i = start = end
+    out.append(src[start:])
+    return "".join(out), literals
+
+
+def _restore_literals(code: str, literals: List[str]) -> str:
+    return _HOLE_RE.sub(lambda m: literals[int(m.group(1))], code)
+
+
+def minify_js(source: str) -> str:
+    code, literals = _set_aside_literals(source)
+    lines: List[str] = []
+    for line in code.split("\n"):
+        line = _JS_PUNCT.sub(r"\1", re.sub(r"[ \t]+", " ", line.strip()))
+        if not line:
+            continue
+        if lines and (lines[-1].endswith(_JS_JOIN_AFTER) or line.startswith(_JS_JOIN_BEFORE)):
+            lines[-1] += line
+        else:
+            lines.append(line)
+    return _restore_literals("\n".join(lines), literals)
+
+
+def minify_css(source: str) -> str:
+    code, literals = _set_aside_literals(source, css=True)
+    code = re.sub(r"\s+", " ", code)
+    # Not around ':' before it (`a :hover` is a different selector) or '+'/'-' (calc()).
+    code = re.sub(r" ?([{};,>]) ?", r"\1", code)
+    code = re.sub(r": ", ":", code).replace(";}", "}")
+    return _restore_literals(code.strip(), literals)
+
+
+# ==============================================================================
+# 2. BUILD
+# ==============================================================================
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def bundle_source(sources: Iterable[str], static_dir: str = STATIC_DIR) -> str:
+    parts = []
+    for name in sources:
+        with open(os.path.join(static_dir, name), encoding="utf-8") as f:
+            parts.append(f.read())
+    # Classic scripts share one global scope, so concatenating them changes nothing
+    # as long as one file's last statement can't run into the next file's first.
+    return "\n;\n".join(parts) if sources and sources[0].endswith(".js") else "\n".join(parts)
+
+
+def build(static_dir: str = STATIC_DIR, bundles: Dict[str, List[str]] = BUNDLES) -> Dict[str, dict]:
+    """
+    Writes each bundle minified to static/dist/<name>.<hash>.<ext>, with .gz
+    (and .br, when brotli is installed) next to it, and a manifest.json
+    mapping bundle names to those files. Files from the previous build are
+    kept so pages rendered before the deploy can still load theirs; anything
+    older is removed.
+    """
+    dist = os.path.join(static_dir, DIST_DIRNAME)
+    os.makedirs(dist, exist_ok=True)
+    previous = AssetBundle(static_dir).manifest()
+
+    manifest: Dict[str, dict] = {}
+    for name, sources in bundles.items():
+        text = bundle_source(sources, static_dir)
+        minified = minify_css(text) if name.endswith(".css") else minify_js(text)
+        data = minified.encode("utf-8")
+        digest = content_hash(data)
+        stem, ext = os.path.splitext(name)
+        filename = f"{stem}.{digest}{ext}"
+        variants = {"identity": len(data)}
+        _write(os.path.join(dist, filename), data)
+        _write(os.path.join(dist, filename + SUFFIXES["gzip"]), gzip.compress(data, 9, mtime=0))
+        variants["gzip"] = os.path.getsize(os.path.join(dist, filename + SUFFIXES["gzip"]))
+        if brotli is not None:
+            _write(os.path.join(dist, filename + SUFFIXES["br"]), brotli.compress(data, quality=11))
+            variants["br"] = os.path.getsize(os.path.join(dist, filename + SUFFIXES["br"]))
+        manifest[name] = {"file": filename, "hash": digest, "source_bytes": len(text.encode("utf-8")),
+                          "bytes": variants}
+
+    keep = {MANIFEST_NAME}
+    for entry in list(manifest.values()) + list(previous.values()):
+        keep.update(entry["file"] + suffix for suffix in ("", *SUFFIXES.values()))
+    for leftover in set(os.listdir(dist)) - keep:
+        os.remove(os.path.join(dist, leftover))
+
+    _write(os.path.join(dist, MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+def _write(path: str, data: bytes) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# ==============================================================================
+# 3. SERVING
+# ==============================================================================
+
+class AssetBundle:
+    """
+    What the templates and the /dist/ route need from a build.
+
+    Without a build (no static/dist/manifest.json) the templates get the
+    individual source files, all loaded up front, so development needs no
+    extra step. The manifest is re-read when its mtime changes, so a build
+    takes effect without a restart. Built files are held in memory, all
+    encodings, since they are small and served with every page load.
+    """
+
+    def __init__(self, static_dir: str = STATIC_DIR, url_prefix: str = "/dist/", static_url: str = "/static/"):
+        self.static_dir = static_dir
+        self.dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+        self.url_prefix = url_prefix
+        self.static_url = static_url
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, dict] = {}
+        self._mtime: Optional[float] = None
+        self._files: Dict[Tuple[str, str], bytes] = {}
+
+        self.served = {"identity": 0, "gzip": 0, "br": 0}
+        self.not_modified = 0
+        self.not_found = 0
+
+    def manifest(self) -> Dict[str, dict]:
+        path = os.path.join(self.dist_dir, MANIFEST_NAME)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._manifest = self._read_manifest(path) if mtime is not None else {}
+                    self._files = {}
+                    self._mtime = mtime
+        return self._manifest
+
+    @property
+    def built(self) -> bool:
+        return bool(self.manifest())
+
+    def urls(self, name: str) -> List[str]:
+        """URLs to include for bundle `name`: its built file, or its sources."""
+        entry = self.manifest().get(name)
+        if entry is not None:
+            return [self.url_prefix + entry["file"]]
+        return [self.static_url + source for source in BUNDLES[name]]
+
+    def scripts(self) -> List[str]:
+        """Script URLs the SPA shell loads up front."""
+        if self.built:
+            return self.urls("core.js")
+        return [url for name in BUNDLES if name.endswith(".js") for url in self.urls(name)]
+
+    def route_chunks(self) -> Dict[str, str]:
+        """Screen id -> script URL the router loads on first visit (empty without a build)."""
+        if not self.built:
+            return {}
+        return {screen: self.urls(name)[0] for screen, name in ROUTE_CHUNKS.items()}
+
+    def lookup(self, filename: str, accepted: Iterable[str]) -> Optional[Tuple[bytes, str, str, str]]:
+        """
+        The (body, content encoding, ETag, mimetype) to send for a built file,
+        picking the best precompressed variant in `accepted`, or None.
+        """
+        entry = next((e for e in self.manifest().values() if e["file"] == filename), None)
+        if entry is None:
+            self.not_found += 1
+            return None
+        accepted = set(accepted)
+        encoding = next((e for e in ENCODINGS if e in accepted and e in entry["bytes"]), "identity")
+        body = self._load(filename, encoding)
+        if body is None:
+            self.not_found += 1
+            return None
+        self.served[encoding] += 1
+        etag = entry["hash"] if encoding == "identity" else f"{entry['hash']}-{encoding}"
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return body, encoding, etag, mimetype
+
+    def stats(self) -> Dict[str, object]:
+        manifest = self.manifest()
+        return {
+            "built": bool(manifest),
+            "bundles": {name: entry["bytes"] for name, entry in manifest.items()},
+            "served": dict(self.served),
+            "not_modified": self.not_modified,
+            "not_found": self.not_found,
+        }
+
+    # --- internal helpers ---
+
+    def _read_manifest(self, path: str) -> Dict[str, dict]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable asset manifest {path}: {e}")
+            return {}
+
+    def _load(self, filename: str, encoding: str) -> Optional[bytes]:
+        key = (filename, encoding)
+        body = self._files.get(key)
+        if body is None:
+            path = os.path.join(self.dist_dir, filename + SUFFIXES.get(encoding, ""))
+            try:
+                with open(path, "rb") as f:
+                    body = f.read()
+            except OSError:
+                return None
+            self._files[key] = body
+        return body
+
+
+# ==============================================================================
+# 4. COMMAND LINE
+# ==============================================================================
+
+if __name__ == "__main__":
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else STATIC_DIR
+    for name, entry in build(static_dir).items():
+        sizes = ", ".join(f"{enc} {size:,} B" for enc, size in entry["bytes"].items())
+        print(f"{name:<12} -> {DIST_DIRNAME}/{entry['file']:<24} source {entry['source_bytes']:,} B, {sizes}")
+    if brotli is None:
+        print("brotli not installed: wrote gzip variants only (pip install brotli for .br)")
@@ -0,0 +1,471 @@
+# backend/calculator.py
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# ==============================================================================
+# 1. ERRORS & INPUT COLUMNS
+# ==============================================================================
+
+# Requests may carry this many scenarios; a 100k batch still takes well under a second.
+MAX_SCENARIOS = 100_000
+# EMI schedules are one row per year per loan, so only a few loans may ask for one.
+MAX_SCHEDULES = 100
+
+PPF_MAX_YEARLY = 150_000
+PPF_MIN_YEARS = 15
+
+
+class CalculatorError(ValueError):
+    """Bad calculator input; the message is safe to show to the user."""
+
+
+def _column(scenarios: List[Dict[str, Any]], name: str, default: Optional[float]) -> np.ndarray:
+    """One input field of every scenario as a float array (`default` None = required)."""
+    try:
+        values = np.fromiter((s.get(name, default) for s in scenarios), dtype=float, count=len(scenarios))
+    except (TypeError, ValueError):
+        for i, s in enumerate(scenarios):
+            value = s.get(name, default)
+            if value is None:
+                raise CalculatorError(f"scenario {i}: {name} is required")
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                raise CalculatorError(f"scenario {i}: {name} must be a number, got {value!r}")
+        raise
+    finite = np.isfinite(values)
+    if not finite.all():
+        # NumPy reads a missing field (None) as NaN.
+        missing = [i for i, s in enumerate(scenarios) if s.get(name, default) is None]
+        if missing:
+            raise CalculatorError(f"scenario {missing[0]}: {name} is required")
+    _check(finite, f"{name} must be a finite number")
+    return values
+
+
+def _check(ok: np.ndarray, message: str) -> None:
+    """Raises CalculatorError naming the first scenario where `ok` is False."""
+    if not ok.all():
+        raise CalculatorError(f"scenario {int(np.argmin(ok))}: {message}")
+
+
+def _check_rate(rate: np.ndarray, name: str = "annual_rate") -> None:
+    _check((rate >= 0) & (rate <= 100), f"{name} is a percentage between 0 and 100")
+
+
+def _check_years(years: np.ndarray, limit: float = 100) -> None:
+    _check((years > 0) & (years <= limit), f"years must be more than 0 and at most {limit:g}")
+
+
+# ==============================================================================
+# 2. FORMULAS (vectorized: every argument is an array with one entry per scenario)
+# ==============================================================================
+
+def _annuity_due(i: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Future value of 1 paid at the start of each of `n` periods at rate `i` per period."""
+    safe_i = np.where(i == 0, 1.0, i)
+    return np.where(i == 0, n, (np.power(1 + i, n) - 1) / safe_i * (1 + i))
+
+
+def _geometric_sum(q: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """1 + q + ... + q**(n-1)."""
+    near_one = np.abs(q - 1) < 1e-12
+    safe = np.where(near_one, 0.5, q)
+    return np.where(near_one, n, (1 - np.power(safe, n)) / (1 - safe))
+
+
+def lumpsum_value(principal: np.ndarray, annual_rate: np.ndarray, years: np.ndarray,
+                  compounding: np.ndarray) -> Dict[str, np.ndarray]:
+    """One-time investment compounded `compounding` times a year (FDs, bonds, index funds)."""
+    _check(principal >= 0, "principal must not be negative")
+    _check_rate(annual_rate)
+    _check_years(years)
+    _check(np.isin(compounding, (1, 2, 4, 12, 365)), "compounding must be 1, 2, 4, 12 or 365 times a year")
+    value = principal * np.power(1 + annual_rate / 100 / compounding, compounding * years)
+    return {"invested": principal, "value": value, "gains": value - principal}
+
+
+def sip_value(monthly: np.ndarray, annual_rate: np.ndarray, years: np.ndarray,
+              step_up: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Monthly SIP paid at the start of each month, compounded monthly. With
+    `step_up` (% per year) the instalment rises once every 12 months, so
+    year k pays monthly * (1 + step_up)**k per month.
+    """
+    _check(monthly >= 0, "monthly must not be negative")
+    _check_rate(annual_rate)
+    _check_years(years)
+    _check((step_up >= 0) & (step_up <= 100), "step_up is a percentage between 0 and 100")
+    i = annual_rate / 1200
+    g = step_up / 100
+    months = np.round(years * 12)
+    full_years, extra_months = np.divmod(months, 12)
+
+    # Each full year is a 12-month annuity grown to the end; their sum is geometric in k.
+    year_factor = _annuity_due(i, 12)
+    q = (1 + g) / np.power(1 + i, 12)
+    value = (monthly * year_factor * np.power(1 + i, months - 12) * _geometric_sum(q, full_years)
+             + monthly * np.power(1 + g, full_years) * _annuity_due(i, extra_months))
+    invested = (monthly * 12 * _geometric_sum(1 + g, full_years)
+                + monthly * np.power(1 + g, full_years) * extra_months)
+    return {"invested": invested, "value": value, "gains": value - invested}
+
+
+def emi_value(principal: np.ndarray, annual_rate: np.ndarray, years: np.ndarray) -> Dict[str, np.ndarray]:
+    """Equated monthly instalment of a reducing-balance loan."""
+    _check(principal > 0, "principal must be more than 0")
+    _check_rate(annual_rate)
+    _check_years(years, limit=50)
+    i = annual_rate / 1200
+    months = np.maximum(np.round(years * 12), 1)
+    growth = np.power(1 + i, months)
+    emi = np.where(i == 0, principal / months, principal * i * growth / np.where(i == 0, 1.0, growth - 1))
+    total = emi * months
+    return {"emi": emi, "total_interest": total - principal, "total_payment": total, "months": months}
+
+
+def ppf_value(yearly: np.ndarray, annual_rate: np.ndarray, years: np.ndarray) -> Dict[str, np.ndarray]:
+    """PPF with the deposit made at the start of each financial year, compounded yearly."""
+    _check((yearly >= 500) & (yearly <= PPF_MAX_YEARLY), f"yearly must be between 500 and {PPF_MAX_YEARLY}")
+    _check_rate(annual_rate)
+    _check((years >= PPF_MIN_YEARS) & (years <= 50) & ((years - PPF_MIN_YEARS) % 5 == 0),
+           "a PPF account runs 15 years and can be extended in blocks of 5 years")
+    value = yearly * _annuity_due(annual_rate / 100, years)
+    invested = yearly * years
+    return {"invested": invested, "value": value, "interest": value - invested}
+
+
+def nps_value(monthly: np.ndarray, current_age: np.ndarray, retirement_age: np.ndarray, annual_rate: np.ndarray,
+              step_up: np.ndarray, annuity_share: np.ndarray, annuity_rate: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    NPS contributions until `retirement_age`. At least 40% of the corpus
+    must buy an annuity (paying `annuity_rate` a year); the rest can be
+    withdrawn as a lump sum.
+    """
+    _check((current_age >= 18) & (current_age < retirement_age),
+           "current_age must be 18 or more and below retirement_age")
+    _check(retirement_age <= 75, "retirement_age must be at most 75")
+    _check((annuity_share >= 40) & (annuity_share <= 100), "annuity_share must be between 40 and 100 percent")
+    _check_rate(annuity_rate, "annuity_rate")
+    years = np.floor(retirement_age - current_age)
+    sip = sip_value(monthly, annual_rate, years, step_up)
+    annuity_corpus = sip["value"] * annuity_share / 100
+    return {
+        "years": years,
+        "invested": sip["invested"],
+        "corpus": sip["value"],
+        "lump_sum": sip["value"] - annuity_corpus,
+        "annuity_corpus": annuity_corpus,
+        "monthly_pension": annuity_corpus * annuity_rate / 1200,
+    }
+
+
+def emi_schedule(principal: float, annual_rate: float, years: float) -> List[Dict[str, float]]:
+    """Year-by-year amortization of one loan: principal and interest paid, balance left."""
+    i = annual_rate / 1200
+    months = max(int(round(years * 12)), 1)
+    emi = float(emi_value(np.array([principal]), np.array([annual_rate]), np.array([years]))["emi"][0])
+    k = np.arange(months + 1)
+    growth = np.power(1 + i, k)
+    balance = principal - emi * k if i == 0 else principal * growth - emi * (growth - 1) / i
+    balance = np.maximum(balance, 0.0)
+    interest = balance[:-1] * i
+    starts = np.arange(0, months, 12)
+    yearly_interest = np.add.reduceat(interest, starts)
+    paid = np.add.reduceat(np.full(months, emi), starts)
+    ends = np.minimum(starts + 12, months)
+    return [
+        {"year": year + 1, "paid": round(float(p), 2), "principal": round(float(p - interest_), 2),
+         "interest": round(float(interest_), 2), "balance": round(float(balance[end]), 2)}
+        for year, (p, interest_, end) in enumerate(zip(paid, yearly_interest, ends))
+    ]
+
+
+# ==============================================================================
+# 3. BATCH API
+# ==============================================================================
+
+# kind -> (formula, {field: default}); None marks a required field. Rates are in percent.
+CALCULATORS: Dict[str, Tuple[Callable[..., Dict[str, np.ndarray]], Dict[str, Optional[float]]]] = {
+    "lumpsum": (lumpsum_value, {"principal": None, "annual_rate": None, "years": None, "compounding": 1}),
+    "sip": (sip_value, {"monthly": None, "annual_rate": None, "years": None, "step_up": 0}),
+    "emi": (emi_value, {"principal": None, "annual_rate": None, "years": None}),
+    "ppf": (ppf_value, {"yearly": None, "annual_rate": 7.1, "years": PPF_MIN_YEARS}),
+    "nps": (nps_value, {"monthly": None, "current_age": None, "retirement_age": 60, "annual_rate": 10,
+                        "step_up": 0, "annuity_share": 40, "annuity_rate": 6}),
+}
+
+
+def calculate(kind: str, scenarios: Any) -> List[Dict[str, Any]]:
+    """
+    Runs one calculator over a list of scenarios (dicts of its fields) in a
+    single vectorized pass. Results are in the same order, rounded to paise.
+    EMI scenarios with "schedule": true also get a yearly amortization table.
+    """
+    if kind not in CALCULATORS:
+        raise CalculatorError(f"unknown calculator {kind!r}; use one of {', '.join(CALCULATORS)}")
+    if not isinstance(scenarios, list) or not scenarios:
+        raise CalculatorError("scenarios must be a non-empty list")
+    if len(scenarios) > MAX_SCENARIOS:
+        raise CalculatorError(f"at most {MAX_SCENARIOS} scenarios per request")
+    if not all(isinstance(s, dict) for s in scenarios):
+        raise CalculatorError("each scenario must be an object")
+
+    formula, fields = CALCULATORS[kind]
+    outputs = formula(**{name: _column(scenarios, name, default) for name, default in fields.items()})
+    names = list(outputs)
+    columns = [np.round(outputs[name], 2).tolist() for name in names]
+    results = [dict(zip(names, row)) for row in zip(*columns)]
+
+    if kind == "emi":
+        wanted = [i for i, s in enumerate(scenarios) if s.get("schedule")]
+        if len(wanted) > MAX_SCHEDULES:
+            raise CalculatorError(f"at most {MAX_SCHEDULES} scenarios may ask for a schedule")
+        for i in wanted:
+            s = scenarios[i]
+            results[i]["schedule"] = emi_schedule(float(s["principal"]), float(s["annual_rate"]), float(s["years"]))
+    return results
+
+
+# ==============================================================================
+# 4. NUMERIC QUESTIONS IN CHAT
+# ==============================================================================
+
+# Rates shown side by side when the question doesn't name one.
+ILLUSTRATIVE_RATES = (8.0, 10.0, 12.0)
+DISCLAIMER = "_This is for educational purposes only. Consult a SEBI-registered advisor for personal advice._"
+
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5,
+                "crore": 1e7, "crores": 1e7, "cr": 1e7}
+_AMOUNT = re.compile(
+    r"(?:₹|\brs\.?|\binr)\s*(\d[\d,]*(?:\.\d+)?)\s*(k|thousand|lakhs?|lacs?|crores?|cr)?\b"
+    r"|\b(\d[\d,]*(?:\.\d+)?)\s*(k|thousand|lakhs?|lacs?|crores?|cr|rupees)\b",
+    re.IGNORECASE,
+)
+# A bare number that isn't a rate, a duration or an age ("SIP of 10000 per month").
+_BARE_AMOUNT = re.compile(r"\b(\d[\d,]*(?:\.\d+)?)\b(?![.\d]|\s*(?:%|percent|per cent|years?|yrs?|months?))",
+                          re.IGNORECASE)
+_STEP_UP = re.compile(r"step[\s-]?up(?:\s+of)?\s+(\d+(?:\.\d+)?)\s*%|(\d+(?:\.\d+)?)\s*%\s*(?:annual\s+|yearly\s+)?"
+                      r"(?:step[\s-]?up|increase|increment|top[\s-]?up)", re.IGNORECASE)
+_RATE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:%|percent|per cent)", re.IGNORECASE)
+_AGE = re.compile(r"(\d{2})\s*(?:years?|yrs?)\s*old|\bage(?:d| of)?\s*(\d{2})\b|\bi(?:'m| am)\s*(\d{2})\b",
+                  re.IGNORECASE)
+_RETIRE = re.compile(r"retir\w*\s*(?:at|by)\s*(?:age\s*)?(\d{2})", re.IGNORECASE)
+_YEARS = re.compile(r"(\d+(?:\.\d+)?)\s*(?:years?|yrs?)\b", re.IGNORECASE)
+_MONTHS = re.compile(r"(\d+)\s*months?\b", re.IGNORECASE)
+_MONTHLY = re.compile(r"per\s*month|a\s*month|/\s*(?:month|mo)\b|monthly|every\s*month|each\s*month|\bp\.?m\b",
+                      re.IGNORECASE)
+_YEARLY = re.compile(r"per\s*(?:year|annum)|a\s*year|/\s*(?:year|yr)\b|yearly|annually|every\s*year|each\s*year"
+                     r"|\bp\.?a\b", re.IGNORECASE)
+# Only forward projections are answered ("how much will ₹5000/month become in 20 years?").
+_ASKS_NUMBER = re.compile(r"\bhow much (?:will|would|does|do|can)\b|\bwhat (?:will|would)\b|\bcalculat|\bcompute\b"
+                          r"|\bbecome\b|\bgrow\b|\bworth\b|\bmaturity\b|\bcorpus\b|\bpension\b|\bemi\b"
+                          r"|\bfuture value\b", re.IGNORECASE)
+# Goal and budgeting questions ("how much should I save to reach 1 crore?", "I earn 40000 per month")
+# name a target or an income, not an instalment, so they go to the model.
+_GOAL = re.compile(r"\breach\b|\bneed\b|\bbuy\b|\bafford\b|\btarget\b|\bgoal\b|\bearn|\bsalary\b|\bincome\b"
+                   r"|\bshould i\b|\bhow much (?:to|must i|have to)\b|\bto (?:get|have|accumulate|build|save up)\b",
+                   re.IGNORECASE)
+# Inflation questions ("what will 1 lakh be worth in 10 years with 6% inflation?") ask for value
+# lost, not growth; the calculator only compounds forward, so these go to the model too.
+_REAL_VALUE = re.compile(r"\binflat|\breal (?:value|terms|returns?)\b|\bpurchasing power\b"
+                         r"|\btoday'?s (?:money|rupees?|terms|value)\b|\bpresent value\b", re.IGNORECASE)
+
+
+def format_inr(amount: float) -> str:
+    """Whole rupees with Indian digit grouping: ₹12,34,567."""
+    sign = "-" if amount < 0 else ""
+    digits = str(int(round(abs(amount))))
+    if len(digits) > 3:
+        head, tail = digits[:-3], digits[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        digits = ",".join([head] + groups + [tail])
+    return f"{sign}₹{digits}"
+
+
+def _pct(rate: float) -> str:
+    return f"{rate:g}%"
+
+
+def _find_amount(text: str) -> Optional[Tuple[float, int, int]]:
+    """(rupees, start, end) of the amount in `text`: one with ₹/Rs/lakh/crore, else the first plain number >= 100."""
+    match = _AMOUNT.search(text)
+    if match is not None:
+        number = match.group(1) or match.group(3)
+        unit = (match.group(2) or match.group(4) or "").lower()
+        return float(number.replace(",", "")) * _MULTIPLIERS.get(unit, 1), match.start(), match.end()
+    for match in _BARE_AMOUNT.finditer(text):
+        value = float(match.group(1).replace(",", ""))
+        if value >= 100:
+            return value, match.start(), match.end()
+    return None
+
+
+def _table(header: List[str], rows: List[List[str]]) -> str:
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    lines += ["| " + " | ".join(row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def answer_question(text: str) -> Optional[str]:
+    """
+    Answers questions like "how much will ₹5000/month become in 20 years?"
+    or "EMI for a 10 lakh loan at 9% for 5 years" with exact figures in the
+    coach's Markdown style. Returns None for anything it can't compute,
+    and for goal questions ("how much should I save to reach ...") whose
+    number is a target or an income rather than an instalment, and for
+    inflation / real-value questions; those go to the model as usual.
+    """
+    if not text or len(text) > 500 or not _ASKS_NUMBER.search(text) or _GOAL.search(text):
+        return None
+    if _REAL_VALUE.search(text):
+        return None
+    lowered = text.lower()
+
+    found = _find_amount(text)
+    if found is None:
+        return None
+    amount, start, end = found
+    rest = text[:start] + " " + text[end:]
+
+    step_up = 0.0
+    step_match = _STEP_UP.search(rest)
+    if step_match:
+        step_up = float(step_match.group(1) or step_match.group(2))
+        rest = rest[:step_match.start()] + " " + rest[step_match.end():]
+    rate_match = _RATE.search(rest)
+    rate = float(rate_match.group(1)) if rate_match else None
+
+    current_age = retirement_age = None
+    retire_match = _RETIRE.search(rest)
+    if retire_match:
+        retirement_age = float(retire_match.group(1))
+        rest = rest[:retire_match.start()] + " " + rest[retire_match.end():]
+    age_match = _AGE.search(rest)
+    if age_match:
+        current_age = float(next(g for g in age_match.groups() if g))
+        rest = rest[:age_match.start()] + " " + rest[age_match.end():]
+    years_match = _YEARS.search(rest)
+    months_match = _MONTHS.search(rest)
+    years = float(years_match.group(1)) if years_match else None
+    if years is None and months_match:
+        years = int(months_match.group(1)) / 12
+
+    monthly = bool(_MONTHLY.search(text))
+    yearly = bool(_YEARLY.search(text))
+
+    try:
+        if re.search(r"\bemi\b|\bloan\b", lowered):
+            if years is None or rate is None:
+                return None
+            return _answer_emi(amount, rate, years)
+        if re.search(r"\bppf\b", lowered):
+            return _answer_ppf(amount * 12 if monthly else amount, rate, years)
+        if re.search(r"\bnps\b", lowered):
+            if current_age is None and years is not None:
+                current_age = (retirement_age or 60) - years
+            if current_age is None:
+                return None
+            return _answer_nps(amount / 12 if yearly and not monthly else amount, current_age,
+                               retirement_age or 60, rate, step_up)
+        if years is None:
+            return None
+        if monthly or re.search(r"\bsip\b", lowered):
+            return _answer_sip(amount, rate, years, step_up)
+        if re.search(r"\binvest|\bdeposit|\bfd\b|fixed deposit|lump\s*sum|\bbecome\b|\bgrow\b|\bworth\b", lowered):
+            return _answer_lumpsum(amount, rate, years)
+    except CalculatorError:
+        return None
+    return None
+
+
+def _rates(rate: Optional[float]) -> List[float]:
+    return [rate] if rate is not None else list(ILLUSTRATIVE_RATES)
+
+
+def _assumed(rate: Optional[float]) -> str:
+    if rate is not None:
+        return ""
+    return (f"You didn't mention a return, so here are {', '.join(_pct(r) for r in ILLUSTRATIVE_RATES)} "
+            "a year side by side.\n\n")
+
+
+def _answer_sip(monthly: float, rate: Optional[float], years: float, step_up: float) -> str:
+    rates = _rates(rate)
+    results = calculate("sip", [{"monthly": monthly, "annual_rate": r, "years": years, "step_up": step_up}
+                                for r in rates])
+    step = f", rising {_pct(step_up)} every year" if step_up else ""
+    rows = [[_pct(r), format_inr(x["invested"]), format_inr(x["value"]), format_inr(x["gains"])]
+            for r, x in zip(rates, results)]
+    return (
+        f"## SIP of {format_inr(monthly)}/month for {years:g} years{step}\n\n"
+        f"{_assumed(rate)}"
+        f"{_table(['Expected return', 'You invest', 'Estimated value', 'Gains'], rows)}\n\n"
+        "- Assumes each instalment is paid at the start of the month and returns compound monthly.\n"
+        "- Market-linked returns vary from year to year; this is an estimate, not a promise.\n\n"
+        f"{DISCLAIMER}"
+    )
+
+
+def _answer_lumpsum(principal: float, rate: Optional[float], years: float) -> str:
+    rates = _rates(rate)
+    results = calculate("lumpsum", [{"principal": principal, "annual_rate": r, "years": years} for r in rates])
+    rows = [[_pct(r), format_inr(x["value"]), format_inr(x["gains"])] for r, x in zip(rates, results)]
+    return (
+        f"## {format_inr(principal)} invested once for {years:g} years\n\n"
+        f"{_assumed(rate)}"
+        f"{_table(['Return per year', 'Estimated value', 'Gains'], rows)}\n\n"
+        "- Assumes returns compound once a year and nothing is withdrawn.\n\n"
+        f"{DISCLAIMER}"
+    )
+
+
+def _answer_emi(principal: float, rate: float, years: float) -> str:
+    (result,) = calculate("emi", [{"principal": principal, "annual_rate": rate, "years": years}])
+    return (
+        f"## EMI for a {format_inr(principal)} loan at {_pct(rate)} for {years:g} years\n\n"
+        f"- **Monthly EMI:** {format_inr(result['emi'])}\n"
+        f"- **Total interest:** {format_inr(result['total_interest'])}\n"
+        f"- **Total repaid:** {format_inr(result['total_payment'])} over {int(result['months'])} months\n\n"
+        "Interest is charged on the reducing balance, so early EMIs are mostly interest. "
+        "A shorter tenure raises the EMI but cuts the total interest.\n\n"
+        f"{DISCLAIMER}"
+    )
+
+
+def _answer_ppf(yearly: float, rate: Optional[float], years: Optional[float]) -> str:
+    rate = 7.1 if rate is None else rate
+    years = PPF_MIN_YEARS if years is None else years
+    (result,) = calculate("ppf", [{"yearly": yearly, "annual_rate": rate, "years": years}])
+    return (
+        f"## PPF: {format_inr(yearly)} a year for {years:g} years at {_pct(rate)}\n\n"
+        f"- **You invest:** {format_inr(result['invested'])}\n"
+        f"- **Maturity value:** {format_inr(result['value'])}\n"
+        f"- **Interest earned (tax-free):** {format_inr(result['interest'])}\n\n"
+        "Assumes you deposit before 5 April each year and the rate stays the same; "
+        "the government revises it every quarter.\n\n"
+        f"{DISCLAIMER}"
+    )
+
+
+def _answer_nps(monthly: float, current_age: float, retirement_age: float, rate: Optional[float],
+                step_up: float) -> str:
+    rates = _rates(rate)
+    results = calculate("nps", [{"monthly": monthly, "current_age": current_age, "retirement_age": retirement_age,
+                                 "annual_rate": r, "step_up": step_up} for r in rates])
+    rows = [[_pct(r), format_inr(x["corpus"]), format_inr(x["lump_sum"]), format_inr(x["monthly_pension"])]
+            for r, x in zip(rates, results)]
+    return (
+        f"## NPS: {format_inr(monthly)}/month from age {current_age:g} to {retirement_age:g}\n\n"
+        f"{_assumed(rate)}"
+        f"{_table(['Expected return', 'Corpus at retirement', 'Lump sum (60%)', 'Monthly pension'], rows)}\n\n"
+        f"- You invest {format_inr(results[0]['invested'])} in total.\n"
+        "- At least 40% of the corpus must buy an annuity; the pension assumes a 6% annuity rate.\n\n"
+        f"{DISCLAIMER}"
+    )
@@ -0,0 +1,14 @@
+# backend/concurrency.py
+
+
+# ==============================================================================
+# 1. ERRORS
+# ==============================================================================
+
+class Saturated(Exception):
+    """Raised when both the running slots and the waiting queue are full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
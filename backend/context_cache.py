@@ -0,0 +1,191 @@
+# backend/context_cache.py
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# create() returns the cachedContents name and its expiry (epoch seconds).
+Registration = Tuple[str, float]
+
+
+# ==============================================================================
+# 1. ERRORS FROM STALE HANDLES
+# ==============================================================================
+
+def is_missing_cache_error(exc: BaseException) -> bool:
+    """
+    True when Gemini rejected a request because its cachedContent is gone or
+    not ours: any 404, or a 400/403 whose message names the cachedContent
+    (other 400/403s, like a bad API key, are not fixed by resending inline).
+    """
+    code = getattr(exc, "code", None)
+    if not isinstance(code, int):
+        code = getattr(exc, "status_code", None)
+    if code == 404:
+        return True
+    message = str(exc).lower()
+    return code in (400, 403) and ("cachedcontent" in message or "cached content" in message)
+
+
+def expiry_of(cached: Any, ttl_seconds: float) -> float:
+    """Epoch expiry of an SDK CachedContent, assuming `ttl_seconds` if it has none."""
+    expire_time = getattr(cached, "expire_time", None)
+    if expire_time is not None:
+        return expire_time.timestamp()
+    return time.time() + ttl_seconds
+
+
+# ==============================================================================
+# 2. CONTEXT CACHE REGISTRY
+# ==============================================================================
+
+class _Entry:
+    __slots__ = ("version", "name", "expires_at", "failed_at", "error")
+
+    def __init__(self, version: str):
+        self.version = version
+        self.name: Optional[str] = None
+        self.expires_at = 0.0
+        self.failed_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+class ContextCache:
+    """
+    Remembers one Gemini cachedContents handle per model for a fixed prefix
+    (the persona system instruction), so requests can reference it instead
+    of resending the text.
+
+    A handle is re-registered when it is within `refresh_margin` seconds of
+    expiring, when the instruction text changes, or after invalidate() (a
+    request found it gone). If registration fails (the API refuses prefixes
+    below a minimum size, for example) callers get None and send the
+    instruction inline; the next attempt waits `retry_after_failure` seconds.
+    Replaced handles are left to expire on their own.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, refresh_margin: float = 60, retry_after_failure: float = 600,
+                 clock: Callable[[], float] = time.time):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = min(refresh_margin, ttl_seconds / 2)
+        self.retry_after_failure = retry_after_failure
+        self._clock = clock
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+
+        self.registrations = 0
+        self.failures = 0
+        self.invalidations = 0
+        self.hits = 0
+        self.inline = 0
+
+    @staticmethod
+    def version(model: str, instruction: str) -> str:
+        return hashlib.sha256(f"{model}\0{instruction}".encode("utf-8")).hexdigest()[:16]
+
+    def lookup(self, model: str, instruction: str) -> Optional[str]:
+        """The live handle for this model and instruction, or None. Never calls the API."""
+        entry = self._entries.get(model)
+        if entry is None or entry.name is None or entry.version != self.version(model, instruction):
+            return None
+        if entry.expires_at - self.refresh_margin <= self._clock():
+            return None
+        return entry.name
+
+    def due(self, model: str, instruction: str) -> bool:
+        """Whether a registration should be attempted now (no live handle, not backing off)."""
+        if self.lookup(model, instruction) is not None:
+            return False
+        entry = self._entries.get(model)
+        if entry is None or entry.version != self.version(model, instruction) or entry.failed_at is None:
+            return True
+        return self._clock() - entry.failed_at >= self.retry_after_failure
+
+    def ensure(self, model: str, instruction: str, create: Callable[[], Registration]) -> Optional[str]:
+        """Returns a live handle, registering one with `create` if needed; None means send inline."""
+        handle = self._fast_path(model, instruction)
+        if handle is not None or not self.due(model, instruction):
+            return handle
+        with self._lock:
+            if not self.due(model, instruction):
+                return self._count(self.lookup(model, instruction))
+            try:
+                return self._count(self._registered(model, instruction, *create()))
+            except Exception as e:
+                return self._failed(model, instruction, e)
+
+    async def aensure(self, model: str, instruction: str,
+                      create: Callable[[], Awaitable[Registration]]) -> Optional[str]:
+        """ensure() for the event loop: one registration at a time, others wait for its result."""
+        handle = self._fast_path(model, instruction)
+        if handle is not None or not self.due(model, instruction):
+            return handle
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            if not self.due(model, instruction):
+                return self._count(self.lookup(model, instruction))
+            try:
+                return self._count(self._registered(model, instruction, *await create()))
+            except Exception as e:
+                return self._failed(model, instruction, e)
+
+    def invalidate(self, name: str) -> None:
+        """Forgets a handle the API no longer knows; the next request registers a new one."""
+        for entry in self._entries.values():
+            if entry.name == name:
+                entry.name = None
+                entry.expires_at = 0.0
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "handles": {
+                model: {"name": e.name, "expires_in": round(max(e.expires_at - now, 0.0), 1) if e.name else None,
+                        "last_error": e.error}
+                for model, e in self._entries.items()
+            },
+            "hits": self.hits,
+            "inline": self.inline,
+            "registrations": self.registrations,
+            "failures": self.failures,
+            "invalidations": self.invalidations,
+        }
+
+    # --- internal helpers ---
+
+    def _fast_path(self, model: str, instruction: str) -> Optional[str]:
+        handle = self.lookup(model, instruction)
+        if handle is not None:
+            self.hits += 1
+        elif not self.due(model, instruction):
+            self.inline += 1
+        return handle
+
+    def _count(self, handle: Optional[str]) -> Optional[str]:
+        if handle is not None:
+            self.hits += 1
+        else:
+            self.inline += 1
+        return handle
+
+    def _registered(self, model: str, instruction: str, name: str, expires_at: float) -> str:
+        entry = _Entry(self.version(model, instruction))
+        entry.name = name
+        entry.expires_at = expires_at
+        self._entries[model] = entry
+        self.registrations += 1
+        return name
+
+    def _failed(self, model: str, instruction: str, error: Exception) -> None:
+        entry = _Entry(self.version(model, instruction))
+        entry.failed_at = self._clock()
+        entry.error = str(error)[:200]
+        self._entries[model] = entry
+        self.failures += 1
+        self.inline += 1
+        print(f"Context cache registration for {model} failed, sending the instruction inline: {error}")
+        return None
@@ -0,0 +1,131 @@
+# backend/history.py
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# ==============================================================================
+# 1. TOKEN ESTIMATE
+# ==============================================================================
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English/Hinglish text)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+# ==============================================================================
+# 2. SUMMARY PROMPTS
+# ==============================================================================
+
+SUMMARY_INSTRUCTION = (
+    "You compress chat transcripts between a student and Finny, a financial literacy coach. "
+    "Write a short factual summary in plain sentences: topics covered, what the student "
+    "understood or struggled with, any numbers or goals they shared, and open questions. "
+    "Do not add advice. Stay under {words} words."
+)
+
+
+def build_summary_prompt(previous_summary: str, messages: List[Tuple[str, str]]) -> str:
+    transcript = "\n".join(f"{'Student' if role == 'user' else 'Finny'}: {text}" for role, text in messages)
+    if previous_summary:
+        return f"Summary so far:\n{previous_summary}\n\nNew messages to fold in:\n{transcript}"
+    return f"Transcript:\n{transcript}"
+
+
+def fallback_summary(previous_summary: str, messages: List[Tuple[str, str]], max_chars: int) -> str:
+    """Extractive summary used when the model can't be reached: keeps the student's questions."""
+    lines = [previous_summary] if previous_summary else []
+    for role, text in messages:
+        if role == "user":
+            lines.append(f"Student asked: {text[:200]}")
+    summary = "\n".join(lines)
+    # Keep the most recent part; the oldest context matters least.
+    return summary[-max_chars:]
+
+
+# ==============================================================================
+# 3. CONVERSATION HISTORY WITH ROLLING SUMMARY
+# ==============================================================================
+
+class ConversationHistory:
+    """
+    The part of a conversation that is resent to Gemini on every turn.
+
+    The last `keep_turns` exchanges are kept verbatim. Once the estimated
+    size of summary + messages exceeds `token_budget`, everything older is
+    folded into a rolling summary, so the prompt stops growing with the
+    length of the conversation. Folding is two-step (take_foldable, then
+    fold) so the summary can be produced by an async or sync model call.
+    """
+
+    def __init__(self, keep_turns: int = 6, token_budget: int = 3000, summary_max_tokens: int = 400):
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+
+        self.messages: List[Tuple[str, str]] = []  # (role, text), role is "user" or "model"
+        self.summary = ""
+        self.turns = 0
+        self.folded_messages = 0
+        self.last_prompt_tokens = 0
+
+    def add_exchange(self, user_text: str, model_text: str) -> None:
+        self.messages.append(("user", user_text))
+        self.messages.append(("model", model_text))
+        self.turns += 1
+
+    def token_count(self) -> int:
+        return estimate_tokens(self.summary) + sum(estimate_tokens(text) for _, text in self.messages)
+
+    def approx_bytes(self) -> int:
+        return len(self.summary.encode("utf-8")) + sum(len(text.encode("utf-8")) for _, text in self.messages)
+
+    def needs_compaction(self) -> bool:
+        return self.token_count() > self.token_budget and len(self.messages) > self.keep_turns * 2
+
+    def take_foldable(self) -> List[Tuple[str, str]]:
+        """Messages that would be folded into the summary (everything but the recent turns)."""
+        return list(self.messages[:max(0, len(self.messages) - self.keep_turns * 2)])
+
+    def fold(self, folded: List[Tuple[str, str]], new_summary: str) -> None:
+        """Replaces `folded` (a prefix of the history) with `new_summary`."""
+        if self.messages[:len(folded)] != folded:
+            # History changed underneath us; a later turn will compact again.
+            return
+        del self.messages[:len(folded)]
+        self.summary = new_summary.strip()[-self.summary_max_tokens * 4:]
+        self.folded_messages += len(folded)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly state, for keeping conversations in a shared store."""
+        return {
+            "messages": [list(m) for m in self.messages],
+            "summary": self.summary,
+            "turns": self.turns,
+            "folded_messages": self.folded_messages,
+            "last_prompt_tokens": self.last_prompt_tokens,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **limits: int) -> "ConversationHistory":
+        """Rebuilds a history saved by to_dict(); `limits` are the constructor arguments."""
+        history = cls(**limits)
+        history.messages = [(role, text) for role, text in data.get("messages", [])]
+        history.summary = data.get("summary", "")
+        history.turns = data.get("turns", 0)
+        history.folded_messages = data.get("folded_messages", 0)
+        history.last_prompt_tokens = data.get("last_prompt_tokens", 0)
+        return history
+
+    def summary_instruction(self) -> str:
+        return SUMMARY_INSTRUCTION.format(words=int(self.summary_max_tokens * 0.75))
+
+    def contents(self, new_message: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Gemini `contents` for the next request: summary, recent turns, new message."""
+        contents = []
+        if self.summary:
+            contents.append({"role": "user", "parts": [{"text": f"(Summary of our earlier conversation: {self.summary})"}]})
+            contents.append({"role": "model", "parts": [{"text": "Got it, I'll keep that in mind."}]})
+        for role, text in self.messages:
+            contents.append({"role": role, "parts": [{"text": text}]})
+        if new_message is not None:
+            contents.append({"role": "user", "parts": [{"text": new_message}]})
+        return contents
@@ -0,0 +1,572 @@
+# backend/importer.py
+import csv
+import datetime
+import hashlib
+import io
+import itertools
+import json
+import os
+import queue
+import re
+import secrets
+import tempfile
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.ledger import CATEGORIES, LedgerBusy, make_expense
+
+
+class ImportFormatError(ValueError):
+    """The file is not a CSV we can find date and amount columns in."""
+
+
+# ==============================================================================
+# 1. COLUMN DETECTION
+# ==============================================================================
+
+# Header names seen in expense-tracker exports and Indian bank statements,
+# normalized to lower-case words ("Withdrawal Amt." -> "withdrawal amt").
+COLUMN_ALIASES = {
+    "date": ("date", "transaction date", "txn date", "tran date", "value date", "posting date",
+             "booking date", "timestamp"),
+    "description": ("description", "narration", "particulars", "remarks", "details", "transaction details",
+                    "merchant", "payee", "memo", "note", "notes", "name"),
+    "amount": ("amount", "amt", "transaction amount", "amount inr", "amount rs"),
+    "debit": ("debit", "debit amount", "debit amt", "withdrawal", "withdrawals", "withdrawal amt",
+              "withdrawal amount", "dr", "paid out", "money out"),
+    "credit": ("credit", "credit amount", "credit amt", "deposit", "deposits", "deposit amt", "deposit amount",
+               "cr", "paid in", "money in"),
+    "type": ("type", "dr cr", "cr dr", "transaction type", "txn type", "debit credit"),
+    "category": ("category",),
+}
+
+# Statements often start with account details before the real header row.
+MAX_PREAMBLE_ROWS = 30
+
+
+def _normalize_header(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", name.lower()).strip()
+
+
+def detect_columns(header: Sequence[str]) -> Optional[Dict[str, int]]:
+    """Maps fields to column indexes, or None unless a date and an amount/debit column are present."""
+    names = [_normalize_header(h) for h in header]
+    columns: Dict[str, int] = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for i, name in enumerate(names):
+            if name in aliases and i not in columns.values():
+                columns[field] = i
+                break
+    # Second pass for decorated names such as "amount in rs" or "narration details".
+    for field, aliases in COLUMN_ALIASES.items():
+        if field in columns:
+            continue
+        for i, name in enumerate(names):
+            if i not in columns.values() and any(name.startswith(alias + " ") for alias in aliases):
+                columns[field] = i
+                break
+    if "date" not in columns or not ("amount" in columns or "debit" in columns):
+        return None
+    return columns
+
+
+# ==============================================================================
+# 2. DATES AND AMOUNTS
+# ==============================================================================
+
+DAY_FIRST_FORMATS = ("%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%d-%m-%y", "%d.%m.%Y", "%d.%m.%y")
+MONTH_FIRST_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%m-%d-%y")
+NAMED_MONTH_FORMATS = ("%Y/%m/%d", "%d %b %Y", "%d-%b-%Y", "%d-%b-%y", "%d %b %y", "%d %B %Y", "%b %d, %Y",
+                       "%B %d, %Y", "%d/%b/%Y")
+TIME_SUFFIXES = ("", " %H:%M:%S", " %H:%M", " %I:%M %p", " %I:%M:%S %p")
+
+
+class DateParser:
+    """
+    Parses the date formats banks export. ISO dates are tried first; for
+    dd/mm vs mm/dd, `day_first` decides (Indian statements are day-first).
+    The last format that worked is tried first, since a file uses one, and
+    recent results are cached: statements repeat each date many times.
+    """
+
+    def __init__(self, day_first: bool = True):
+        numeric = DAY_FIRST_FORMATS if day_first else MONTH_FIRST_FORMATS
+        self.formats = [date + time_part for date in numeric + NAMED_MONTH_FORMATS for time_part in TIME_SUFFIXES]
+        self._last: Optional[str] = None
+        self._cache: Dict[str, Tuple[datetime.datetime, bool]] = {}
+
+    def parse(self, text: str) -> Tuple[datetime.datetime, bool]:
+        """Returns (datetime, has_time). Raises ValueError."""
+        result = self._cache.get(text)
+        if result is None:
+            if len(self._cache) >= 1024:
+                self._cache.clear()
+            result = self._cache[text] = self._parse(" ".join(text.split()))
+        return result
+
+    def _parse(self, text: str) -> Tuple[datetime.datetime, bool]:
+        if self._last is not None:
+            try:
+                return datetime.datetime.strptime(text, self._last), self._last.endswith(("S", "M", "p"))
+            except ValueError:
+                pass
+        try:
+            value = datetime.datetime.fromisoformat(text)
+            return value.replace(tzinfo=None), "T" in text or ":" in text
+        except ValueError:
+            pass
+        for fmt in self.formats:
+            try:
+                value = datetime.datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            self._last = fmt
+            return value, fmt.endswith(("S", "M", "p"))
+        raise ValueError(f"unrecognized date {text[:40]!r}")
+
+
+DEBIT_WORDS = frozenset(("dr", "debit", "d", "withdrawal", "debited", "expense", "payment", "purchase"))
+CREDIT_WORDS = frozenset(("cr", "credit", "c", "deposit", "credited", "income", "refund", "reversal"))
+_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_amount(text: str) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Parses "₹1,234.50", "(250.00)", "-99", "250,00", "1,200.00 Dr". Returns (signed
+    amount or None if blank, "debit"/"credit" if the text says so).
+    """
+    text = text.strip()
+    if not text or text in ("-", "--"):
+        return None, None
+    lowered = text.lower()
+    direction = None
+    if lowered.endswith(("dr", "cr")):
+        direction = "debit" if lowered.endswith("dr") else "credit"
+        lowered = lowered[:-2].rstrip(" .")
+    negative = lowered.startswith("(") or "-" in lowered
+    head, comma, cents = lowered.rpartition(",")
+    if comma and "." not in lowered and len(cents.strip(" )-")) == 2:
+        lowered = f"{head}.{cents}"  # decimal comma: "250,00"
+    number = _NUMBER.search(lowered)
+    if number is None:
+        raise ValueError(f"unrecognized amount {text[:40]!r}")
+    amount = float(number.group().replace(",", ""))
+    return (-amount if negative else amount), direction
+
+
+# ==============================================================================
+# 3. CATEGORY RULES
+# ==============================================================================
+
+# Checked in order; the first category with a matching keyword wins. Keywords
+# match whole words (plural "s" allowed), so "uber" matches "UPI-UBER-TRIP"
+# but "bus" does not match "business".
+DEFAULT_RULES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("savings", ("sip", "mutual fund", "mf", "groww", "zerodha", "ppf", "nps", "fixed deposit", "recurring deposit",
+                 "rd", "fd", "kuvera", "coin by zerodha")),
+    ("bills", ("electricity", "bescom", "tneb", "msedcl", "water bill", "gas bill", "broadband", "recharge", "airtel",
+               "jio", "vodafone", "vi", "bsnl", "act fibernet", "dth", "tata play", "rent", "emi", "insurance", "lic",
+               "premium", "credit card bill", "cc payment", "bill", "tuition", "school fee", "college fee",
+               "maintenance")),
+    ("food", ("swiggy", "zomato", "restaurant", "cafe", "café", "coffee", "starbucks", "dominos", "domino's",
+              "pizza", "mcdonald", "kfc", "burger", "dhaba", "bakery", "canteen", "mess", "food", "blinkit",
+              "zepto", "instamart", "bigbasket", "grocery", "groceries", "dmart", "kirana", "chai", "tea")),
+    ("transport", ("uber", "ola", "rapido", "metro", "irctc", "railway", "redbus", "bus", "auto", "taxi", "cab",
+                   "petrol", "diesel", "fuel", "hpcl", "bpcl", "indian oil", "iocl", "fastag", "parking", "toll",
+                   "indigo", "air india", "akasa", "spicejet", "flight")),
+    ("entertainment", ("netflix", "spotify", "prime video", "hotstar", "jiocinema", "youtube premium", "bookmyshow",
+                       "pvr", "inox", "cinema", "movie", "steam", "playstation", "xbox", "gaming", "concert",
+                       "event")),
+    ("shopping", ("amazon", "flipkart", "myntra", "ajio", "meesho", "nykaa", "tata cliq", "croma", "reliance digital",
+                  "decathlon", "ikea", "mall", "store", "shop", "mart", "fashion", "apparel", "electronics")),
+)
+
+
+class RuleEngine:
+    """Keyword rules mapping a transaction description to one of the ledger's categories."""
+
+    def __init__(self, rules: Iterable[Tuple[str, Iterable[str]]] = DEFAULT_RULES):
+        self.rules: List[Tuple[str, "re.Pattern[str]"]] = []
+        for category, keywords in rules:
+            if category not in CATEGORIES:
+                raise ValueError(f"unknown category {category!r} in import rules")
+            alternatives = "|".join(re.escape(k.lower()) for k in sorted(keywords, key=len, reverse=True))
+            if alternatives:
+                self.rules.append((category, re.compile(rf"(?<![a-z0-9])(?:{alternatives})s?(?![a-z0-9])")))
+
+    @classmethod
+    def from_file(cls, path: Optional[str]) -> "RuleEngine":
+        """Default rules, preceded by the user's own from a JSON file {"food": ["canteen", ...]}."""
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            custom = json.load(f)
+        return cls(list(custom.items()) + list(DEFAULT_RULES))
+
+    def categorize(self, description: str, hint: Optional[str] = None) -> str:
+        """An explicit category column wins when it names a known category."""
+        if hint:
+            hint = hint.strip().lower()
+            if hint in CATEGORIES:
+                return hint
+            # e.g. "Food & Dining" in another app's export
+            description = f"{hint} {description}"
+        text = description.lower()
+        for category, pattern in self.rules:
+            if pattern.search(text):
+                return category
+        return "other"
+
+
+# ==============================================================================
+# 4. STREAMING PIPELINE
+# ==============================================================================
+
+# Rows whose amount sign is inspected to decide what a signed amount column means.
+SIGN_LOOKAHEAD_ROWS = 200
+
+
+def csv_rows(stream: BinaryIO) -> Iterator[Tuple[int, List[str]]]:
+    """(line number, fields) for every row; the dialect is sniffed from the first few KB."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    head = []
+    size = 0
+    while size < 16384:
+        line = text.readline()
+        if not line:
+            break
+        head.append(line)
+        size += len(line)
+    try:
+        dialect = csv.Sniffer().sniff("".join(head), delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(itertools.chain(head, text), dialect)
+    try:
+        for row in reader:
+            if any(field.strip() for field in row):
+                yield reader.line_num, row
+    finally:
+        text.detach()  # leave the caller's file open
+
+
+def statement_records(rows: Iterator[Tuple[int, List[str]]], job: "ImportJob",
+                      dates: DateParser) -> Iterator[Dict[str, Any]]:
+    """
+    Finds the header row, then yields one record per outgoing transaction:
+    {"line", "when", "has_time", "amount", "description", "category"}.
+    Incoming money (salary, refunds) is skipped; unreadable rows are
+    recorded on the job as errors.
+    """
+    columns = None
+    for line, row in itertools.islice(rows, MAX_PREAMBLE_ROWS):
+        columns = detect_columns(row)
+        if columns is not None:
+            break
+    if columns is None:
+        raise ImportFormatError("Could not find a header with date and amount columns.")
+
+    # A single signed amount column means different things in different
+    # exports: bank exports show spending as negative, expense trackers as
+    # positive. Whichever sign most of the first rows have is the spending;
+    # the other sign is refunds and income.
+    lookahead = list(itertools.islice(rows, SIGN_LOOKAHEAD_ROWS))
+    negative_spending = False
+    if "amount" in columns:
+        balance = 0
+        for _, row in lookahead:
+            try:
+                value, _ = parse_amount(_field(row, columns["amount"]))
+            except ValueError:
+                continue
+            if value:
+                balance += 1 if value < 0 else -1
+        negative_spending = balance > 0
+
+    for line, row in itertools.chain(lookahead, rows):
+        job.rows += 1
+        try:
+            amount = _outgoing_amount(row, columns, negative_spending)
+            if amount is None:
+                job.skipped += 1
+                continue
+            when, has_time = dates.parse(_field(row, columns["date"]))
+        except ValueError as e:
+            job.error(line, str(e))
+            continue
+        yield {
+            "line": line,
+            "when": when,
+            "has_time": has_time,
+            "amount": amount,
+            "description": _field(row, columns.get("description")),
+            "category": _field(row, columns.get("category")),
+        }
+
+
+def _field(row: List[str], index: Optional[int]) -> str:
+    return row[index].strip() if index is not None and index < len(row) else ""
+
+
+def _outgoing_amount(row: List[str], columns: Dict[str, int], negative_spending: bool) -> Optional[float]:
+    """The amount spent in this row, or None for incoming money and blank rows."""
+    if "debit" in columns:
+        debit, _ = parse_amount(_field(row, columns["debit"]))
+        if debit:
+            return abs(debit)
+        if "amount" not in columns:
+            return None
+    value, direction = parse_amount(_field(row, columns["amount"]))
+    if not value:
+        return None
+    kind = _field(row, columns.get("type")).lower()
+    if kind in DEBIT_WORDS:
+        direction = "debit"
+    elif kind in CREDIT_WORDS:
+        direction = "credit"
+    if direction is None:
+        direction = "debit" if (value < 0) == negative_spending else "credit"
+    return abs(value) if direction == "debit" else None
+
+
+def fingerprinted(records: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Adds a fingerprint that is the same every time the same statement is
+    imported: date, amount, description and how many identical rows came
+    before it that day (two identical coffees are two expenses). Counts are
+    kept for the current date only, so memory stays flat for date-ordered
+    statements.
+    """
+    day = None
+    seen: Dict[Tuple[int, str], int] = {}
+    for record in records:
+        when = record["when"]
+        if when.date() != day:
+            day = when.date()
+            seen.clear()
+        cents = int(round(record["amount"] * 100))
+        description = " ".join(record["description"].lower().split())
+        occurrence = seen.get((cents, description), 0)
+        seen[(cents, description)] = occurrence + 1
+        key = f"{when.isoformat()}|{cents}|{description}|{occurrence}"
+        record["fingerprint"] = hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest()
+        yield record
+
+
+def to_expenses(records: Iterator[Dict[str, Any]], user_id: Any, rules: RuleEngine, job: "ImportJob",
+                tz: datetime.timezone) -> Iterator[Dict[str, Any]]:
+    """Categorizes records and turns them into ledger expenses."""
+    for record in records:
+        # Date-only rows are placed at mid-day so they fall on the same date in the rollups.
+        when = record["when"] if record["has_time"] else record["when"].replace(hour=12)
+        category = rules.categorize(record["description"], record["category"])
+        try:
+            expense = make_expense(user_id, record["amount"], category, record["description"],
+                                   when.replace(tzinfo=tz).timestamp())
+        except ValueError as e:
+            job.error(record["line"], str(e))
+            continue
+        expense["fingerprint"] = record["fingerprint"]
+        yield expense
+
+
+def batched(items: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def save_upload(source: BinaryIO, max_bytes: int, directory: Optional[str] = None) -> Tuple[str, int]:
+    """
+    Copies an upload to a temporary file in chunks (never the whole body in
+    memory). Returns (path, size). Raises ValueError past `max_bytes`.
+    """
+    fd, path = tempfile.mkstemp(prefix="finsense-import-", suffix=".csv", dir=directory)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(64 * 1024)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"File is larger than {max_bytes // (1024 * 1024)} MB.")
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, size
+
+
+# ==============================================================================
+# 5. IMPORT JOBS
+# ==============================================================================
+
+MAX_ERROR_SAMPLES = 20
+
+
+class ImportJob:
+    """Progress of one upload; counters are updated by the import thread as it goes."""
+
+    def __init__(self, user_id: Any, filename: str, size: int):
+        self.id = secrets.token_urlsafe(9)
+        self.user_id = str(user_id)
+        self.filename = filename
+        self.size = size
+        self.status = "queued"  # -> running -> done | failed
+        self.message = ""
+        self.bytes_read = 0
+        self.rows = 0
+        self.queued = 0  # handed to the ledger's writer
+        self.imported = 0  # committed: set once the last batch is flushed
+        self.duplicates = 0
+        self.skipped = 0
+        self.errors = 0
+        self.error_samples: List[Dict[str, Any]] = []
+        self.categories = {category: 0 for category in CATEGORIES}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def error(self, line: int, message: str) -> None:
+        self.errors += 1
+        if len(self.error_samples) < MAX_ERROR_SAMPLES:
+            self.error_samples.append({"line": line, "error": message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        finished = self.status in ("done", "failed")
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "message": self.message,
+            "progress": 1.0 if finished else round(self.bytes_read / self.size, 4) if self.size else 0.0,
+            "rows": self.rows,
+            "queued": self.queued,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "error_samples": self.error_samples,
+            "categories": self.categories,
+            "elapsed_seconds": round(elapsed, 2),
+        }
+
+
+class ExpenseImporter:
+    """
+    Imports CSV expense exports and bank statements in the background.
+
+    Uploads are saved to a temporary file and processed by one worker
+    thread as a chain of generators: CSV rows -> statement records ->
+    fingerprints -> categorized expenses -> batches. Only one batch is in
+    memory at a time, so a 100k-row file costs the same RAM as a 1k-row
+    one. Each batch drops rows whose fingerprint the user already has (a
+    re-upload imports nothing twice) and is handed to the ledger's writer,
+    which commits it as one transaction.
+    """
+
+    def __init__(self, ledger, rules: Optional[RuleEngine] = None, batch_size: int = 1000, max_jobs: int = 100,
+                 utc_offset_minutes: int = 0, day_first: bool = True):
+        self.ledger = ledger
+        self.rules = rules or RuleEngine()
+        self.batch_size = batch_size
+        self.max_jobs = max_jobs
+        self.tz = datetime.timezone(datetime.timedelta(minutes=utc_offset_minutes))
+        self.day_first = day_first
+
+        self._jobs: Dict[str, ImportJob] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[ImportJob, str]]]" = queue.Queue()
+        self._closing = False
+        self._worker = threading.Thread(target=self._run, name="expense-importer", daemon=True)
+        self._worker.start()
+
+    def submit(self, user_id: Any, path: str, filename: str = "upload.csv") -> ImportJob:
+        """Queues the file at `path` for import; it is deleted once processed."""
+        job = ImportJob(user_id, filename, os.path.getsize(path))
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        self._queue.put((job, path))
+        return job
+
+    def get(self, job_id: str, user_id: Any) -> Optional[ImportJob]:
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.user_id == str(user_id) else None
+
+    def run(self, job: ImportJob, path: str) -> ImportJob:
+        """Imports one file synchronously (the worker thread calls this)."""
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            with open(path, "rb") as f:
+                records = statement_records(csv_rows(f), job, DateParser(self.day_first))
+                expenses = to_expenses(fingerprinted(records), job.user_id, self.rules, job, self.tz)
+                for batch in batched(expenses, self.batch_size):
+                    if self._closing:
+                        raise LedgerBusy("Import stopped: the server is shutting down.")
+                    known = self.ledger.existing_fingerprints(job.user_id, [e["fingerprint"] for e in batch])
+                    fresh = [e for e in batch if e["fingerprint"] not in known]
+                    self.ledger.append(fresh)
+                    job.duplicates += len(batch) - len(fresh)
+                    job.queued += len(fresh)
+                    for e in fresh:
+                        job.categories[e["category"]] += 1
+                    job.bytes_read = f.tell()
+            # Report "done" only once the last batch is committed.
+            if not self.ledger.flush(timeout=60):
+                raise LedgerBusy(f"Import timed out waiting for the ledger to commit; {job.queued} rows "
+                                 "were queued and may still be saved.")
+            job.imported = job.queued
+            job.status = "done"
+        except (ImportFormatError, LedgerBusy) as e:
+            job.status = "failed"
+            job.message = str(e)
+        except Exception as e:
+            print(f"Expense import {job.id} failed: {e}")
+            job.status = "failed"
+            job.message = "The file could not be imported."
+        finally:
+            job.finished_at = time.time()
+        return job
+
+    def close(self) -> None:
+        self._closing = True
+        self._queue.put(None)
+        self._worker.join(timeout=10)
+
+    def stats(self) -> Dict[str, int]:
+        jobs = list(self._jobs.values())
+        return {
+            "jobs": len(jobs),
+            "running": sum(1 for j in jobs if j.status == "running"),
+            "queued": sum(1 for j in jobs if j.status == "queued"),
+            "rows_imported": sum(j.imported for j in jobs),
+            "duplicates": sum(j.duplicates for j in jobs),
+        }
+
+    def _evict(self) -> None:
+        # Forget the oldest finished jobs beyond max_jobs (dicts keep insertion order).
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [j.id for j in self._jobs.values() if j.status in ("done", "failed")][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job, path = item
+            try:
+                self.run(job, path)
+            finally:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
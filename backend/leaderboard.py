@@ -0,0 +1,325 @@
+# backend/leaderboard.py
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+# ==============================================================================
+# 1. INDEXABLE SKIP LIST
+# ==============================================================================
+
+MAX_LEVELS = 16          # enough for ~4^16 entries at p=0.25
+LEVEL_PROBABILITY = 0.25
+
+_END = (math.inf,)       # compares greater than every (-xp, user_id) key
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: Tuple, levels: int):
+        self.key = key
+        self.next: List["_Node"] = [None] * levels
+        # width[l] = number of level-0 steps from this node to next[l]
+        self.width: List[int] = [0] * levels
+
+
+def _random_levels() -> int:
+    levels = 1
+    while levels < MAX_LEVELS and random.random() < LEVEL_PROBABILITY:
+        levels += 1
+    return levels
+
+
+class RankedSkipList:
+    """
+    Sorted keys with O(log n) insert, remove, rank-of-key and key-at-rank.
+
+    Every forward link also stores how many positions it skips, so ranks are
+    found by summing link widths on the way down, like an order-statistic
+    tree. Positions are 0-based.
+    """
+
+    def __init__(self):
+        self._tail = _Node(_END, 0)
+        self._head = _Node(None, MAX_LEVELS)
+        self._head.next = [self._tail] * MAX_LEVELS
+        self._head.width = [1] * MAX_LEVELS
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def insert(self, key: Tuple) -> None:
+        chain = [None] * MAX_LEVELS
+        steps_at_level = [0] * MAX_LEVELS
+        node = self._head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = _random_levels()
+        new = _Node(key, levels)
+        steps = 0
+        for level in range(levels):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key: Tuple) -> None:
+        chain = [None] * MAX_LEVELS
+        node = self._head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def index(self, key: Tuple) -> int:
+        """Position of `key`; raises KeyError if absent."""
+        node = self._head
+        position = -1
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        if node.next[0].key != key:
+            raise KeyError(key)
+        return position + 1
+
+    def slice(self, start: int, count: int) -> List[Tuple]:
+        """Up to `count` keys from position `start`: O(log n + count)."""
+        if start >= self.size or count <= 0:
+            return []
+        start = max(start, 0)
+        node = self._head
+        remaining = start + 1
+        for level in reversed(range(MAX_LEVELS)):
+            while node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        keys = []
+        while node is not self._tail and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+    def __iter__(self) -> Iterator[Tuple]:
+        node = self._head.next[0]
+        while node is not self._tail:
+            yield node.key
+            node = node.next[0]
+
+    @classmethod
+    def from_sorted(cls, keys: List[Tuple]) -> "RankedSkipList":
+        """Builds the list from already sorted keys in O(n), without searching."""
+        skiplist = cls()
+        last = [skiplist._head] * MAX_LEVELS
+        last_position = [0] * MAX_LEVELS
+        for position, key in enumerate(keys, start=1):
+            node = _Node(key, _random_levels())
+            for level in range(len(node.next)):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level] = node
+                last_position[level] = position
+        end = len(keys) + 1
+        for level in range(MAX_LEVELS):
+            last[level].next[level] = skiplist._tail
+            last[level].width[level] = end - last_position[level]
+        skiplist.size = len(keys)
+        return skiplist
+
+
+# ==============================================================================
+# 2. XP LEADERBOARD
+# ==============================================================================
+
+class Leaderboard:
+    """
+    XP ranking for all users, kept in memory and snapshotted to disk.
+
+    Users are ordered by XP (highest first), ties broken by user ID. Adding
+    XP is a remove + insert in the skip list, so increments, rank lookups and
+    top-K/neighbour pages all cost O(log n) (+ page size). A background thread
+    writes a snapshot at most every `snapshot_interval` seconds while there
+    are changes; on restart the sorted snapshot is rebuilt in linear time.
+    """
+
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, path: Optional[str] = None, snapshot_interval: float = 30):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self._xp: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}
+        self._ranking = RankedSkipList()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.increments = 0
+        self.snapshots = 0
+        self.last_snapshot_seconds = 0.0
+        self.load_seconds = 0.0
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._xp)
+
+    # --- updates ---
+
+    def add_xp(self, user_id: Hashable, delta: int, name: Optional[str] = None) -> Dict[str, Any]:
+        """Adds `delta` XP (may be negative; XP never drops below 0). Returns the user's entry."""
+        user_id = str(user_id)
+        with self._lock:
+            old = self._xp.get(user_id)
+            new = max(0, (old or 0) + int(delta))
+            if old is not None:
+                self._ranking.remove((-old, user_id))
+            self._ranking.insert((-new, user_id))
+            self._xp[user_id] = new
+            if name:
+                self._names[user_id] = name
+            self.increments += 1
+            self._dirty = True
+            return self._entry(user_id, self._ranking.index((-new, user_id)))
+
+    def replace_all(self, xp: Dict[str, int], names: Optional[Dict[str, str]] = None) -> None:
+        """Replaces every entry at once: one O(n log n) sort, linear if already in rank order."""
+        keys = sorted((-value, user_id) for user_id, value in xp.items())
+        ranking = RankedSkipList.from_sorted(keys)
+        with self._lock:
+            self._ranking = ranking
+            self._xp = xp
+            self._names = names or {}
+            self._dirty = True
+
+    # --- queries ---
+
+    def top(self, k: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            keys = self._ranking.slice(offset, k)
+            return [self._entry(user_id, offset + i) for i, (_, user_id) in enumerate(keys)]
+
+    def rank(self, user_id: Hashable) -> Optional[Dict[str, Any]]:
+        """The user's entry with 1-based rank, or None if they have no XP recorded."""
+        user_id = str(user_id)
+        with self._lock:
+            xp = self._xp.get(user_id)
+            if xp is None:
+                return None
+            return self._entry(user_id, self._ranking.index((-xp, user_id)))
+
+    def around(self, user_id: Hashable, radius: int = 5) -> List[Dict[str, Any]]:
+        """The user plus up to `radius` users ranked directly above and below."""
+        user_id = str(user_id)
+        with self._lock:
+            xp = self._xp.get(user_id)
+            if xp is None:
+                return []
+            position = self._ranking.index((-xp, user_id))
+            start = max(0, position - radius)
+            keys = self._ranking.slice(start, position - start + radius + 1)
+            return [self._entry(uid, start + i) for i, (_, uid) in enumerate(keys)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._xp),
+            "increments": self.increments,
+            "snapshots": self.snapshots,
+            "last_snapshot_seconds": round(self.last_snapshot_seconds, 3),
+            "load_seconds": round(self.load_seconds, 3),
+        }
+
+    # --- persistence ---
+
+    def start(self) -> None:
+        if self._thread is None and self.path:
+            self._thread = threading.Thread(target=self._run, name="leaderboard-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.save()
+
+    def save(self) -> None:
+        """Writes the ranking in order (atomically replaces the previous snapshot)."""
+        if not self.path:
+            return
+        started = time.perf_counter()
+        with self._lock:
+            if not self._dirty:
+                return
+            users = [[user_id, -neg_xp, self._names.get(user_id, "")] for neg_xp, user_id in self._ranking]
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.SNAPSHOT_VERSION, "saved_at": time.time(), "users": users},
+                          f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self.snapshots += 1
+            self.last_snapshot_seconds = time.perf_counter() - started
+        except OSError as e:
+            self._dirty = True
+            print(f"Leaderboard snapshot failed: {e}")
+
+    # --- internal helpers ---
+
+    def _entry(self, user_id: str, position: int) -> Dict[str, Any]:
+        return {
+            "rank": position + 1,
+            "user_id": user_id,
+            "name": self._names.get(user_id, ""),
+            "xp": self._xp[user_id],
+        }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.snapshot_interval):
+            self.save()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        started = time.perf_counter()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            users = data.get("users", [])
+            xp = {str(user_id): int(value) for user_id, value, _ in users}
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Ignoring unreadable leaderboard snapshot {self.path}: {e}")
+            return
+        # Snapshots are written in rank order, so the sort is a linear pass.
+        self.replace_all(xp, {str(user_id): name for user_id, _, name in users if name})
+        self._dirty = False
+        self.load_seconds = time.perf_counter() - started
+        print(f"Leaderboard loaded {len(xp)} users in {self.load_seconds:.2f}s")
@@ -0,0 +1,348 @@
+# backend/ledger.py
+import math
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+
+# ==============================================================================
+# 1. EXPENSE RECORDS
+# ==============================================================================
+
+# The categories offered by templates/log_expense.html, plus a catch-all.
+CATEGORIES = ("food", "entertainment", "transport", "shopping", "bills", "savings", "other")
+
+MAX_AMOUNT = 1e9
+MAX_NOTE_LENGTH = 200
+# Expense times are accepted from 2000-01-01 (UTC) up to a day ahead (client clock skew, time zones).
+MIN_TIMESTAMP = 946684800.0
+MAX_FUTURE_SECONDS = 24 * 3600
+
+
+class LedgerBusy(Exception):
+    """Raised when the write-behind queue is full."""
+
+
+def normalize_category(category: Optional[str]) -> str:
+    category = (category or "").strip().lower()
+    return category if category in CATEGORIES else "other"
+
+
+def new_expense_id() -> str:
+    # Time-ordered ids keep inserts appending to the end of the primary key index.
+    return f"{time.time_ns():016x}{secrets.token_hex(4)}"
+
+
+def normalize_timestamp(timestamp: Any) -> float:
+    """Unix seconds of an expense; now if not given. Raises ValueError outside the accepted range."""
+    if timestamp is None:
+        return time.time()
+    try:
+        value = float(timestamp)
+    except (TypeError, ValueError):
+        raise ValueError("timestamp must be a number (Unix seconds)")
+    if not math.isfinite(value) or not MIN_TIMESTAMP <= value <= time.time() + MAX_FUTURE_SECONDS:
+        raise ValueError("timestamp must be between 2000-01-01 and tomorrow")
+    return value
+
+
+def make_expense(user_id: Any, amount: Any, category: Optional[str], note: Optional[str] = None,
+                 timestamp: Optional[float] = None) -> Dict[str, Any]:
+    """Validates and normalizes one expense. Raises ValueError on bad input."""
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        raise ValueError("amount must be a number")
+    if not math.isfinite(amount) or amount <= 0 or amount > MAX_AMOUNT:
+        raise ValueError("amount must be greater than 0")
+    return {
+        "id": new_expense_id(),
+        "user_id": str(user_id),
+        "amount": round(amount, 2),
+        "category": normalize_category(category),
+        "note": (note or "").strip()[:MAX_NOTE_LENGTH],
+        "timestamp": normalize_timestamp(timestamp),
+    }
+
+
+# ==============================================================================
+# 2. WRITE-BEHIND LEDGER (SQLITE WAL + GROUP COMMIT)
+# ==============================================================================
+
+class _Flush:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class ExpenseLedger:
+    """
+    Expense store backed by a local SQLite database in WAL mode.
+
+    Requests never touch the disk: `log()` validates the expense, puts it on
+    an in-memory queue and returns. A single writer thread drains the queue
+    and inserts up to `batch_size` expenses per transaction, waiting at most
+    `flush_interval` seconds for a batch to fill, so sustained logging costs
+    one commit per batch instead of one fsync per expense. With
+    synchronous=NORMAL a committed batch survives an application crash; only
+    an OS crash or power loss can drop the last few batches.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.05, max_queue: int = 100_000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS expenses ("
+            " id TEXT PRIMARY KEY,"
+            " user_id TEXT NOT NULL,"
+            " amount REAL NOT NULL,"
+            " category TEXT NOT NULL,"
+            " note TEXT NOT NULL DEFAULT '',"
+            " timestamp REAL NOT NULL,"
+            " fingerprint TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(expenses)")}
+        if "fingerprint" not in columns:  # databases created before CSV import
+            self._conn.execute("ALTER TABLE expenses ADD COLUMN fingerprint TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_expenses_user_ts_cat ON expenses (user_id, timestamp, category)"
+        )
+        # Imported rows carry a fingerprint; re-importing the same statement can't add them twice.
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_user_fingerprint ON expenses (user_id, fingerprint)"
+            " WHERE fingerprint IS NOT NULL"
+        )
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self.queued = 0
+        self.committed = 0
+        self.batches = 0
+        self.duplicates = 0
+        self.write_errors = 0
+
+        self._writer = threading.Thread(target=self._run, name="expense-ledger-writer", daemon=True)
+        self._writer.start()
+
+    # --- writes ---
+
+    def log(self, user_id: Any, amount: Any, category: Optional[str], note: Optional[str] = None,
+            timestamp: Optional[float] = None) -> Dict[str, Any]:
+        """Queues one expense and returns it (with its id). Raises ValueError or LedgerBusy."""
+        expense = make_expense(user_id, amount, category, note, timestamp)
+        self._enqueue([expense])
+        return expense
+
+    def log_many(self, user_id: Any, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Queues several expenses; all are validated before any is queued."""
+        expenses = [
+            make_expense(user_id, item.get("amount"), item.get("category"), item.get("note"), item.get("timestamp"))
+            for item in items
+        ]
+        self._enqueue(expenses)
+        return expenses
+
+    def append(self, expenses: List[Dict[str, Any]], timeout: Optional[float] = 30) -> None:
+        """
+        Queues expenses already built by make_expense(), waiting for room in
+        the queue instead of failing fast (bulk imports). Expenses with a
+        "fingerprint" key that is already stored for the user are dropped by
+        the writer. Raises LedgerBusy if there is still no room after `timeout`.
+        """
+        if self._closed:
+            raise LedgerBusy("Ledger is shutting down")
+        try:
+            for expense in expenses:
+                self._queue.put(expense, timeout=timeout)
+                self.queued += 1
+        except queue.Full:
+            raise LedgerBusy("Too many expenses waiting to be written")
+
+    def flush(self, timeout: Optional[float] = 10) -> bool:
+        """Blocks until everything queued so far is committed."""
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=30)
+        self._conn.close()
+
+    def subscribe(self, listener: Optional[Callable[[List[Dict[str, Any]]], None]],
+                  replay: Optional[Callable[[sqlite3.Connection], None]] = None) -> None:
+        """
+        Calls `listener` with every batch of expenses right after it commits.
+
+        `replay`, if given, runs first against the database under the same
+        lock, so a subscriber can load existing rows without missing or
+        double-counting a batch committed in between. A None listener only
+        runs the replay.
+        """
+        with self._db_lock:
+            if replay is not None:
+                replay(self._conn)
+            if listener is not None:
+                self._listeners.append(listener)
+
+    # --- reads ---
+
+    def recent(self, user_id: Any, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent committed expenses for a user (served by the (user_id, timestamp, ...) index)."""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, amount, category, note, timestamp FROM expenses"
+                " WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
+                (str(user_id), limit),
+            ).fetchall()
+        return [
+            {"id": r[0], "amount": r[1], "category": r[2], "note": r[3], "timestamp": r[4]}
+            for r in rows
+        ]
+
+    def committed_since(self, rowid: int, limit: int = 100_000) -> List[tuple]:
+        """
+        (rowid, user_id, timestamp, category, amount) of rows committed after
+        `rowid`, in commit order, including rows written by other processes.
+        """
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT rowid, user_id, timestamp, category, amount FROM expenses WHERE rowid > ?"
+                " ORDER BY rowid LIMIT ?",
+                (rowid, limit),
+            ).fetchall()
+
+    def existing_fingerprints(self, user_id: Any, fingerprints: List[str]) -> Set[str]:
+        """The subset of `fingerprints` already committed for this user."""
+        found: Set[str] = set()
+        with self._db_lock:
+            for i in range(0, len(fingerprints), 500):
+                chunk = fingerprints[i:i + 500]
+                rows = self._conn.execute(
+                    "SELECT fingerprint FROM expenses WHERE user_id = ? AND fingerprint IN"
+                    f" ({','.join('?' * len(chunk))})",
+                    (str(user_id), *chunk),
+                )
+                found.update(row[0] for row in rows)
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize(),
+            "queued": self.queued,
+            "committed": self.committed,
+            "batches": self.batches,
+            "avg_batch": round(self.committed / self.batches, 1) if self.batches else 0,
+            "duplicates": self.duplicates,
+            "write_errors": self.write_errors,
+        }
+
+    # --- writer thread ---
+
+    def _enqueue(self, expenses: List[Dict[str, Any]]) -> None:
+        if self._closed:
+            raise LedgerBusy("Ledger is shutting down")
+        try:
+            for expense in expenses:
+                self._queue.put_nowait(expense)
+        except queue.Full:
+            raise LedgerBusy("Too many expenses waiting to be written")
+        self.queued += len(expenses)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[Dict[str, Any]] = []
+            markers: List[_Flush] = []
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+
+            # Collect a group: take what's queued, and wait briefly for more.
+            while True:
+                if item is None:
+                    stopping = True
+                elif isinstance(item, _Flush):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stopping or markers or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.done.set()
+            if stopping:
+                # Drain anything queued behind the stop sentinel.
+                rest = []
+                while not self._queue.empty():
+                    leftover = self._queue.get_nowait()
+                    if isinstance(leftover, dict):
+                        rest.append(leftover)
+                    elif isinstance(leftover, _Flush):
+                        leftover.done.set()
+                if rest:
+                    self._write(rest)
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        plain = [e for e in batch if e.get("fingerprint") is None]
+        fingerprinted = [e for e in batch if e.get("fingerprint") is not None]
+        try:
+            with self._db_lock:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO expenses (id, user_id, amount, category, note, timestamp)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        [(e["id"], e["user_id"], e["amount"], e["category"], e["note"], e["timestamp"])
+                         for e in plain],
+                    )
+                    # One statement per row so rows ignored as duplicates are known and
+                    # not passed on to listeners (they would be counted twice).
+                    inserted = []
+                    for e in fingerprinted:
+                        cursor = self._conn.execute(
+                            "INSERT OR IGNORE INTO expenses (id, user_id, amount, category, note, timestamp,"
+                            " fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (e["id"], e["user_id"], e["amount"], e["category"], e["note"], e["timestamp"],
+                             e["fingerprint"]),
+                        )
+                        if cursor.rowcount == 1:
+                            inserted.append(e)
+                if fingerprinted:
+                    self.duplicates += len(fingerprinted) - len(inserted)
+                    batch = plain + inserted
+                self.committed += len(batch)
+                self.batches += 1
+                for listener in self._listeners:
+                    try:
+                        listener(batch)
+                    except Exception as e:
+                        print(f"Expense ledger listener failed: {e}")
+        except sqlite3.Error as e:
+            self.write_errors += 1
+            print(f"Expense ledger failed to write {len(batch)} expenses: {e}")
@@ -0,0 +1,470 @@
+# backend/metrics.py
+import bisect
+import heapq
+import itertools
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# ==============================================================================
+# 1. METRIC TYPES (PROMETHEUS TEXT FORMAT 0.0.4)
+# ==============================================================================
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any, **kwargs: Any):
+        """The child for one combination of label values (created on first use)."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(map(str, values))
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: Tuple[str, ...], child: Any) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    # += on a float attribute is not atomic across threads, but a lost
+    # increment under contention is an acceptable price for a lock-free path.
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, key: Tuple[str, ...], child: _HistogramValue) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), list(child.counts)):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# ==============================================================================
+# 2. REGISTRY
+# ==============================================================================
+
+# A collector returns (name, kind, help, [(labels dict, value), ...]) tuples,
+# read at scrape time from objects that already keep their own counters.
+Collector = Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        # Several collectors may report the same family (one cache each); merge them.
+        families: Dict[str, Tuple[str, str, List[Tuple[Dict[str, str], float]]]] = {}
+        for collector in self._collectors:
+            try:
+                collected = collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help, samples in collected:
+                families.setdefault(name, (kind, help, []))[2].extend(samples)
+        for name, (kind, help, samples) in families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+# --- Standard metrics shared by both servers (each process has its own registry) ---
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route template, method and status.", ("route", "method", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time from request start to the last byte of the response.",
+    ("route", "method"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests currently being served.")
+
+LLM_LATENCY = REGISTRY.histogram(
+    "llm_request_duration_seconds", "Upstream Gemini call duration (streams: until the last chunk).",
+    ("model", "kind"), buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60))
+LLM_ERRORS = REGISTRY.counter("llm_errors_total", "Failed upstream Gemini calls.", ("model", "kind"))
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "Tokens reported by Gemini usage metadata.", ("model", "direction"))
+LLM_QUEUE_WAIT = REGISTRY.histogram(
+    "llm_queue_wait_seconds", "Time an LLM call waited in the fair scheduler before it started.",
+    ("kind",), buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+MOCK_FALLBACKS = REGISTRY.counter(
+    "mock_fallbacks_total", "Answers served from canned/mock content instead of Gemini.", ("endpoint", "reason"))
+CALCULATOR_ANSWERS = REGISTRY.counter(
+    "calculator_answers_total", "Numeric chat questions answered by the local calculator instead of Gemini.",
+    ("endpoint",))
+
+
+def cache_collector(name: str, stats: Callable[[], Dict[str, Any]], hits_key: str = "hits") -> Collector:
+    """Exposes a *.stats() dict with hits/misses (response cache, quiz bank...) as metrics."""
+    def collect():
+        s = stats()
+        hits, misses = s.get(hits_key, 0), s.get("misses", 0)
+        labels = {"cache": name}
+        return [
+            ("cache_hits_total", "counter", "Cache hits.", [(labels, hits)]),
+            ("cache_misses_total", "counter", "Cache misses.", [(labels, misses)]),
+            ("cache_hit_ratio", "gauge", "Hits / lookups since start.",
+             [(labels, round(hits / (hits + misses), 4) if hits + misses else 0)]),
+        ]
+    return collect
+
+
+# ==============================================================================
+# 3. LLM CALL INSTRUMENTATION
+# ==============================================================================
+
+@contextmanager
+def track_llm(model: str, kind: str) -> Iterator[None]:
+    """Times an upstream call (or a whole stream) and counts it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:  # not GeneratorExit: a client leaving mid-stream isn't an upstream error
+        LLM_ERRORS.labels(model, kind).inc()
+        raise
+    finally:
+        LLM_LATENCY.labels(model, kind).observe(time.perf_counter() - started)
+
+
+def record_usage(model: str, response: Any) -> None:
+    """Adds prompt/response token counts from a Gemini response (either SDK) if present."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_token_count", None) or 0
+    output = getattr(usage, "candidates_token_count", None) or 0
+    # Part of `prompt` that came from a cached context (billed at the cached rate).
+    cached = getattr(usage, "cached_content_token_count", None) or 0
+    if prompt:
+        LLM_TOKENS.labels(model, "prompt").inc(prompt)
+    if cached:
+        LLM_TOKENS.labels(model, "cached").inc(cached)
+    if output:
+        LLM_TOKENS.labels(model, "response").inc(output)
+
+
+# ==============================================================================
+# 4. SLOW REQUEST SAMPLER
+# ==============================================================================
+
+class _Running:
+    __slots__ = ("route", "method", "thread_id", "started", "samples")
+
+    def __init__(self, route: str, method: str, thread_id: int, started: float):
+        self.route = route
+        self.method = method
+        self.thread_id = thread_id
+        self.started = started
+        self.samples: Dict[str, int] = {}
+
+
+class SlowRequestSampler:
+    """
+    Optional profiler for requests slower than `threshold` seconds.
+
+    A watchdog thread wakes every `interval` seconds and, for each request
+    running longer than the threshold, records the current stack of the
+    thread serving it (sys._current_frames). Stacks are counted per request,
+    and the `keep` slowest finished requests are kept for
+    /debug/slow-requests. Fast requests only pay for two dict operations.
+
+    Under asyncio every request shares the event loop thread: a stack inside
+    application code means the loop is blocked; a stack in the selector means
+    the request is waiting on I/O (usually Gemini).
+    """
+
+    def __init__(self, threshold: float = 1.0, interval: float = 0.05, keep: int = 20, max_samples: int = 200):
+        self.threshold = threshold
+        self.interval = interval
+        self.keep = keep
+        self.max_samples = max_samples
+        self._running: Dict[int, _Running] = {}
+        self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []  # min-heap of (duration, seq, record)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SlowRequestSampler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="slow-request-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def begin(self, route: str, method: str) -> int:
+        token = next(self._ids)
+        self._running[token] = _Running(route, method, threading.get_ident(), time.perf_counter())
+        return token
+
+    def end(self, token: int, status: Any = None, route: Optional[str] = None) -> None:
+        """Finishes a request; `route` replaces the raw path once the route template is known."""
+        running = self._running.pop(token, None)
+        if running is None:
+            return
+        duration = time.perf_counter() - running.started
+        if duration < self.threshold:
+            return
+        record = {
+            "route": route or running.route,
+            "method": running.method,
+            "status": status,
+            "duration_ms": round(duration * 1000, 1),
+            "finished_at": time.time(),
+            "stacks": [{"count": count, "stack": stack}
+                       for stack, count in sorted(running.samples.items(), key=lambda item: -item[1])[:5]],
+        }
+        with self._lock:
+            item = (duration, token, record)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, item)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [record for _, _, record in sorted(self._slowest, reverse=True)]
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            slow = [r for r in list(self._running.values())
+                    if now - r.started >= self.threshold and len(r.samples) < self.max_samples]
+            if not slow:
+                continue
+            frames = sys._current_frames()
+            for running in slow:
+                frame = frames.get(running.thread_id)
+                if frame is None:
+                    continue
+                stack = "".join(traceback.format_stack(frame, limit=25))
+                running.samples[stack] = running.samples.get(stack, 0) + 1
+
+
+# ==============================================================================
+# 5. REQUEST INSTRUMENTATION (FASTAPI + FLASK)
+# ==============================================================================
+
+UNMATCHED_ROUTE = "unmatched"  # 404s and the like, so random paths don't create label values
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording count, latency and in-flight requests.
+
+    Routes are labelled by their template ("/arena/rooms/{code}"), read from
+    scope["route"] once the router has matched. Latency runs until the last
+    body chunk is sent, so a streamed answer is timed end to end.
+    """
+
+    def __init__(self, app, sampler: Optional[SlowRequestSampler] = None):
+        self.app = app
+        self.sampler = sampler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+        token = self.sampler.begin(scope["path"], scope["method"]) if self.sampler else None
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route = getattr(route, "path", None) or UNMATCHED_ROUTE
+            HTTP_REQUESTS.labels(route, scope["method"], status[0]).inc()
+            HTTP_LATENCY.labels(route, scope["method"]).observe(time.perf_counter() - started)
+            if token is not None:
+                self.sampler.end(token, status[0], route)
+
+
+def instrument_flask(app, sampler: Optional[SlowRequestSampler] = None) -> None:
+    """
+    Same metrics as MetricsMiddleware, via Flask request hooks (route = url_rule.rule).
+
+    Streamed responses (SSE) are recorded when the WSGI server closes the
+    response, so their latency includes the whole body, not just the view.
+    """
+    from flask import g, request
+
+    def finish(route: str, method: str, status: int, started: float, token: Optional[int]) -> None:
+        HTTP_IN_FLIGHT.dec()
+        HTTP_REQUESTS.labels(route, method, status).inc()
+        HTTP_LATENCY.labels(route, method).observe(time.perf_counter() - started)
+        if token is not None:
+            sampler.end(token, status, route)
+
+    @app.before_request
+    def _metrics_start():
+        HTTP_IN_FLIGHT.inc()
+        token = sampler.begin(request.path, request.method) if sampler is not None else None
+        g._metrics = (time.perf_counter(), token)
+
+    @app.after_request
+    def _metrics_response(response):
+        started, token = g.pop("_metrics", (None, None))
+        if started is None:
+            return response
+        req = request._get_current_object()
+        route = req.url_rule.rule if req.url_rule is not None else UNMATCHED_ROUTE
+        if response.is_streamed:
+            response.call_on_close(lambda: finish(route, req.method, response.status_code, started, token))
+        else:
+            finish(route, req.method, response.status_code, started, token)
+        return response
+
+    @app.teardown_request
+    def _metrics_error(exc):
+        # Only still pending if the request failed before after_request ran.
+        started, token = g.pop("_metrics", (None, None))
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+            finish(route, request.method, 500, started, token)
@@ -0,0 +1,368 @@
+# backend/quiz_bank.py
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+# ==============================================================================
+# 1. PARSING AND VALIDATION OF GENERATED QUESTIONS
+# ==============================================================================
+
+def extract_json(text: str) -> Any:
+    """
+    Pulls the JSON object out of an LLM reply.
+
+    Models like to wrap JSON in ```json fences or add a sentence around it, so
+    rather than string-replacing markers we parse from the first '{' to the
+    last '}'.
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("No JSON object found in model response")
+    return json.loads(text[start:end + 1])
+
+
+def validate_question(raw: Any) -> Optional[Dict[str, Any]]:
+    """Returns a clean question dict, or None if `raw` doesn't match the schema."""
+    if not isinstance(raw, dict):
+        return None
+    question = raw.get("question")
+    options = raw.get("options")
+    correct = raw.get("correct")
+
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) != 4:
+        return None
+    if not all(isinstance(o, str) and o.strip() for o in options):
+        return None
+    if len({o.strip().lower() for o in options}) != 4:
+        return None
+    # bool is an int subclass; "correct": true is not a valid index.
+    if isinstance(correct, bool) or not isinstance(correct, int) or not 0 <= correct <= 3:
+        return None
+
+    return {
+        "question": question.strip(),
+        "options": [o.strip() for o in options],
+        "correct": correct,
+    }
+
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def question_key(question: str) -> str:
+    """Normalized text used to detect duplicate questions."""
+    return _NON_WORD.sub(" ", question.lower()).strip()
+
+
+def normalize_track(track: str) -> str:
+    return _NON_WORD.sub("-", (track or "general").lower()).strip("-")[:40] or "general"
+
+
+# ==============================================================================
+# 2. QUESTION BANK
+# ==============================================================================
+
+class QuizBank:
+    """
+    Per-track pool of validated quiz questions served from memory.
+
+    Questions are generated ahead of time by a background worker. Whenever a
+    track drops below `low_watermark` the worker is asked to refill it in
+    batches up to `high_watermark`. Entries are evicted when the track
+    exceeds `max_per_track` (oldest first), when they are older than
+    `max_age_seconds`, or once they've been served `max_serves` times, so the
+    bank keeps rotating fresh questions in. The bank is saved to `path` as
+    JSON so a restart serves instantly.
+    """
+
+    def __init__(
+        self,
+        generator: Optional[Callable[[str, int], List[Any]]] = None,
+        path: Optional[str] = None,
+        quiz_size: int = 5,
+        low_watermark: int = 15,
+        high_watermark: int = 40,
+        batch_size: int = 5,
+        max_per_track: int = 200,
+        max_tracks: int = 50,
+        max_age_seconds: float = 7 * 24 * 3600,
+        max_serves: int = 50,
+        retired_answers: int = 1000,
+    ):
+        self.generator = generator
+        self.path = path
+        self.quiz_size = quiz_size
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.batch_size = batch_size
+        self.max_per_track = max_per_track
+        self.max_tracks = max_tracks
+        self.max_age_seconds = max_age_seconds
+        self.max_serves = max_serves
+        self.retired_answers = retired_answers
+
+        # track -> {"next_id": int, "questions": OrderedDict[key -> entry]}
+        self._tracks: Dict[str, Dict[str, Any]] = {}
+        # track -> {id: correct option} of evicted questions (oldest first, at most `retired_answers`
+        # per track), so quizzes served just before an eviction can still be graded.
+        self._retired: Dict[str, OrderedDict] = {}
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._wakeup = threading.Condition(self._lock)
+        self._worker: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.served = 0
+        self.misses = 0
+        self.generated = 0
+        self.rejected_invalid = 0
+        self.rejected_duplicate = 0
+        self.evicted = 0
+        self.generator_errors = 0
+
+        self._load()
+
+    # --- serving ---
+
+    def get_quiz(self, track: str, count: Optional[int] = None, seen: int = 0, correct: int = 0,
+                 base: int = 0) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns `count` questions for the track, or None if the bank can't fill a quiz yet.
+
+        `seen` and `correct` are a user's bitsets over question IDs, bit i
+        standing for ID `base + i` (see academy_progress.py): questions they
+        haven't seen come first, then
+        ones they got wrong, then ones they already know. Answers are not
+        included; grade with answer_key().
+        """
+        count = count or self.quiz_size
+        track = normalize_track(track)
+        now = time.time()
+        with self._lock:
+            bank = self._tracks.get(track)
+            if bank is not None:
+                self._evict_stale(track, bank, now)
+            available = len(bank["questions"]) if bank else 0
+            if available < self.low_watermark:
+                self._schedule_refill(track)
+            if available < count:
+                self.misses += 1
+                return None
+
+            candidates = list(bank["questions"].values())
+            if seen:
+                random.shuffle(candidates)
+                # Stable sort keeps the shuffle within each group.
+                candidates.sort(key=lambda e: ((seen >> (e["id"] - base)) & 1) + ((correct >> (e["id"] - base)) & 1)
+                                if e["id"] >= base else 0)
+                picked = candidates[:count]
+            else:
+                picked = random.sample(candidates, count)
+            for entry in picked:
+                entry["served"] += 1
+            self.served += 1
+            return [self._public(entry) for entry in picked]
+
+    def answer_key(self, track: str, question_ids: Iterable[int]) -> Dict[int, int]:
+        """Correct option per question ID, for questions in the bank or recently evicted from it."""
+        track = normalize_track(track)
+        with self._lock:
+            bank = self._tracks.get(track)
+            by_id = {e["id"]: e["correct"] for e in bank["questions"].values()} if bank else {}
+            key = {}
+            for question_id in question_ids:
+                answer = by_id.get(question_id, self._retired.get(track, {}).get(question_id))
+                if answer is not None:
+                    key[question_id] = answer
+            return key
+
+    def add(self, track: str, questions: List[Any]) -> int:
+        """Validates, de-duplicates and stores questions. Returns how many were added."""
+        track = normalize_track(track)
+        now = time.time()
+        added = 0
+        with self._lock:
+            bank = self._track(track)
+            if bank is None:
+                return 0
+            for raw in questions:
+                question = validate_question(raw)
+                if question is None:
+                    self.rejected_invalid += 1
+                    continue
+                key = question_key(question["question"])
+                if key in bank["questions"]:
+                    self.rejected_duplicate += 1
+                    continue
+                question.update(id=bank["next_id"], added_at=now, served=0)
+                bank["next_id"] += 1
+                bank["questions"][key] = question
+                added += 1
+            while len(bank["questions"]) > self.max_per_track:
+                _, entry = bank["questions"].popitem(last=False)
+                self._retire(track, entry)
+                self.evicted += 1
+        return added
+
+    def first_live_id(self, track: str) -> int:
+        """
+        Lowest question ID that can still be served or graded on the track.
+        IDs only grow, so progress bits below it can be dropped (see
+        academy_progress.py).
+        """
+        track = normalize_track(track)
+        with self._lock:
+            bank = self._tracks.get(track)
+            if bank is None:
+                return 1
+            ids = [e["id"] for e in bank["questions"].values()]
+            ids.extend(self._retired.get(track, ()))
+            return min(ids, default=bank["next_id"])
+
+    def request_refill(self, track: str) -> None:
+        with self._lock:
+            self._schedule_refill(normalize_track(track))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tracks": {t: len(b["questions"]) for t, b in self._tracks.items()},
+                "served": self.served,
+                "misses": self.misses,
+                "generated": self.generated,
+                "rejected_invalid": self.rejected_invalid,
+                "rejected_duplicate": self.rejected_duplicate,
+                "evicted": self.evicted,
+                "generator_errors": self.generator_errors,
+                "pending_refills": sorted(self._pending),
+            }
+
+    # --- background refill ---
+
+    def start(self) -> None:
+        if self._worker is not None or self.generator is None:
+            return
+        self._worker = threading.Thread(target=self._run, name="quiz-bank-refill", daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+            self._worker = None
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._stopping:
+                    self._wakeup.wait()
+                if self._stopping:
+                    return
+                track = self._pending.pop()
+            self._refill(track)
+
+    def _refill(self, track: str) -> None:
+        # Bounded number of rounds so a model that keeps returning duplicates
+        # or junk can't spin the worker forever.
+        for _ in range(max(1, self.high_watermark // self.batch_size) * 2):
+            with self._lock:
+                bank = self._tracks.get(track)
+                if bank is not None and len(bank["questions"]) >= self.high_watermark:
+                    break
+            try:
+                raw = self.generator(track, self.batch_size)
+            except Exception as e:
+                self.generator_errors += 1
+                print(f"Quiz bank refill failed for '{track}': {e}")
+                break
+            self.generated += len(raw)
+            self.add(track, raw)
+        self.save()
+
+    # --- persistence ---
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = {
+                track: {"next_id": b["next_id"], "questions": list(b["questions"].values())}
+                for track, b in self._tracks.items()
+            }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Quiz bank at {self.path} could not be loaded, starting empty: {e}")
+            return
+        for track, data in snapshot.items():
+            bank = self._track(track)
+            if bank is None:
+                break
+            bank["next_id"] = data.get("next_id", 1)
+            for entry in data.get("questions", []):
+                if validate_question(entry) is not None:
+                    bank["questions"][question_key(entry["question"])] = entry
+
+    # --- internal helpers (caller holds the lock) ---
+
+    def _track(self, track: str) -> Optional[Dict[str, Any]]:
+        bank = self._tracks.get(track)
+        if bank is None:
+            if len(self._tracks) >= self.max_tracks:
+                return None
+            bank = {"next_id": 1, "questions": OrderedDict()}
+            self._tracks[track] = bank
+        return bank
+
+    def _schedule_refill(self, track: str) -> None:
+        if self.generator is None or self._stopping:
+            return
+        if track not in self._tracks and len(self._tracks) >= self.max_tracks:
+            return
+        if track not in self._pending:
+            self._pending.add(track)
+            self._wakeup.notify()
+
+    def _evict_stale(self, track: str, bank: Dict[str, Any], now: float) -> None:
+        stale = [
+            key for key, entry in bank["questions"].items()
+            if now - entry["added_at"] > self.max_age_seconds or entry["served"] >= self.max_serves
+        ]
+        for key in stale:
+            self._retire(track, bank["questions"].pop(key))
+        self.evicted += len(stale)
+
+    def _retire(self, track: str, entry: Dict[str, Any]) -> None:
+        retired = self._retired.setdefault(track, OrderedDict())
+        retired[entry["id"]] = entry["correct"]
+        while len(retired) > self.retired_answers:
+            retired.popitem(last=False)
+
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": entry["id"],
+            "question": entry["question"],
+            "options": entry["options"],
+        }
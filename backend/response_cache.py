@@ -0,0 +1,154 @@
+# backend/response_cache.py
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+# ==============================================================================
+# 1. KEYING
+# ==============================================================================
+
+# Only one-shot modes are cacheable: their answer depends on the message alone,
+# not on an ongoing conversation.
+CACHEABLE_MODES = ("quick", "explain")
+
+_SEPARATORS = re.compile(r"[^\w₹%]+")
+
+
+def normalize_message(message: str) -> str:
+    """Folds case, punctuation and spacing so near-identical questions share a key."""
+    return _SEPARATORS.sub(" ", message.casefold()).strip()
+
+
+def persona_version(*parts: str) -> str:
+    """Short fingerprint of everything that shapes an answer besides the message."""
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return digest[:12]
+
+
+def is_cacheable(mode: Optional[str]) -> bool:
+    return mode in CACHEABLE_MODES
+
+
+# ==============================================================================
+# 2. SQLITE-BACKED LRU CACHE
+# ==============================================================================
+
+class ResponseCache:
+    """
+    Persistent cache of coach answers.
+
+    Entries expire after `ttl_seconds` and the least recently used ones are
+    evicted beyond `max_entries`. The last-access time is only rewritten once
+    per `touch_interval` seconds, so a hit is a single primary-key SELECT.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 5000,
+        ttl_seconds: float = 24 * 3600,
+        touch_interval: float = 60,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.touch_interval = touch_interval
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_last_access ON response_cache (last_access)"
+        )
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(message: str, mode: str, persona: str) -> str:
+        raw = f"{persona}\x1f{mode}\x1f{normalize_message(message)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at, last_access FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at, last_access = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            if now - last_access > self.touch_interval:
+                self._conn.execute("UPDATE response_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return response
+
+    def set(self, key: str, response: str) -> None:
+        if not response:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO response_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET response = excluded.response,"
+                " created_at = excluded.created_at, last_access = excluded.last_access",
+                (key, response, now, now),
+            )
+            self.stores += 1
+            self._evict_over_capacity()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _evict_over_capacity(self) -> None:
+        (entries,) = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()
+        excess = entries - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM response_cache WHERE key IN"
+            " (SELECT key FROM response_cache ORDER BY last_access ASC LIMIT ?)",
+            (excess,),
+        )
+        self.evictions += excess
@@ -0,0 +1,290 @@
+# backend/scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from backend.concurrency import Saturated
+from backend.state_store import InMemoryStore, StateStore
+
+
+# ==============================================================================
+# 1. ERRORS
+# ==============================================================================
+
+class RateLimited(Exception):
+    """Raised when one user is over their own request rate or queue share (HTTP 429)."""
+
+    def __init__(self, retry_after: int, reason: str = "rate"):
+        super().__init__(f"Too many requests, retry after {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+# ==============================================================================
+# 2. TOKEN BUCKET
+# ==============================================================================
+
+class TokenBucket:
+    """`rate` tokens per second up to `capacity`. May go negative to record debt."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_for(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self.refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+
+# ==============================================================================
+# 3. FAIR LLM SCHEDULER
+# ==============================================================================
+
+class Ticket:
+    """
+    One scheduled call. `wait_seconds` is the time spent queued before it
+    started; set `used_tokens` from usage metadata before release.
+    """
+
+    __slots__ = ("user_id", "cost", "finish", "future", "enqueued_at", "started_at", "cancelled", "used_tokens")
+
+    def __init__(self, user_id: str, cost: int, finish: float, enqueued_at: float):
+        self.user_id = user_id
+        self.cost = cost
+        self.finish = finish
+        self.future: Optional[asyncio.Future] = None
+        self.enqueued_at = enqueued_at
+        self.started_at: Optional[float] = None
+        self.cancelled = False
+        self.used_tokens: Optional[int] = None
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.started_at or self.enqueued_at) - self.enqueued_at
+
+    @property
+    def wait_ms(self) -> int:
+        return int(self.wait_seconds * 1000)
+
+
+class LLMScheduler:
+    """
+    Decides which user's LLM call runs next.
+
+    * Per user: a token bucket (`user_rpm`, bursts of `user_burst`) and at
+      most `user_max_queue` waiting calls; beyond either, RateLimited (429).
+      Buckets live in `store`, so with a shared store the rate limit holds
+      across all workers rather than per process.
+    * Across users: self-clocked weighted fair queuing. Each call gets a
+      virtual finish time max(V, user's last finish) + cost / weight and the
+      smallest finish time runs first, so a user with many queued calls
+      takes turns with everyone else instead of holding the head of a FIFO.
+      `cost` is the estimated tokens of the call.
+    * Globally: at most `max_concurrency` calls run, `max_queue` wait
+      (Saturated, 503, beyond that), and dispatch respects requests- and
+      tokens-per-minute ceilings. Real token usage reported on release()
+      corrects the TPM bucket.
+
+    Single event loop only, so no locks; the only blocking call (the
+    shared bucket update) is run off the loop by acharge().
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 256, user_rpm: float = 20,
+                 user_burst: int = 5, user_max_queue: int = 4, global_rpm: float = 1000,
+                 global_tpm: float = 1_000_000, min_retry_after: int = 1, store: Optional[StateStore] = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.user_rpm = user_rpm
+        self.user_burst = user_burst
+        self.user_max_queue = user_max_queue
+        self.min_retry_after = min_retry_after
+        self.store = store if store is not None else InMemoryStore()
+
+        now = time.monotonic()
+        self._rpm = TokenBucket(global_rpm / 60, global_rpm, now)
+        self._tpm = TokenBucket(global_tpm / 60, global_tpm, now)
+        self._heap: List[Tuple[float, int, Ticket]] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._queued_per_user: Dict[str, int] = {}
+        self._queued = 0
+        self._running = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._avg_service_time = 1.0
+
+        self.completed = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    # --- admission ---
+
+    def charge(self, user_id: str) -> None:
+        """Takes one request from the user's bucket or raises RateLimited."""
+        now = time.time()  # wall clock: the bucket may be shared with other processes
+        rate = self.user_rpm / 60
+        wait = 0.0
+
+        def take(state):
+            nonlocal wait
+            tokens, updated_at = state if state is not None else (self.user_burst, now)
+            tokens = min(self.user_burst, tokens + max(now - updated_at, 0) * rate)
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            return [tokens, now]
+
+        # A bucket left alone until it is full again is the same as no bucket: let it expire.
+        self.store.update(f"ratelimit:chat:{user_id}", take, ttl=self.user_burst / rate)
+        if wait > 0:
+            self.rate_limited += 1
+            raise RateLimited(max(self.min_retry_after, int(wait + 0.999)))
+
+    async def acharge(self, user_id: str) -> None:
+        """charge() for async callers: a shared store is a SQLite write, so it runs in a worker thread."""
+        if self.store.shared:
+            await asyncio.to_thread(self.charge, user_id)
+        else:
+            self.charge(user_id)
+
+    async def acquire(self, user_id: str, cost: int = 1000, weight: float = 1.0, charge: bool = True) -> Ticket:
+        """Waits for this user's turn. Raises RateLimited or Saturated instead of queueing forever."""
+        user_id = str(user_id)
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise Saturated(self.retry_after())
+        if self._queued_per_user.get(user_id, 0) >= self.user_max_queue:
+            self.rate_limited += 1
+            raise RateLimited(self.retry_after(), reason="queue")
+        if charge:
+            await self.acharge(user_id)
+
+        now = time.monotonic()
+        start = max(self._virtual_time, self._last_finish.get(user_id, 0.0))
+        ticket = Ticket(user_id, cost, start + cost / max(weight, 1e-6), now)
+        self._last_finish[user_id] = ticket.finish
+        ticket.future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (ticket.finish, next(self._seq), ticket))
+        self._queued += 1
+        self._queued_per_user[user_id] = self._queued_per_user.get(user_id, 0) + 1
+        self._dispatch()
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            # The caller went away: give the slot back, or leave the queue.
+            if ticket.started_at is not None:
+                self.release(ticket)
+            else:
+                ticket.cancelled = True
+                self._dequeued(ticket)
+                self._dispatch()
+            raise
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """Frees the slot. `ticket.used_tokens`, when known, corrects the TPM estimate."""
+        now = time.monotonic()
+        self._avg_service_time = 0.9 * self._avg_service_time + 0.1 * (now - ticket.started_at)
+        if ticket.used_tokens:
+            self._tpm.take(ticket.used_tokens - ticket.cost)
+        self._running -= 1
+        self.completed += 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, cost: int = 1000, weight: float = 1.0,
+                   charge: bool = True) -> AsyncIterator[Ticket]:
+        ticket = await self.acquire(user_id, cost, weight, charge)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    # --- dispatch ---
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self._heap and self._running < self.max_concurrency:
+            finish, _, ticket = self._heap[0]
+            if ticket.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            wait = max(self._rpm.wait_for(1, now), self._tpm.wait_for(ticket.cost, now))
+            if wait > 0:
+                # Over the global ceiling: try again once the buckets have refilled.
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                return
+            heapq.heappop(self._heap)
+            self._rpm.take(1)
+            self._tpm.take(ticket.cost)
+            self._virtual_time = finish
+            self._dequeued(ticket)
+            self._running += 1
+            ticket.started_at = now
+            wait_seconds = now - ticket.enqueued_at
+            self.total_wait += wait_seconds
+            self.max_wait = max(self.max_wait, wait_seconds)
+            ticket.future.set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _dequeued(self, ticket: Ticket) -> None:
+        self._queued -= 1
+        left = self._queued_per_user[ticket.user_id] - 1
+        if left:
+            self._queued_per_user[ticket.user_id] = left
+            return
+        del self._queued_per_user[ticket.user_id]
+        # An idle user rejoins at the current virtual time; no need to remember them.
+        if self._last_finish.get(ticket.user_id, 0.0) <= self._virtual_time:
+            self._last_finish.pop(ticket.user_id, None)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained."""
+        backlog = self._queued + self._running
+        estimate = backlog * self._avg_service_time / max(self.max_concurrency, 1)
+        return max(self.min_retry_after, int(estimate + 0.999))
+
+    def stats(self) -> Dict[str, float]:
+        now = time.monotonic()
+        self._rpm.refill(now)
+        self._tpm.refill(now)
+        started = self.completed + self._running
+        return {
+            "running": self._running,
+            "waiting": self._queued,
+            "users_waiting": len(self._queued_per_user),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "avg_wait_ms": round(self.total_wait / started * 1000, 1) if started else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "rpm_available": int(self._rpm.tokens),
+            "tpm_available": int(self._tpm.tokens),
+            "avg_service_seconds": round(self._avg_service_time, 4),
+        }
@@ -0,0 +1,222 @@
+# backend/sessions.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+# ==============================================================================
+# 1. SESSION ENTRY
+# ==============================================================================
+
+# Rough fixed cost of one live session object (history lists, bookkeeping).
+SESSION_OVERHEAD_BYTES = 2048
+
+
+class SessionEntry:
+    """A single user's chat session plus the bookkeeping used for eviction."""
+
+    __slots__ = ("session", "created_at", "last_used", "turns", "history_bytes")
+
+    def __init__(self, session: Any, now: float):
+        self.session = session
+        self.created_at = now
+        self.last_used = now
+        self.turns = 0
+        self.history_bytes = 0
+
+    @property
+    def approx_bytes(self) -> int:
+        return SESSION_OVERHEAD_BYTES + self.history_bytes
+
+
+# ==============================================================================
+# 2. SESSION MANAGER (LRU + IDLE TTL + MEMORY BUDGET)
+# ==============================================================================
+
+class ChatSessionManager:
+    """
+    Keeps one chat session per user ID.
+
+    Sessions are stored in least-recently-used order, so expiry and eviction
+    only ever look at the front of the map. Limits:
+      - max_sessions:      hard cap on live sessions (LRU evicted beyond it)
+      - ttl_seconds:       sessions idle for longer than this are dropped
+      - max_session_bytes: a conversation that still grows past this after
+                           compaction is reset (last-resort bound on prompt size)
+      - max_total_bytes:   LRU sessions are evicted until the pool fits
+
+    With a shared `store` (see backend/state_store.py) the store is the
+    source of truth instead: get() loads the conversation with `loader`,
+    record_turn() writes it back with `to_dict()`, and idle ones expire via
+    the store's TTL. Any worker can then serve any turn of a conversation;
+    if two workers update the same user at once, the last write wins.
+    Async code calls aget()/arecord_turn(), which run the store calls in a
+    worker thread.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_sessions: int = 1000,
+        ttl_seconds: float = 1800,
+        max_session_bytes: int = 64_000,
+        max_total_bytes: int = 64 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+        store=None,
+        loader: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ):
+        self._factory = factory
+        self.store = store
+        self._loader = loader
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_session_bytes = max_session_bytes
+        self.max_total_bytes = max_total_bytes
+        self._clock = clock
+
+        self._sessions: "OrderedDict[Hashable, SessionEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+        self.created = 0
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+        self.evicted_memory = 0
+        self.resets = 0
+        self.loaded = 0
+        self.saved = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, user_id: Hashable) -> Any:
+        """Returns the user's session, creating one if needed."""
+        if self.store is not None:
+            data = self.store.get(self._key(user_id))
+            if data is None:
+                self.created += 1
+                return self._factory()
+            self.loaded += 1
+            return self._loader(data)
+
+        now = self._clock()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(user_id)
+            if entry is not None:
+                entry.last_used = now
+                self._sessions.move_to_end(user_id)
+                return entry.session
+
+        # Build the session outside the lock; creating SDK objects can be slow.
+        session = self._factory()
+
+        with self._lock:
+            entry = self._sessions.get(user_id)
+            if entry is None:
+                entry = SessionEntry(session, now)
+                self._sessions[user_id] = entry
+                self._total_bytes += entry.approx_bytes
+                self.created += 1
+                self._enforce_limits()
+            else:
+                # Another request for the same user won the race.
+                entry.last_used = now
+                self._sessions.move_to_end(user_id)
+            return entry.session
+
+    def record_turn(self, user_id: Hashable, session: Any) -> None:
+        """
+        Accounts for one exchange (or a compaction) of `session`.
+
+        Its size is measured again each time because it can shrink when old
+        turns are compacted. A session that still outgrows its budget is
+        reset as a last resort.
+        """
+        history_bytes = session.approx_bytes()
+        if self.store is not None:
+            if history_bytes > self.max_session_bytes:
+                self.store.delete(self._key(user_id))
+                self.resets += 1
+                return
+            self.store.set(self._key(user_id), session.to_dict(), ttl=self.ttl_seconds)
+            self.saved += 1
+            return
+
+        with self._lock:
+            entry = self._sessions.get(user_id)
+            if entry is None:
+                return
+            entry.turns += 1
+            self._total_bytes += history_bytes - entry.history_bytes
+            entry.history_bytes = history_bytes
+
+            if entry.history_bytes > self.max_session_bytes:
+                self._remove(user_id)
+                self.resets += 1
+                print(f"Chat session for user {user_id} reset after {entry.turns} turns "
+                      f"({entry.history_bytes} bytes of history).")
+                return
+
+            self._enforce_limits()
+
+    # --- async API: the store is a SQLite file, so don't block the event loop on it ---
+
+    async def aget(self, user_id: Hashable) -> Any:
+        if self.store is None:
+            return self.get(user_id)
+        return await asyncio.to_thread(self.get, user_id)
+
+    async def arecord_turn(self, user_id: Hashable, session: Any) -> None:
+        if self.store is None:
+            self.record_turn(user_id, session)
+            return
+        await asyncio.to_thread(self.record_turn, user_id, session)
+
+    def stats(self) -> Dict[str, int]:
+        if self.store is not None:
+            return {"store": self.store.stats()["backend"], "created": self.created, "loaded": self.loaded,
+                    "saved": self.saved, "resets": self.resets}
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "approx_bytes": self._total_bytes,
+                "max_total_bytes": self.max_total_bytes,
+                "created": self.created,
+                "evicted_lru": self.evicted_lru,
+                "evicted_ttl": self.evicted_ttl,
+                "evicted_memory": self.evicted_memory,
+                "resets": self.resets,
+            }
+
+    @staticmethod
+    def _key(user_id: Hashable) -> str:
+        return f"chat:{user_id}"
+
+    # --- internal helpers (caller holds the lock) ---
+
+    def _remove(self, user_id: Hashable) -> Optional[SessionEntry]:
+        entry = self._sessions.pop(user_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.approx_bytes
+        return entry
+
+    def _evict_expired(self, now: float) -> None:
+        # Oldest entries sit at the front, so stop at the first live one.
+        while self._sessions:
+            user_id, entry = next(iter(self._sessions.items()))
+            if now - entry.last_used < self.ttl_seconds:
+                break
+            self._remove(user_id)
+            self.evicted_ttl += 1
+
+    def _enforce_limits(self) -> None:
+        while len(self._sessions) > self.max_sessions:
+            self._remove(next(iter(self._sessions)))
+            self.evicted_lru += 1
+        while self._total_bytes > self.max_total_bytes and len(self._sessions) > 1:
+            self._remove(next(iter(self._sessions)))
+            self.evicted_memory += 1
@@ -0,0 +1,175 @@
+# backend/singleflight.py
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+# ==============================================================================
+# 1. SHARED COUNTERS
+# ==============================================================================
+
+class FlightStats:
+    """Counters shared by the thread and asyncio flavours."""
+
+    def __init__(self):
+        self.calls = 0            # every request that asked for a key
+        self.upstream_calls = 0   # requests that actually went upstream (leaders)
+        self.coalesced = 0        # requests that piggy-backed on a leader
+        self.errors = 0           # leader calls that raised
+        self.timeouts = 0         # followers that gave up waiting
+
+    def snapshot(self, in_flight: int) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "upstream_calls_saved": self.coalesced,
+            "coalesce_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "in_flight": in_flight,
+        }
+
+
+# ==============================================================================
+# 2. THREADED SINGLE-FLIGHT (Flask)
+# ==============================================================================
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one upstream call.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running wait for the leader's result, or re-raise the
+    leader's exception. A follower that waits longer than its timeout gets
+    TimeoutError; the leader keeps going and later callers still share it.
+    """
+
+    def __init__(self, default_timeout: Optional[float] = None):
+        self.default_timeout = default_timeout
+        self.stats = FlightStats()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call, timeout)
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+    # Lower-level API for callers that need to do work between joining and
+    # publishing, e.g. a leader that streams chunks to its own client first.
+
+    def begin(self, key: Hashable) -> Tuple[_Call, bool]:
+        """Joins the flight for `key`. Returns (call, is_leader)."""
+        with self._lock:
+            self.stats.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats.coalesced += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self.stats.upstream_calls += 1
+            return call, True
+
+    def finish(self, key: Hashable, call: _Call, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Publishes the leader's outcome to every follower."""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            if error is not None:
+                self.stats.errors += 1
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def wait(self, call: _Call, timeout: Optional[float] = None) -> Any:
+        timeout = self.default_timeout if timeout is None else timeout
+        if not call.done.wait(timeout):
+            with self._lock:
+                self.stats.timeouts += 1
+            raise TimeoutError("Timed out waiting for an identical in-flight request")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return self.stats.snapshot(len(self._calls))
+
+
+# ==============================================================================
+# 3. ASYNCIO SINGLE-FLIGHT (FastAPI)
+# ==============================================================================
+
+class AsyncSingleFlight:
+    """
+    asyncio version of SingleFlight.
+
+    The leader's coroutine runs as its own task, so a caller that is cancelled
+    or times out never cancels the upstream call the others are waiting on.
+    """
+
+    def __init__(self, default_timeout: Optional[float] = None):
+        self.default_timeout = default_timeout
+        self.stats = FlightStats()
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._tasks = set()  # strong refs so leader tasks aren't garbage collected
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        self.stats.calls += 1
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            # Mark the exception as retrieved even if every waiter timed out.
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._calls[key] = future
+            self.stats.upstream_calls += 1
+            task = asyncio.ensure_future(self._lead(key, fn, future))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self.stats.coalesced += 1
+
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise TimeoutError("Timed out waiting for an identical in-flight request")
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[Any]], future: asyncio.Future) -> None:
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.stats.errors += 1
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def snapshot(self) -> Dict[str, float]:
+        return self.stats.snapshot(len(self._calls))
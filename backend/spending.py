@@ -0,0 +1,356 @@
+# backend/spending.py
+import datetime
+import threading
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from backend.ledger import CATEGORIES
+
+
+# ==============================================================================
+# 1. CATEGORIES, BUCKETS AND CALENDAR HELPERS
+# ==============================================================================
+
+CATEGORY_INDEX = {category: i for i, category in enumerate(CATEGORIES)}
+
+# The 50/30/20 rule: half of spending on needs, 30% on wants, 20% saved.
+BUCKETS = {
+    "needs": ("food", "transport", "bills"),
+    "wants": ("entertainment", "shopping", "other"),
+    "savings": ("savings",),
+}
+TARGET_RATIOS = {"needs": 0.5, "wants": 0.3, "savings": 0.2}
+
+# (buckets x categories) 0/1 matrix: BUCKET_MATRIX @ totals gives per-bucket sums.
+BUCKET_MATRIX = np.array(
+    [[1.0 if category in members else 0.0 for category in CATEGORIES] for members in BUCKETS.values()]
+)
+
+SECONDS_PER_DAY = 86400
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# What a malformed row can raise while being placed (e.g. a NaN or out-of-calendar timestamp).
+BAD_ROW = (TypeError, ValueError, OverflowError)
+
+# Number of periods returned for each rollup in a snapshot.
+ROLLUP_PERIODS = {"daily": 7, "weekly": 4, "monthly": 6}
+
+
+def day_number(timestamp: float, utc_offset_seconds: int = 0) -> int:
+    """Days since 1970-01-01 in the given timezone."""
+    return int((timestamp + utc_offset_seconds) // SECONDS_PER_DAY)
+
+
+def day_to_date(day: int) -> datetime.date:
+    return datetime.date.fromordinal(day + _EPOCH_ORDINAL)
+
+
+def date_to_day(date: datetime.date) -> int:
+    return date.toordinal() - _EPOCH_ORDINAL
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime.date]:
+    """Parses YYYY-MM-DD query parameters; raises ValueError on bad input."""
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"invalid date {value!r}, expected YYYY-MM-DD")
+
+
+def week_number(day: int) -> int:
+    # 1970-01-01 was a Thursday; shifting by 3 makes weeks start on Monday.
+    return (day + 3) // 7
+
+
+def week_start(week: int) -> int:
+    return week * 7 - 3
+
+
+def month_number(day: int) -> int:
+    date = day_to_date(day)
+    return date.year * 12 + date.month - 1
+
+
+def month_start(month: int) -> int:
+    return date_to_day(datetime.date(month // 12, month % 12 + 1, 1))
+
+
+# ==============================================================================
+# 2. PER-USER ARRAYS
+# ==============================================================================
+
+class PeriodTotals:
+    """
+    Totals per (period, category) for one user, as a dense float64 array.
+
+    Row i holds period `first + i`. The array grows (doubling) to cover new
+    periods in either direction, so adding an expense is O(1) amortized and
+    summing any range of periods is a single vectorized slice. It never
+    spans more than `max_rows` periods: when a newer period needs room, the
+    oldest rows move to a sparse dict, and periods older than the dense
+    range go straight there, so one far-off timestamp can't blow up memory.
+    """
+
+    __slots__ = ("first", "rows", "max_rows", "sparse")
+
+    def __init__(self, period: int, capacity: int = 8, max_rows: int = 1024):
+        self.first = period
+        self.max_rows = max(max_rows, capacity)
+        self.rows = np.zeros((capacity, len(CATEGORIES)))
+        self.sparse: Dict[int, np.ndarray] = {}
+
+    def add(self, period: int, category: int, amount: float) -> None:
+        if self._cover(period):
+            self.rows[period - self.first, category] += amount
+        else:
+            row = self.sparse.get(period)
+            if row is None:
+                row = self.sparse[period] = np.zeros(len(CATEGORIES))
+            row[category] += amount
+
+    def sum(self, start: int, end: int) -> np.ndarray:
+        """Per-category totals over periods [start, end)."""
+        lo = max(start - self.first, 0)
+        hi = min(end - self.first, len(self.rows))
+        out = self.rows[lo:hi].sum(axis=0) if lo < hi else np.zeros(len(CATEGORIES))
+        for period, row in self.sparse.items():
+            if start <= period < end:
+                out = out + row
+        return out
+
+    def window(self, start: int, count: int) -> np.ndarray:
+        """(count x categories) rows for periods start .. start+count-1, zeros outside the data."""
+        out = np.zeros((count, len(CATEGORIES)))
+        lo = max(start, self.first)
+        hi = min(start + count, self.first + len(self.rows))
+        if lo < hi:
+            out[lo - start:hi - start] = self.rows[lo - self.first:hi - self.first]
+        for period, row in self.sparse.items():
+            if start <= period < start + count:
+                out[period - start] += row
+        return out
+
+    def nbytes(self) -> int:
+        return self.rows.nbytes + sum(row.nbytes for row in self.sparse.values())
+
+    def _cover(self, period: int) -> bool:
+        """Makes the dense rows cover `period` if that keeps them within max_rows."""
+        size = len(self.rows)
+        if self.first <= period < self.first + size:
+            return True
+        if period < self.first:
+            if self.first + size - period > self.max_rows:
+                return False
+            grow = min(max(self.first - period, size), self.max_rows - size)
+            self.rows = np.concatenate([np.zeros((grow, len(CATEGORIES))), self.rows])
+            self.first -= grow
+            return True
+        if period - self.first + 1 > self.max_rows:
+            self._spill_before(period - self.max_rows + 1)
+            size = len(self.rows)
+        grow = min(max(period - self.first - size + 1, size), self.max_rows - size)
+        self.rows = np.concatenate([self.rows, np.zeros((grow, len(CATEGORIES)))])
+        return True
+
+    def _spill_before(self, new_first: int) -> None:
+        """Moves rows before `new_first` out of the dense array (non-empty ones to `sparse`)."""
+        cut = new_first - self.first
+        for i in np.flatnonzero(self.rows[:cut].any(axis=1)):
+            self.sparse[self.first + int(i)] = self.rows[i].copy()
+        self.rows = self.rows[cut:].copy()
+        self.first = new_first
+
+
+class UserSpending:
+    """Daily, weekly and monthly totals plus a running all-time vector for one user."""
+
+    __slots__ = ("daily", "weekly", "monthly", "totals", "count")
+
+    def __init__(self, day: int):
+        # Dense rows for about the last two years of days, five of weeks and twenty of months.
+        self.daily = PeriodTotals(day, capacity=32, max_rows=732)
+        self.weekly = PeriodTotals(week_number(day), max_rows=260)
+        self.monthly = PeriodTotals(month_number(day), max_rows=240)
+        self.totals = np.zeros(len(CATEGORIES))
+        self.count = 0
+
+    def add(self, day: int, category: int, amount: float, count: int = 1) -> None:
+        # Everything that can fail comes before the first update, so a bad row changes nothing.
+        week, month, amount = week_number(day), month_number(day), float(amount)
+        self.daily.add(day, category, amount)
+        self.weekly.add(week, category, amount)
+        self.monthly.add(month, category, amount)
+        self.totals[category] += amount
+        self.count += count
+
+    def approx_bytes(self) -> int:
+        return self.daily.nbytes() + self.weekly.nbytes() + self.monthly.nbytes() + self.totals.nbytes
+
+
+# ==============================================================================
+# 3. AGGREGATES FOR ALL USERS
+# ==============================================================================
+
+def _by_category(vector: np.ndarray) -> Dict[str, float]:
+    return {category: round(float(value), 2) for category, value in zip(CATEGORIES, vector)}
+
+
+def _ratios(vector: np.ndarray) -> Dict[str, float]:
+    total = float(vector.sum())
+    buckets = BUCKET_MATRIX @ vector
+    return {name: round(float(value) / total, 4) if total else 0.0 for name, value in zip(BUCKETS, buckets)}
+
+
+class SpendingAggregates:
+    """
+    Spending rollups kept in memory and updated as expenses are committed.
+
+    Attach it to an ExpenseLedger: existing expenses are loaded once with a
+    GROUP BY over (user, day, category), after which every committed batch is
+    added incrementally. A snapshot is a vectorized sum over the window's
+    daily rows plus a few weekly/monthly rows: its cost depends on the number
+    of days and categories, never on how many expenses the user has logged.
+
+    When several processes write to the same ledger file, attach with
+    shared=True: instead of hearing only its own batches, each process
+    reads rows past the last rowid it has seen before every snapshot.
+    """
+
+    def __init__(self, utc_offset_minutes: int = 0):
+        self.utc_offset_seconds = utc_offset_minutes * 60
+        self._users: Dict[Hashable, UserSpending] = {}
+        self._lock = threading.Lock()
+        self._ledger = None
+        self._last_rowid = 0
+        self.expenses_seen = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def attach(self, ledger, shared: bool = False) -> None:
+        if shared:
+            self._ledger = ledger
+            ledger.subscribe(None, replay=self.load)
+        else:
+            ledger.subscribe(self.add_batch, replay=self.load)
+
+    def load(self, conn) -> None:
+        """Rebuilds the rollups from the ledger's table."""
+        (last_rowid,) = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM expenses").fetchone()
+        rows = conn.execute(
+            "SELECT user_id, CAST((timestamp + ?) / ? AS INTEGER) AS day, category, SUM(amount), COUNT(*)"
+            " FROM expenses WHERE rowid <= ? GROUP BY user_id, day, category",
+            (self.utc_offset_seconds, SECONDS_PER_DAY, last_rowid),
+        )
+        with self._lock:
+            for user_id, day, category, amount, count in rows:
+                try:
+                    self._add(user_id, day, category, amount, count)
+                except BAD_ROW as e:
+                    self._reject(user_id, count, e)
+            self._last_rowid = last_rowid
+
+    def catch_up(self) -> None:
+        """Adds rows committed since the last call by any process (shared mode only)."""
+        if self._ledger is None:
+            return
+        rows = self._ledger.committed_since(self._last_rowid)
+        with self._lock:
+            for rowid, user_id, timestamp, category, amount in rows:
+                if rowid <= self._last_rowid:
+                    continue  # another thread caught up on this row first
+                self._last_rowid = rowid
+                try:
+                    self._add(user_id, day_number(timestamp, self.utc_offset_seconds), category, amount, 1)
+                except BAD_ROW as e:
+                    self._reject(user_id, 1, e)
+
+    def add_batch(self, expenses: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for e in expenses:
+                try:
+                    self._add(e["user_id"], day_number(e["timestamp"], self.utc_offset_seconds),
+                              e["category"], e["amount"], 1)
+                except BAD_ROW as exc:
+                    self._reject(e["user_id"], 1, exc)
+
+    def today(self) -> int:
+        return day_number(datetime.datetime.now(datetime.timezone.utc).timestamp(), self.utc_offset_seconds)
+
+    def snapshot(self, user_id: Hashable, start: Optional[datetime.date] = None,
+                 end: Optional[datetime.date] = None, today: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Totals, 50/30/20 ratios and rollups for one user.
+
+        The window is [start, end] inclusive and defaults to the current month.
+        """
+        today = self.today() if today is None else today
+        start_day = date_to_day(start) if start else month_start(month_number(today))
+        end_day = date_to_day(end) if end else today
+        if end_day < start_day:
+            raise ValueError("end must not be before start")
+
+        self.catch_up()
+        with self._lock:
+            spending = self._users.get(str(user_id))
+            if spending is None:
+                spending = UserSpending(today)  # empty, never stored
+            window = spending.daily.sum(start_day, end_day + 1)
+            totals = spending.totals.copy()
+            count = spending.count
+            rollups = {}
+            for name, periods in ROLLUP_PERIODS.items():
+                if name == "daily":
+                    first, series, first_day = today - periods + 1, spending.daily, lambda p: p
+                elif name == "weekly":
+                    first, series, first_day = week_number(today) - periods + 1, spending.weekly, week_start
+                else:
+                    first, series, first_day = month_number(today) - periods + 1, spending.monthly, month_start
+                rows = series.window(first, periods)
+                rollups[name] = [
+                    {"start": day_to_date(first_day(first + i)).isoformat(),
+                     "total": round(float(row.sum()), 2),
+                     "by_category": _by_category(row)}
+                    for i, row in enumerate(rows)
+                ]
+
+        return {
+            "as_of": day_to_date(today).isoformat(),
+            "categories": list(CATEGORIES),
+            "all_time": {"total": round(float(totals.sum()), 2), "expenses": count,
+                         "by_category": _by_category(totals), "ratios": _ratios(totals)},
+            "window": {"start": day_to_date(start_day).isoformat(), "end": day_to_date(end_day).isoformat(),
+                       "total": round(float(window.sum()), 2), "by_category": _by_category(window),
+                       "ratios": _ratios(window)},
+            "target_ratios": TARGET_RATIOS,
+            "rollups": rollups,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "expenses": self.expenses_seen,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+                "approx_bytes": sum(s.approx_bytes() for s in self._users.values()),
+            }
+
+    # --- internal helpers (caller holds the lock) ---
+
+    def _reject(self, user_id: Hashable, count: int, error: Exception) -> None:
+        """Counts rows that couldn't be added; the rest of their batch still is."""
+        if self.last_error is None:
+            print(f"Spending rollups skipped an expense of user {user_id}: {error}")
+        self.rejected += count
+        self.last_error = str(error)[:200]
+
+    def _add(self, user_id: Hashable, day: int, category: str, amount: float, count: int) -> None:
+        user_id = str(user_id)
+        spending = self._users.get(user_id)
+        if spending is None:
+            spending = self._users[user_id] = UserSpending(day)
+        spending.add(day, CATEGORY_INDEX.get(category, CATEGORY_INDEX["other"]), amount, count)
+        self.expenses_seen += count
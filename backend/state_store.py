@@ -0,0 +1,211 @@
+# backend/state_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# ==============================================================================
+# 1. STORE INTERFACE
+# ==============================================================================
+
+class StateStore:
+    """
+    Key-value store for state that must outlive a request: chat histories,
+    rate-limit buckets. Values are JSON-serializable; `ttl` is in seconds
+    and refreshed on every write. `shared` is True when other processes
+    see the same data (so several workers can serve the same user).
+    """
+
+    shared = False
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def update(self, key: str, fn: Callable[[Any], Any], ttl: Optional[float] = None) -> Any:
+        """Atomically replaces the value with fn(old value or None) and returns the new value."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+# How often (in writes) expired keys are swept out.
+SWEEP_EVERY = 1000
+
+
+def _expires_at(ttl: Optional[float], now: float) -> Optional[float]:
+    return now + ttl if ttl is not None else None
+
+
+# ==============================================================================
+# 2. IN-MEMORY STORE (single process, the default)
+# ==============================================================================
+
+class InMemoryStore(StateStore):
+    """A dict with expiry. Values are kept as given, so store fresh objects."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.reads = 0
+        self.writes = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            self.reads += 1
+            return self._get(key, time.time())
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._set(key, value, _expires_at(ttl, now), now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def update(self, key: str, fn: Callable[[Any], Any], ttl: Optional[float] = None) -> Any:
+        now = time.time()
+        with self._lock:
+            value = fn(self._get(key, now))
+            self._set(key, value, _expires_at(ttl, now), now)
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "keys": len(self._data), "reads": self.reads, "writes": self.writes}
+
+    # --- internal helpers (caller holds the lock) ---
+
+    def _get(self, key: str, now: float) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        return value
+
+    def _set(self, key: str, value: Any, expires_at: Optional[float], now: float) -> None:
+        self._data[key] = (value, expires_at)
+        self.writes += 1
+        if self.writes % SWEEP_EVERY == 0:
+            for k in [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]:
+                del self._data[k]
+
+
+# ==============================================================================
+# 3. SQLITE STORE (shared by every process on this machine)
+# ==============================================================================
+
+class SQLiteStore(StateStore):
+    """
+    Key-value table in a SQLite database in WAL mode. Every worker process
+    opens the same file, so any of them can continue a conversation, and
+    the data survives restarts. Read-modify-write (update) takes SQLite's
+    write lock (BEGIN IMMEDIATE), which serializes it across processes.
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_kv_expires_at ON kv (expires_at)")
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            self.reads += 1
+            return self._get(key, time.time())
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._set(key, json.dumps(value, separators=(",", ":")), _expires_at(ttl, now), now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def update(self, key: str, fn: Callable[[Any], Any], ttl: Optional[float] = None) -> Any:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self._get(key, now))
+                self._set(key, json.dumps(value, separators=(",", ":")), _expires_at(ttl, now), now)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (keys,) = self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()
+        return {"backend": "sqlite", "path": self.path, "keys": keys, "reads": self.reads, "writes": self.writes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- internal helpers (caller holds the lock) ---
+
+    def _get(self, key: str, now: float) -> Any:
+        row = self._conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None
+        return json.loads(row[0])
+
+    def _set(self, key: str, text: str, expires_at: Optional[float], now: float) -> None:
+        self._conn.execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, text, expires_at),
+        )
+        self._wrote(now)
+
+    def _wrote(self, now: float) -> None:
+        self.writes += 1
+        if self.writes % SWEEP_EVERY == 0:
+            self._conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+
+
+# ==============================================================================
+# 4. FACTORY
+# ==============================================================================
+
+def open_store(url: str) -> StateStore:
+    """"memory://" or "sqlite:///relative/path.sqlite3" ("sqlite:////abs/path" for absolute paths)."""
+    if url in ("memory://", "memory", ""):
+        return InMemoryStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported STATE_STORE_URL {url!r}; use memory:// or sqlite:///path")
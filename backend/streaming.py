@@ -0,0 +1,81 @@
+# backend/streaming.py
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+# ==============================================================================
+# 1. SERVER-SENT EVENT FORMATTING
+# ==============================================================================
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Encodes one Server-Sent Event frame with a JSON payload."""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# Headers that stop proxies (nginx et al.) from buffering the stream.
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+# ==============================================================================
+# 2. TIME-TO-FIRST-TOKEN TRACKING
+# ==============================================================================
+
+class StreamTimer:
+    """Times a single streamed answer: first token and total duration."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.chunks = 0
+
+    def mark_chunk(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.chunks += 1
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return round((self.first_token_at - self.started) * 1000, 1)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "ttft_ms": self.ttft_ms,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "chunks": self.chunks,
+        }
+
+
+class TTFTStats:
+    """Rolling window of recent time-to-first-token samples."""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, timer: StreamTimer) -> None:
+        if timer.ttft_ms is None:
+            return
+        with self._lock:
+            self._samples.append(timer.ttft_ms)
+            self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count, "p50_ms": None, "p95_ms": None}
+        return {
+            "count": self.count,
+            "p50_ms": samples[len(samples) // 2],
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        }
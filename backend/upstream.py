@@ -0,0 +1,430 @@
+# backend/upstream.py
+import asyncio
+import collections
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+# ==============================================================================
+# 1. ERRORS
+# ==============================================================================
+
+class UpstreamError(Exception):
+    """Base class for failures raised by the call wrapper itself."""
+
+
+class CircuitOpen(UpstreamError):
+    """The breaker is open: the call was not attempted. Retry after `retry_after` seconds."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open")
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class DeadlineExceeded(UpstreamError, TimeoutError):
+    """The call (including retries and hedges) ran past its deadline."""
+
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection problems and 408/429/5xx answers; not bad requests."""
+    if isinstance(exc, (TimeoutError, OSError)):  # requests' connection errors are OSErrors
+        return True
+    if any(cls.__name__ == "TransportError" for cls in type(exc).__mro__):  # httpx, without importing it
+        return True
+    code = getattr(exc, "code", None)
+    if not isinstance(code, int):
+        code = getattr(exc, "status_code", None)
+    return isinstance(code, int) and code in RETRYABLE_STATUS
+
+
+# ==============================================================================
+# 2. CIRCUIT BREAKER
+# ==============================================================================
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed -> open after `failure_threshold` consecutive retryable failures.
+    open -> half_open once `reset_timeout` seconds have passed; one probe
+    call is let through (another one every `reset_timeout` if a probe never
+    reports back). half_open -> closed on success, -> open on failure.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30,
+                 on_transition: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_transition = on_transition
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_at = 0.0
+        self.transitions: Deque[Dict[str, Any]] = collections.deque(maxlen=20)
+        self.transition_counts: Dict[str, int] = collections.Counter()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self._transition(self.HALF_OPEN, "reset timeout elapsed")
+            if self.state == self.HALF_OPEN:
+                if self.probe_at and now - self.probe_at < self.reset_timeout:
+                    return False  # a probe is already in flight
+                self.probe_at = now
+            return True
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpen(self.name, self.retry_after())
+
+    def retry_after(self) -> float:
+        if self.state == self.OPEN:
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return self.reset_timeout if self.state == self.HALF_OPEN else 0.0
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED, "probe succeeded")
+
+    def record_failure(self, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            reason = type(exc).__name__ if exc is not None else "failure"
+            if self.state == self.HALF_OPEN:
+                self._transition(self.OPEN, f"probe failed: {reason}")
+            elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._transition(self.OPEN, f"{self.consecutive_failures} consecutive failures ({reason})")
+
+    def _transition(self, state: str, reason: str) -> None:
+        event = {"from": self.state, "to": state, "at": time.time(), "reason": reason}
+        self.state = state
+        self.probe_at = 0.0
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        self.transitions.append(event)
+        self.transition_counts[state] += 1
+        print(f"Circuit {self.name}: {event['from']} -> {state} ({reason})")
+        if self.on_transition is not None:
+            self.on_transition(event)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after": round(self.retry_after(), 1),
+            "transitions": list(self.transitions),
+        }
+
+
+# ==============================================================================
+# 3. RETRY BUDGET
+# ==============================================================================
+
+class RetryBudget:
+    """
+    Caps retries (and hedges) to a fraction of calls, so a failing upstream
+    sees at most (1 + ratio) times normal traffic instead of `attempts` times.
+
+    Each call deposits `ratio` tokens, each retry withdraws one. A trickle of
+    `min_per_second` tokens keeps retries possible at low traffic.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 10):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.refilled_at) * self.min_per_second)
+        self.refilled_at = now
+
+
+# ==============================================================================
+# 4. UPSTREAM CALL WRAPPER
+# ==============================================================================
+
+class Upstream:
+    """
+    Deadline, jittered retries, optional hedging and a circuit breaker around
+    calls to one upstream service.
+
+    Every call gets `deadline` seconds in total and each attempt at most
+    `attempt_timeout` of it. Retryable failures (see is_retryable) are
+    retried up to `max_attempts` times with full-jitter exponential backoff,
+    as long as the retry budget allows. With `hedge_after` set, an attempt
+    that hasn't answered by then gets a second identical request and the
+    first answer wins (only for idempotent calls).
+
+    `call` is for blocking functions (run on a small thread pool so the
+    caller can stop waiting); `acall` is for coroutine factories. Streams
+    can't be retried once they start, so only the breaker applies: call
+    admit() before opening one, then record_success() or record_failure()
+    when it ends.
+    """
+
+    def __init__(self, name: str, attempt_timeout: float = 20, deadline: float = 45, max_attempts: int = 2,
+                 backoff_base: float = 0.25, backoff_max: float = 2.0, hedge_after: Optional[float] = None,
+                 retry_budget: Optional[RetryBudget] = None, breaker: Optional[CircuitBreaker] = None,
+                 max_workers: int = 32):
+        self.name = name
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after or None
+        self.budget = retry_budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker(name)
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.retries_denied = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.short_circuited = 0
+
+    # --- blocking calls (Flask) ---
+
+    def call(self, fn: Callable[[], T]) -> T:
+        self.admit()
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = self._attempt(fn, self._attempt_budget(started))
+            except Exception as e:
+                delay = self._after_failure(e, attempt, started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.record_success()
+            return result
+
+    def _attempt(self, fn: Callable[[], T], timeout: float) -> T:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=f"{self.name}-upstream")
+        started = time.monotonic()
+        original = self._executor.submit(fn)
+        futures = [original]
+        hedged = False
+        error: Optional[BaseException] = None
+        while futures:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            wait_for = remaining
+            if self._should_hedge(hedged):
+                wait_for = min(remaining, max(0.0, self.hedge_after - (time.monotonic() - started)))
+            done, _ = wait(futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+            if not done:
+                if self._should_hedge(hedged):
+                    hedged = True
+                    if self._start_hedge():
+                        futures.append(self._executor.submit(fn))
+                continue
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None:
+                    if future is not original:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        # Threads can't be interrupted; the SDK's own timeout ends them later.
+        for future in futures:
+            future.cancel()
+        if error is not None and not futures:
+            raise error
+        raise DeadlineExceeded(f"{self.name} did not answer within {timeout:.1f}s")
+
+    # --- coroutine calls (FastAPI) ---
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.admit()
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await self._aattempt(fn, self._attempt_budget(started))
+            except Exception as e:
+                delay = self._after_failure(e, attempt, started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.record_success()
+            return result
+
+    async def _aattempt(self, fn: Callable[[], Awaitable[T]], timeout: float) -> T:
+        started = time.monotonic()
+        original = asyncio.ensure_future(fn())
+        tasks: List[asyncio.Future] = [original]
+        hedged = False
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    break
+                wait_for = remaining
+                if self._should_hedge(hedged):
+                    wait_for = min(remaining, max(0.0, self.hedge_after - (time.monotonic() - started)))
+                done, _ = await asyncio.wait(tasks, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if self._should_hedge(hedged):
+                        hedged = True
+                        if self._start_hedge():
+                            tasks.append(asyncio.ensure_future(fn()))
+                    continue
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        if task is not original:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            if error is not None and not tasks:
+                raise error
+            raise DeadlineExceeded(f"{self.name} did not answer within {timeout:.1f}s")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # --- shared bookkeeping ---
+
+    def admit(self) -> None:
+        """Raises CircuitOpen if the breaker is open. Streams then report record_success/record_failure."""
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise CircuitOpen(self.name, self.breaker.retry_after())
+        self.calls += 1
+        self.budget.deposit()
+
+    def _attempt_budget(self, started: float) -> float:
+        remaining = self.deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{self.name} call ran past its {self.deadline:.1f}s deadline")
+        return min(self.attempt_timeout, remaining)
+
+    def _should_hedge(self, hedged: bool) -> bool:
+        return self.hedge_after is not None and not hedged
+
+    def _start_hedge(self) -> bool:
+        if not self.budget.withdraw():
+            self.retries_denied += 1
+            return False
+        self.hedges += 1
+        return True
+
+    def _record_outcome(self, exc: BaseException) -> bool:
+        """Feeds a failure to the breaker; returns whether it was retryable."""
+        retryable = is_retryable(exc)
+        if isinstance(exc, TimeoutError):
+            self.timeouts += 1
+        if retryable:
+            self.breaker.record_failure(exc)
+        else:
+            # The upstream answered (e.g. 400): it is healthy, the request wasn't.
+            self.breaker.record_success()
+        return retryable
+
+    def _after_failure(self, exc: BaseException, attempt: int, started: float) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error should be raised."""
+        retryable = self._record_outcome(exc)
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        remaining = self.deadline - (time.monotonic() - started)
+        if not retryable or attempt >= self.max_attempts or backoff >= remaining or not self.breaker.allow():
+            self.failures += 1
+            return None
+        if not self.budget.withdraw():
+            self.retries_denied += 1
+            self.failures += 1
+            return None
+        self.retries += 1
+        return backoff
+
+    def record_success(self) -> None:
+        self.successes += 1
+        self.breaker.record_success()
+
+    def record_failure(self, exc: BaseException) -> None:
+        self._record_outcome(exc)
+        self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "retries_denied": self.retries_denied,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "short_circuited": self.short_circuited,
+            "retry_tokens": round(self.budget.tokens, 2),
+            "circuit": self.breaker.snapshot(),
+        }
+
+    def collect(self):
+        """Metrics collector (see backend/metrics.py Registry.add_collector)."""
+        labels = {"upstream": self.name}
+        counters = [
+            ("upstream_calls_total", "Calls admitted past the circuit breaker.", self.calls),
+            ("upstream_failures_total", "Calls that failed after retries.", self.failures),
+            ("upstream_timeouts_total", "Attempts that hit their deadline.", self.timeouts),
+            ("upstream_retries_total", "Retries sent.", self.retries),
+            ("upstream_retries_denied_total", "Retries or hedges refused by the retry budget.",
+             self.retries_denied),
+            ("upstream_hedges_total", "Hedged second requests sent.", self.hedges),
+            ("upstream_short_circuited_total", "Calls rejected because the circuit was open.",
+             self.short_circuited),
+        ]
+        families = [(name, "counter", help, [(labels, value)]) for name, help, value in counters]
+        families.append(("upstream_circuit_state", "gauge", "1 for the breaker's current state.",
+                         [(dict(labels, state=s), 1 if self.breaker.state == s else 0)
+                          for s in (CircuitBreaker.CLOSED, CircuitBreaker.HALF_OPEN, CircuitBreaker.OPEN)]))
+        families.append(("upstream_circuit_transitions_total", "counter", "Breaker state changes by new state.",
+                         [(dict(labels, to=s), n) for s, n in sorted(self.breaker.transition_counts.items())]))
+        return families
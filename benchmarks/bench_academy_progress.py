@@ -0,0 +1,118 @@
+# benchmarks/bench_academy_progress.py
+"""
+Measures the academy progress store (backend/academy_progress.py).
+
+Fills a progress database for `--users` users on `--tracks` tracks of
+`--questions` questions each, every user having seen a random
+`--seen` fraction of them and answered half of those correctly, and
+reports:
+
+  * database size and bytes per user x question pair, next to a table
+    with one row per (user, track, question) filled for a sample of users,
+  * mark_seen() and grade() calls per second,
+  * QuizBank.get_quiz() time when ordering by a user's seen bitset.
+
+Usage:
+    python benchmarks/bench_academy_progress.py [--users 100000] [--questions 200]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.academy_progress import AcademyProgress, bits_of, to_blob
+from backend.quiz_bank import QuizBank
+
+TRACKS = ["budgeting", "credit", "investing", "taxes", "insurance"]
+
+
+def user_rows(users, tracks, questions, seen_fraction, rng):
+    """(user_id, track, seen ids, correct ids) for every user and track."""
+    ids = list(range(1, questions + 1))
+    for user in range(users):
+        for track in tracks:
+            seen = rng.sample(ids, int(questions * seen_fraction))
+            yield f"user-{user}", track, seen, seen[:len(seen) // 2]
+
+
+def db_bytes(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--tracks", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--seen", type=float, default=0.5, help="fraction of questions each user has seen")
+    parser.add_argument("--sample", type=int, default=2000, help="users in the one-row-per-answer comparison")
+    parser.add_argument("--ops", type=int, default=5000)
+    args = parser.parse_args()
+    rng = random.Random(7)
+    tracks = TRACKS[:args.tracks]
+    pairs = args.users * len(tracks) * args.questions
+
+    with tempfile.TemporaryDirectory(prefix="finsense-academy-") as tmp:
+        path = os.path.join(tmp, "academy.sqlite3")
+        store = AcademyProgress(path)
+        started = time.perf_counter()
+        with sqlite3.connect(path) as conn:
+            conn.executemany(
+                "INSERT INTO academy_progress (user_id, track, seen, correct, xp, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                ((user, track, to_blob(bits_of(seen)), to_blob(bits_of(correct)), 10 * len(correct), 0.0)
+                 for user, track, seen, correct in user_rows(args.users, tracks, args.questions, args.seen, rng)))
+        print(f"filled {args.users:,} users x {len(tracks)} tracks in {time.perf_counter() - started:.1f}s")
+        bitset_size = db_bytes(path)
+
+        rows_path = os.path.join(tmp, "rows.sqlite3")
+        with sqlite3.connect(rows_path) as conn:
+            conn.execute("CREATE TABLE answers (user_id TEXT, track TEXT, question_id INTEGER, correct INTEGER,"
+                         " PRIMARY KEY (user_id, track, question_id)) WITHOUT ROWID")
+            conn.executemany(
+                "INSERT INTO answers VALUES (?, ?, ?, ?)",
+                ((user, track, qid, int(qid in correct))
+                 for user, track, seen, correct in user_rows(args.sample, tracks, args.questions, args.seen, rng)
+                 for correct in [set(correct)] for qid in seen))
+        rows_size = db_bytes(rows_path) * args.users / args.sample
+
+        print(f"{'layout':<22} {'size':>10} {'bytes/pair':>11}")
+        print(f"{'bitsets (this store)':<22} {bitset_size / 2**20:>7.1f} MB {bitset_size / pairs:>11.3f}")
+        print(f"{'row per answer (est.)':<22} {rows_size / 2**20:>7.1f} MB {rows_size / pairs:>11.3f}")
+        print(f"({pairs:,} user x question pairs, {args.seen:.0%} seen)")
+
+        users = [f"user-{rng.randrange(args.users)}" for _ in range(args.ops)]
+        started = time.perf_counter()
+        for user in users:
+            store.mark_seen(user, tracks[0], rng.sample(range(1, args.questions + 1), 5))
+        print(f"mark_seen: {args.ops / (time.perf_counter() - started):,.0f} /s")
+        key = {qid: qid % 4 for qid in range(1, args.questions + 1)}
+        started = time.perf_counter()
+        for user in users:
+            answers = {qid: rng.randrange(4) for qid in rng.sample(range(1, args.questions + 1), 5)}
+            store.grade(user, tracks[0], answers, key)
+        print(f"grade (5 answers): {args.ops / (time.perf_counter() - started):,.0f} /s")
+        store.close()
+
+    bank = QuizBank(max_per_track=args.questions, max_serves=10**9)
+    bank.add("budgeting", [{"question": f"Question {i}?", "options": [f"a{i}", f"b{i}", f"c{i}", f"d{i}"],
+                            "correct": i % 4} for i in range(args.questions)])
+    seen_ids = rng.sample(range(1, args.questions + 1), int(args.questions * args.seen))
+    ordered = {"seen": bits_of(seen_ids), "correct": bits_of(seen_ids[:len(seen_ids) // 2])}
+    for label, kwargs in (("random", {}), ("unseen first", ordered)):
+        started = time.perf_counter()
+        for _ in range(2000):
+            bank.get_quiz("budgeting", **kwargs)
+        print(f"get_quiz ({label}): {(time.perf_counter() - started) / 2000 * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
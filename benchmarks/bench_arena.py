@@ -0,0 +1,196 @@
+# benchmarks/bench_arena.py
+"""
+Load test for the arena WebSocket hub.
+
+Starts backend/app.py under uvicorn, opens ROOMS x PLAYERS WebSocket
+connections (one per player) and has every player send +1 score deltas at
+RATE messages/second for DURATION seconds. Reports connect latency, the
+delay between a player sending a delta and seeing its new score in a
+broadcast diff, delivered messages/sec and server memory, then checks each
+room's final scores against the number of deltas its players sent (no lost
+or double-applied updates).
+
+Usage:
+    python benchmarks/bench_arena.py [--rooms 200] [--players 24] [--rate 0.5] [--duration 10]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import websockets
+
+from benchmarks.loadtest import build_servers, percentile
+
+
+class PlayerStats:
+    def __init__(self):
+        self.connect_ms: List[float] = []
+        self.latency_ms: List[float] = []
+        self.sent = 0
+        self.received = 0
+        self.received_bytes = 0
+        self.errors = 0
+        self.failures: List[str] = []
+        self.mismatched = 0
+
+    def merge(self, other: "PlayerStats") -> None:
+        self.connect_ms += other.connect_ms
+        self.latency_ms += other.latency_ms
+        self.sent += other.sent
+        self.received += other.received
+        self.received_bytes += other.received_bytes
+        self.errors += other.errors
+        self.failures += other.failures
+        self.mismatched += other.mismatched
+
+
+async def play(url: str, room: str, uid: str, create: bool, rate: float, duration: float,
+               start_at: float, stats: PlayerStats, sent_per_player: Dict[str, int],
+               handshakes: asyncio.Semaphore) -> None:
+    query = f"uid={uid}&name={uid}" + ("&create=1" if create else "")
+    async with handshakes:
+        started = time.perf_counter()
+        ws = await websockets.connect(f"{url}/ws/arena/{room}?{query}", max_queue=None, open_timeout=60)
+        stats.connect_ms.append((time.perf_counter() - started) * 1000)
+    async with ws:
+        pending: List[List[float]] = []   # [score we expect to see, time sent]
+
+        async def receive():
+            async for raw in ws:
+                stats.received += 1
+                stats.received_bytes += len(raw)
+                msg = json.loads(raw)
+                if msg["t"] == "error":
+                    stats.errors += 1
+                elif msg["t"] == "score" and uid in msg["s"]:
+                    seen, now = msg["s"][uid], time.perf_counter()
+                    while pending and pending[0][0] <= seen:
+                        stats.latency_ms.append((now - pending.pop(0)[1]) * 1000)
+
+        receiver = asyncio.create_task(receive())
+        # Everyone starts sending at the same moment, once all rooms are populated.
+        await asyncio.sleep(max(0, start_at - time.time()))
+        score = 0
+        interval = 1 / rate
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            score += 1
+            pending.append([score, time.perf_counter()])
+            await ws.send('{"t":"score","d":1}')
+            stats.sent += 1
+            await asyncio.sleep(interval)
+        sent_per_player[uid] = score
+        # Let the last diffs arrive.
+        await asyncio.sleep(0.5)
+        receiver.cancel()
+
+
+async def run(url: str, http_url: str, codes: List[str], players: int, rate: float, duration: float,
+              start_at: float) -> PlayerStats:
+    stats = PlayerStats()
+    sent_per_player: Dict[str, int] = {}
+    # Open connections a few at a time, like players trickling in.
+    handshakes = asyncio.Semaphore(50)
+
+    # Hosts create the rooms first, then everyone else joins.
+    hosts = [asyncio.create_task(play(url, code, f"{code}-p0", True, rate, duration, start_at, stats,
+                                      sent_per_player, handshakes)) for code in codes]
+    await asyncio.sleep(1)
+    guests = [asyncio.create_task(play(url, code, f"{code}-p{p}", False, rate, duration, start_at, stats,
+                                       sent_per_player, handshakes)) for code in codes for p in range(1, players)]
+    results = await asyncio.gather(*hosts, *guests, return_exceptions=True)
+    stats.failures = [repr(r) for r in results if isinstance(r, Exception)]
+
+    # Every delta must be reflected exactly once in the room state. Give a
+    # backlogged server a few seconds to finish applying what it received.
+    async with httpx.AsyncClient(base_url=http_url, timeout=30) as http:
+        for attempt in range(10):
+            stats.mismatched = 0
+            for code in codes:
+                state = (await http.get(f"/arena/rooms/{code}")).json()
+                for uid, _, score, _ in state["players"]:
+                    if score != sent_per_player.get(uid, 0):
+                        stats.mismatched += 1
+            if not stats.mismatched:
+                break
+            await asyncio.sleep(1)
+    return stats
+
+
+def cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a process from /proc (Linux); 0 elsewhere."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def run_client(args) -> PlayerStats:
+    return asyncio.run(run(*args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--players", type=int, default=24, help="players per room")
+    parser.add_argument("--rate", type=float, default=0.5, help="score messages per player per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of scoring")
+    parser.add_argument("--clients", type=int, default=max(1, min(4, (os.cpu_count() or 1) - 1)),
+                        help="client processes sharing the rooms (keep a core free for the server)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        server = build_servers("http://127.0.0.1:9", data_dir, ["backend"])["backend"]
+        server.env.update({"ARENA_MAX_ROOMS": str(args.rooms + 10), "ARENA_MAX_PLAYERS": str(args.players)})
+        print(f"backend ready in {server.start():.1f}s")
+        codes = [f"BENCH{r:04d}" for r in range(args.rooms)]
+        # Sending starts after a ramp long enough for every connection to be open.
+        start_at = time.time() + 3 + args.rooms * args.players / 500
+        jobs = [(f"ws://127.0.0.1:{server.port}", server.base_url, codes[i::args.clients], args.players,
+                 args.rate, args.duration, start_at) for i in range(args.clients)]
+        try:
+            started = time.perf_counter()
+            cpu_before = cpu_seconds(server.proc.pid)
+            with multiprocessing.Pool(args.clients) as pool:
+                results = pool.map(run_client, jobs)
+            elapsed = time.perf_counter() - started
+            server_cpu = cpu_seconds(server.proc.pid) - cpu_before
+            rss = server.rss()
+        finally:
+            server.stop()
+
+    stats = PlayerStats()
+    for result in results:
+        stats.merge(result)
+    connect, latency = sorted(stats.connect_ms), sorted(stats.latency_ms)
+    print(f"{args.rooms} rooms x {args.players} players = {args.rooms * args.players} connections "
+          f"({len(stats.failures)} failed)")
+    print(f"connect          p50 {percentile(connect, 50):7.1f} ms   p99 {percentile(connect, 99):7.1f} ms")
+    print(f"delta->broadcast p50 {percentile(latency, 50):7.1f} ms   p95 {percentile(latency, 95):7.1f} ms"
+          f"   p99 {percentile(latency, 99):7.1f} ms")
+    print(f"score messages sent      {stats.sent:,} ({stats.sent / args.duration:,.0f}/s)")
+    print(f"fan-out messages recv'd  {stats.received:,} ({stats.received_bytes / 1e6:.1f} MB, "
+          f"{stats.received / elapsed:,.0f}/s over the run)")
+    print(f"errors from server       {stats.errors}")
+    print(f"scores not matching sent {stats.mismatched}")
+    print(f"server CPU               {server_cpu:.1f}s over {elapsed:.1f}s "
+          f"(client and server share {os.cpu_count()} core(s))")
+    if rss:
+        print(f"server RSS               {rss / 2**20:.0f} MiB")
+    for failure in stats.failures[:3]:
+        print("failure:", failure)
+
+
+if __name__ == "__main__":
+    main()
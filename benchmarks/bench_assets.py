@@ -0,0 +1,108 @@
+# benchmarks/bench_assets.py
+"""
+Compares what a browser fetches for the SPA shell from the Flask app with
+the source files served one by one vs. the fingerprinted bundle
+(python -m backend.assets).
+
+Works on a copy of static/ and drives the app through Flask's test client,
+following the <link>/<script> tags of the rendered page. For each mode it
+reports requests and bytes on the wire for:
+
+  * a first visit to the dashboard,
+  * a first visit that then opens every other screen (route chunks),
+  * a repeat visit (revalidation for the source files; nothing for the
+    immutable bundle),
+
+and the time to build the bundle and to serve /dist/ files.
+
+Usage:
+    python benchmarks/bench_assets.py [--requests 2000]
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as flask_app
+from backend.assets import ROUTE_CHUNKS, AssetBundle, build
+
+ASSET_TAG = re.compile(r'<(?:script|link)[^>]+(?:src|href)="(/(?:static|dist)/[^"]+)"')
+BROWSER = {'Accept-Encoding': 'gzip, deflate, br'}
+
+
+def fetch(client, url, cache):
+    """GETs `url` like a browser with `cache` (url -> etag); returns bytes on the wire, or None if not requested."""
+    etag = cache.get(url)
+    if etag == 'immutable':
+        return None
+    headers = dict(BROWSER)
+    if etag:
+        headers['If-None-Match'] = etag
+    response = client.get(url, headers=headers)
+    assert response.status_code in (200, 304), (url, response.status_code)
+    immutable = 'immutable' in response.headers.get('Cache-Control', '')
+    cache[url] = 'immutable' if immutable else response.headers.get('ETag')
+    return len(response.get_data())
+
+
+def visit(client, cache, screens=()):
+    page = client.get('/', headers=BROWSER).get_data(as_text=True)
+    urls = ASSET_TAG.findall(page)
+    chunks = re.search(r'window\.ROUTE_CHUNKS = (\{.*?\});', page).group(1)
+    urls += [url for screen in screens for url in re.findall(rf'"{screen}": "([^"]+)"', chunks)]
+    sizes = [fetch(client, url, cache) for url in urls]
+    sent = [size for size in sizes if size is not None]
+    return len(sent), sum(sent)
+
+
+def run(mode, static_dir, args):
+    assets = AssetBundle(static_dir, url_prefix='/dist/', static_url='/static/')
+    flask_app.assets = assets
+    flask_app.app.static_folder = static_dir
+    client = flask_app.app.test_client()
+    cache = {}
+    first = visit(client, cache)
+    everything = visit(client, {}, screens=ROUTE_CHUNKS)
+    repeat = visit(client, cache)
+
+    serve_rate = None
+    if assets.built:
+        url = assets.scripts()[0]
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            client.get(url, headers=BROWSER)
+        serve_rate = args.requests / (time.perf_counter() - started)
+    return {'mode': mode, 'first': first, 'all_screens': everything, 'repeat': repeat, 'serve_rate': serve_rate}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='requests for the /dist/ serving rate')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='finsense-assets-') as tmp:
+        static_dir = os.path.join(tmp, 'static')
+        shutil.copytree(flask_app.app.static_folder, static_dir, ignore=shutil.ignore_patterns('dist'))
+        results = [run('sources', static_dir, args)]
+        started = time.perf_counter()
+        build(static_dir)
+        build_ms = (time.perf_counter() - started) * 1000
+        results.append(run('bundle', static_dir, args))
+
+    print(f"{'mode':<8} {'first visit':>18} {'all screens':>18} {'repeat visit':>18}")
+    for r in results:
+        cells = [f"{n} req {size / 1024:>6.1f} KB" for n, size in (r['first'], r['all_screens'], r['repeat'])]
+        print(f"{r['mode']:<8} " + ' '.join(f"{cell:>18}" for cell in cells))
+    sources, bundle = results
+    saved = 1 - bundle['first'][1] / sources['first'][1]
+    print(f"first visit: {saved:.0%} fewer bytes, {sources['first'][0] - bundle['first'][0]} fewer requests")
+    print(f"bundle build: {build_ms:.0f} ms; /dist/ served at {bundle['serve_rate']:,.0f} req/s (test client)")
+
+
+if __name__ == '__main__':
+    main()
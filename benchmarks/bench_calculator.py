@@ -0,0 +1,104 @@
+# benchmarks/bench_calculator.py
+"""
+Measures the financial calculator (backend/calculator.py).
+
+For each calculator (lumpsum, sip, emi, ppf, nps) it reports scenarios per
+second through calculate() (JSON-style dicts in, dicts out) and through the
+vectorized formula alone, next to a month-by-month Python loop for SIPs,
+and checks the SIP results against that loop. It also times
+answer_question() on chat messages, numeric and not, since every coach
+message goes through it.
+
+Usage:
+    python benchmarks/bench_calculator.py [--scenarios 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.calculator import CALCULATORS, answer_question, calculate
+
+QUESTIONS = [
+    "how much will ₹5000/month become in 20 years?",
+    "What is the EMI for a 10 lakh loan at 9% for 5 years?",
+    "I am 25, how much pension from NPS with 5k per month?",
+    "What is the difference between a SIP and a lump sum?",
+    "Explain CIBIL score in simple words",
+]
+
+
+def make_scenarios(kind, n, rng):
+    if kind == "lumpsum":
+        return [{"principal": rng.randrange(1_000, 10_000_000), "annual_rate": rng.uniform(3, 15),
+                 "years": rng.randrange(1, 40), "compounding": rng.choice((1, 4, 12))} for _ in range(n)]
+    if kind == "sip":
+        return [{"monthly": rng.randrange(500, 100_000), "annual_rate": rng.uniform(0, 18),
+                 "years": rng.randrange(1, 40), "step_up": rng.choice((0, 5, 10))} for _ in range(n)]
+    if kind == "emi":
+        return [{"principal": rng.randrange(50_000, 20_000_000), "annual_rate": rng.uniform(6, 18),
+                 "years": rng.randrange(1, 30)} for _ in range(n)]
+    if kind == "ppf":
+        return [{"yearly": rng.randrange(500, 150_000), "annual_rate": rng.uniform(7, 8.5),
+                 "years": rng.choice((15, 20, 25, 30))} for _ in range(n)]
+    return [{"monthly": rng.randrange(500, 50_000), "current_age": rng.randrange(18, 55),
+             "annual_rate": rng.uniform(6, 14)} for _ in range(n)]
+
+
+def sip_loop(s):
+    """The obvious month-by-month simulation; what the formula has to agree with."""
+    i = s["annual_rate"] / 1200
+    value = invested = 0.0
+    for month in range(round(s["years"] * 12)):
+        amount = s["monthly"] * (1 + s["step_up"] / 100) ** (month // 12)
+        value = (value + amount) * (1 + i)
+        invested += amount
+    return invested, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'calculator':<10} {'calculate()':>16} {'formula only':>16}")
+    for kind, (formula, fields) in CALCULATORS.items():
+        scenarios = make_scenarios(kind, args.scenarios, rng)
+        started = time.perf_counter()
+        calculate(kind, scenarios)
+        end_to_end = time.perf_counter() - started
+
+        columns = {name: np.array([s.get(name, default) for s in scenarios], dtype=float)
+                   for name, default in fields.items()}
+        started = time.perf_counter()
+        formula(**columns)
+        vectorized = time.perf_counter() - started
+        print(f"{kind:<10} {args.scenarios / end_to_end:>12,.0f} /s {args.scenarios / vectorized:>12,.0f} /s")
+
+    # The loop is slow, so it runs on a sample.
+    sample = make_scenarios("sip", min(args.scenarios, 2000), rng)
+    started = time.perf_counter()
+    expected = [sip_loop(s) for s in sample]
+    loop_rate = len(sample) / (time.perf_counter() - started)
+    print(f"{'sip loop':<10} {loop_rate:>12,.0f} /s  (pure Python, month by month)")
+    worst = max(abs(result["value"] - value) / max(value, 1)
+                for result, (_, value) in zip(calculate("sip", sample), expected))
+    print(f"sip formula vs loop: worst relative error {worst:.1e}")
+
+    for question in QUESTIONS:
+        started = time.perf_counter()
+        for _ in range(1000):
+            answer = answer_question(question)
+        micros = (time.perf_counter() - started) * 1000
+        print(f"answer_question {micros:7.1f} us  {'answered' if answer else 'to model':<8}  {question}")
+
+
+if __name__ == "__main__":
+    main()
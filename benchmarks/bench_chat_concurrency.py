@@ -0,0 +1,113 @@
+# benchmarks/bench_chat_concurrency.py
+"""
+Measures /chat throughput against a local stub model.
+
+The stub replaces the Gemini client with one whose replies take a fixed
+LATENCY seconds (awaited, like the real async SDK). If the endpoint blocks
+the event loop, throughput stays at ~1/LATENCY no matter how many requests
+are in flight; if it doesn't, throughput grows with concurrency until the
+scheduler's slot count is reached.
+
+Usage:
+    python benchmarks/bench_chat_concurrency.py [--latency 0.2] [--requests 256]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+
+import backend.app as backend_app
+from backend.scheduler import LLMScheduler
+from backend.sessions import ChatSessionManager
+
+
+# ==============================================================================
+# 1. STUB GEMINI CLIENT
+# ==============================================================================
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class StubModels:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content(self, model, contents, config=None) -> StubResponse:
+        await asyncio.sleep(self.latency)
+        return StubResponse(f"Stub answer to: {contents[-1]['parts'][0]['text']}")
+
+
+class StubClient:
+    def __init__(self, latency: float):
+        self.aio = SimpleNamespace(models=StubModels(latency))
+
+
+# ==============================================================================
+# 2. LOAD GENERATOR
+# ==============================================================================
+
+async def run_level(concurrency: int, total: int, slots: int) -> dict:
+    # Every level (each its own asyncio.run) gets a fresh scheduler. Per-user
+    # and global rate limits are lifted: this measures throughput, not quotas.
+    backend_app.chat_scheduler = LLMScheduler(max_concurrency=slots, max_queue=10_000, user_rpm=1e9,
+                                              user_burst=10_000, user_max_queue=10_000,
+                                              global_rpm=1e9, global_tpm=1e12)
+    transport = httpx.ASGITransport(app=backend_app.app)
+    latencies = []
+    statuses = {}
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def worker():
+            for i in counter:
+                started = time.perf_counter()
+                res = await http.post("/chat", json={"message": f"q{i}"}, headers={"X-User-ID": str(i % 500)})
+                latencies.append(time.perf_counter() - started)
+                statuses[res.status_code] = statuses.get(res.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "wall_seconds": round(wall, 3),
+        "req_per_sec": round(total / wall, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub model latency in seconds")
+    parser.add_argument("--requests", type=int, default=256, help="requests per concurrency level")
+    parser.add_argument("--levels", default="1,4,16,64", help="comma separated concurrency levels")
+    parser.add_argument("--slots", type=int, default=32, help="scheduler max concurrency")
+    args = parser.parse_args()
+
+    backend_app.client = StubClient(args.latency)
+    backend_app.chat_sessions = ChatSessionManager(factory=backend_app.create_chat_session)
+
+    print(f"Stub latency {args.latency * 1000:.0f} ms, scheduler slots {args.slots}")
+    print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>8} {'wall s':>8}  statuses")
+    for level in (int(x) for x in args.levels.split(",")):
+        # Fewer requests at concurrency 1 keep the serial baseline quick.
+        total = args.requests if level > 1 else min(args.requests, 16)
+        r = asyncio.run(run_level(level, total, args.slots))
+        print(f"{r['concurrency']:>5} {r['req_per_sec']:>8} {r['p50_ms']:>8} {r['wall_seconds']:>8}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
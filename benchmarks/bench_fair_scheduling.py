@@ -0,0 +1,117 @@
+# benchmarks/bench_fair_scheduling.py
+"""
+Measures how much one heavy user slows everyone else down.
+
+One user fires a burst of --heavy LLM calls at once while --light other
+users each send one call at random moments during the burst. Every call
+holds a slot for --latency seconds (like awaiting Gemini). Three policies
+are compared:
+
+  * fifo:        a plain semaphore, calls start in arrival order,
+  * fair:        LLMScheduler with per-user limits lifted (fair queuing only),
+  * fair+limits: LLMScheduler with the default per-user rate/queue limits,
+                 so most of the burst is refused with 429 up front.
+
+Reports the queue wait of the light users (p50/p95/max), how long the
+heavy user's accepted calls took, and how many calls were refused.
+
+Usage:
+    python benchmarks/bench_fair_scheduling.py [--heavy 200] [--light 50] [--slots 4] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.scheduler import LLMScheduler, RateLimited
+from benchmarks.loadtest import percentile
+
+
+async def call_fifo(gate: asyncio.Semaphore, user_id: str, latency: float) -> float:
+    enqueued = time.perf_counter()
+    async with gate:
+        waited = time.perf_counter() - enqueued
+        await asyncio.sleep(latency)
+    return waited
+
+
+async def call_fair(scheduler: LLMScheduler, user_id: str, latency: float) -> float:
+    async with scheduler.slot(user_id, cost=1000) as ticket:
+        await asyncio.sleep(latency)
+    return ticket.wait_seconds
+
+
+async def run_policy(policy: str, heavy: int, light: int, slots: int, latency: float, seed: int) -> Dict:
+    if policy == "fifo":
+        gate = asyncio.Semaphore(slots)
+        call = call_fifo
+    elif policy == "fair":
+        gate = LLMScheduler(max_concurrency=slots, max_queue=100_000, user_rpm=1e9, user_burst=100_000,
+                            user_max_queue=100_000, global_rpm=1e9, global_tpm=1e12)
+        call = call_fair
+    else:
+        gate = LLMScheduler(max_concurrency=slots, max_queue=100_000, global_rpm=1e9, global_tpm=1e12)
+        call = call_fair
+
+    rng = random.Random(seed)
+    # Light users arrive while the heavy burst is still draining under FIFO.
+    window = heavy * latency / slots
+    light_waits: List[float] = []
+    refused = {"heavy": 0, "light": 0}
+
+    async def one(user_id: str, delay: float, waits: List[float]):
+        await asyncio.sleep(delay)
+        try:
+            waits.append(await call(gate, user_id, latency))
+        except RateLimited:
+            refused["heavy" if user_id == "heavy" else "light"] += 1
+
+    heavy_waits: List[float] = []
+    started = time.perf_counter()
+    heavy_tasks = [asyncio.create_task(one("heavy", 0, heavy_waits)) for _ in range(heavy)]
+    light_tasks = [asyncio.create_task(one(f"user{i}", rng.uniform(0, window * 0.8), light_waits))
+                   for i in range(light)]
+    await asyncio.gather(*light_tasks)
+    light_done = time.perf_counter() - started
+    await asyncio.gather(*heavy_tasks)
+    heavy_done = time.perf_counter() - started
+
+    light_waits.sort()
+    return {
+        "policy": policy,
+        "light_p50_ms": round(percentile(light_waits, 50) * 1000, 1),
+        "light_p95_ms": round(percentile(light_waits, 95) * 1000, 1),
+        "light_max_ms": round(light_waits[-1] * 1000, 1) if light_waits else 0.0,
+        "light_done_s": round(light_done, 2),
+        "heavy_done_s": round(heavy_done, 2),
+        "heavy_served": len(heavy_waits),
+        "refused": refused,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy", type=int, default=200, help="calls in the heavy user's burst")
+    parser.add_argument("--light", type=int, default=50, help="light users, one call each")
+    parser.add_argument("--slots", type=int, default=4, help="concurrent upstream calls")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds each call holds a slot")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"heavy burst {args.heavy}, light users {args.light}, slots {args.slots}, "
+          f"latency {args.latency * 1000:.0f} ms")
+    print(f"{'policy':<12} {'light p50':>10} {'light p95':>10} {'light max':>10} {'heavy done':>11}  served/refused")
+    for policy in ("fifo", "fair", "fair+limits"):
+        r = asyncio.run(run_policy(policy, args.heavy, args.light, args.slots, args.latency, args.seed))
+        print(f"{r['policy']:<12} {r['light_p50_ms']:>8.1f}ms {r['light_p95_ms']:>8.1f}ms "
+              f"{r['light_max_ms']:>8.1f}ms {r['heavy_done_s']:>10.2f}s  "
+              f"heavy {r['heavy_served']}/{r['refused']['heavy']}, light refused {r['refused']['light']}")
+
+
+if __name__ == "__main__":
+    main()
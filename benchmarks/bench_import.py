@@ -0,0 +1,104 @@
+# benchmarks/bench_import.py
+"""
+Measures the CSV / bank statement importer on generated statements.
+
+Writes a bank-statement-style CSV (preamble lines, dd/mm/yy dates,
+"Withdrawal Amt."/"Deposit Amt." columns, UPI narrations) and imports it
+into a temporary ledger:
+
+  * first import: rows/second end to end, including the SQLite commits,
+  * re-import of the same file: every row must come back as a duplicate,
+  * peak Python memory (tracemalloc) for a small and a large file, which
+    should be about the same since the pipeline streams.
+
+Usage:
+    python benchmarks/bench_import.py [--rows 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.importer import ExpenseImporter, ImportJob
+from backend.ledger import ExpenseLedger
+
+MERCHANTS = ["SWIGGY", "ZOMATO", "UBER INDIA", "OLA CABS", "AMAZON PAY", "FLIPKART", "NETFLIX", "BOOKMYSHOW",
+             "AIRTEL PREPAID RECHARGE", "BESCOM ELECTRICITY", "DMART", "GROWW SIP", "IRCTC", "RAMESH KIRANA",
+             "PAYTM ADD MONEY", "STARBUCKS", "INDIAN OIL PETROL", "MYNTRA"]
+
+
+def write_statement(path: str, rows: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    day = date(2023, 1, 1)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("HDFC BANK Ltd.,,,,,,\nAccount No :,XXXXXX1234,,,,,\nStatement From :,01/01/23,To :,31/12/24,,,\n\n")
+        f.write("Date,Narration,Chq./Ref.No.,Value Dt,Withdrawal Amt.,Deposit Amt.,Closing Balance\n")
+        for i in range(rows):
+            if rng.random() < 0.02:
+                day += timedelta(days=1)
+            if rng.random() < 0.05:
+                f.write(f"{day:%d/%m/%y},NEFT CR-SALARY,{i:012d},{day:%d/%m/%y},,\"45,000.00\",1.00\n")
+                continue
+            merchant = rng.choice(MERCHANTS)
+            amount = rng.choice([49, 99, 149.5, 250, 399, 1200, 2499.99])
+            f.write(f"{day:%d/%m/%y},UPI-{merchant}-{merchant.lower().replace(' ', '')}@okaxis,{i:012d},"
+                    f"{day:%d/%m/%y},\"{amount:,.2f}\",,1.00\n")
+
+
+def import_once(importer: ExpenseImporter, path: str, user_id: str = "bench-user") -> ImportJob:
+    job = ImportJob(user_id, os.path.basename(path), os.path.getsize(path))
+    return importer.run(job, path)
+
+
+def peak_memory(importer: ExpenseImporter, path: str, user_id: str) -> float:
+    tracemalloc.start()
+    import_once(importer, path, user_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="finsense-import-") as tmp:
+        big, small = os.path.join(tmp, "big.csv"), os.path.join(tmp, "small.csv")
+        write_statement(big, args.rows)
+        write_statement(small, max(args.rows // 10, 1), seed=2)
+        print(f"statement: {args.rows:,} rows, {os.path.getsize(big) / 1e6:.1f} MB")
+
+        ledger = ExpenseLedger(os.path.join(tmp, "ledger.sqlite3"), batch_size=500)
+        importer = ExpenseImporter(ledger, batch_size=args.batch_size, utc_offset_minutes=330)
+
+        started = time.perf_counter()
+        job = import_once(importer, big)
+        seconds = time.perf_counter() - started
+        print(f"import       {seconds:6.2f}s  {args.rows / seconds:>9,.0f} rows/s  imported {job.imported:,}, "
+              f"skipped {job.skipped:,} credits, errors {job.errors}")
+        print(f"categories   {', '.join(f'{k} {v:,}' for k, v in job.categories.items() if v)}")
+
+        started = time.perf_counter()
+        again = import_once(importer, big)
+        seconds = time.perf_counter() - started
+        print(f"re-import    {seconds:6.2f}s  {args.rows / seconds:>9,.0f} rows/s  imported {again.imported:,}, "
+              f"duplicates {again.duplicates:,}")
+
+        # Fresh user ids so both files are really imported, not deduplicated.
+        small_peak = peak_memory(importer, small, "bench-small")
+        big_peak = peak_memory(importer, big, "bench-big")
+        print(f"peak memory  {small_peak:.1f} MB for {max(args.rows // 10, 1):,} rows, "
+              f"{big_peak:.1f} MB for {args.rows:,} rows")
+        ledger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_leaderboard.py
+"""
+Measures the XP leaderboard at a large user count (default one million).
+
+Reports the time to build the ranking, per-operation latency (p50/p99) for
+XP increments, rank lookups, top-K pages and neighbour pages, the snapshot
+write/reload time, and checks every answer against a plain sorted list on a
+sample of users.
+
+Usage:
+    python benchmarks/bench_leaderboard.py [--users 1000000] [--ops 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.leaderboard import Leaderboard
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def timed(label, ops, fn):
+    samples = []
+    for _ in range(ops):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    print(f"{label:<22} p50 {percentile(samples, 50):7.1f} us   p99 {percentile(samples, 99):7.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--ops", type=int, default=20_000, help="operations timed per query type")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "leaderboard.json")
+        board = Leaderboard(path)
+
+        # Bulk load through the same path a restart uses.
+        started = time.perf_counter()
+        xp = {f"user{i}": random.randrange(0, 50_000) for i in range(args.users)}
+        board.replace_all(xp)
+        print(f"built ranking of {args.users:,} users in {time.perf_counter() - started:.2f}s")
+
+        users = list(xp)
+        timed("add_xp", args.ops, lambda: board.add_xp(random.choice(users), random.randrange(1, 100)))
+        timed("rank", args.ops, lambda: board.rank(random.choice(users)))
+        timed("top(10)", args.ops, lambda: board.top(10))
+        timed("top(10, offset=500k)", args.ops, lambda: board.top(10, offset=args.users // 2))
+        timed("around(radius=5)", args.ops, lambda: board.around(random.choice(users), 5))
+
+        # Check ranks against a sorted copy on a sample (`xp` is the board's own dict).
+        ordered = sorted(xp.items(), key=lambda item: (-item[1], item[0]))
+        position = {user_id: i + 1 for i, (user_id, _) in enumerate(ordered)}
+        for user_id in random.sample(users, 1000):
+            assert board.rank(user_id)["rank"] == position[user_id]
+        assert [e["user_id"] for e in board.top(50)] == [user_id for user_id, _ in ordered[:50]]
+        print("ranks verified against a sorted list (1000 samples, top 50)")
+
+        started = time.perf_counter()
+        board.save()
+        print(f"snapshot write           {time.perf_counter() - started:.2f}s "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        reloaded = Leaderboard(path)
+        sample = random.sample(users, 1000)
+        assert all(reloaded.rank(u) == board.rank(u) for u in sample)
+        print(f"snapshot reload          {reloaded.load_seconds:.2f}s (ranks match)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_persona_cache.py
+"""
+Compares prompt tokens per chat turn with the persona sent inline vs. by
+cached-context handle (PERSONA_CACHE_ENABLED).
+
+Starts the backend twice against the fake Gemini API (which implements
+cachedContents) and has `--users` users hold `--turns`-turn conversations
+over /chat. For each mode it reports:
+
+  * prompt tokens sent per turn (what the request body carries),
+  * cached tokens per turn (served from the registered persona),
+  * cachedContents registrations (one, plus one per TTL expiry),
+  * p50/p95 /chat latency.
+
+With a short --cache-ttl the handle expires during the run and the
+registration count shows it being renewed.
+
+Usage:
+    python benchmarks/bench_persona_cache.py [--users 20] [--turns 8] [--cache-ttl 3600]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+
+from benchmarks.fake_gemini import FakeGeminiConfig, FakeGeminiServer
+from benchmarks.loadtest import build_servers, percentile
+
+
+def run(mode: str, args) -> dict:
+    fake = FakeGeminiServer(config=FakeGeminiConfig(ttft=args.ttft, chunks=2, chunk_delay=0.01)).start()
+    os.environ["PERSONA_CACHE_ENABLED"] = "true" if mode == "cached" else "false"
+    os.environ["PERSONA_CACHE_TTL_SECONDS"] = str(args.cache_ttl)
+    # The fake API caches prefixes of any size; the real one needs a persona over the model's minimum.
+    os.environ["PERSONA_CACHE_MIN_TOKENS"] = "0"
+    with tempfile.TemporaryDirectory(prefix="finsense-persona-") as tmp:
+        server = build_servers(fake.url, tmp, ["backend"])["backend"]
+        server.start()
+        try:
+            with httpx.Client(base_url=server.base_url, timeout=30) as http:
+                # Wait for the background startup (Gemini client) to finish.
+                while http.get("/health").json()["status"] == "starting":
+                    time.sleep(0.1)
+                latencies = []
+                for turn in range(args.turns):
+                    for user in range(args.users):
+                        started = time.perf_counter()
+                        response = http.post("/chat", json={"message": f"Turn {turn}: explain SIPs vs PPF"},
+                                             headers={"X-User-ID": str(1000 + user)})
+                        response.raise_for_status()
+                        latencies.append((time.perf_counter() - started) * 1000)
+                persona = http.get("/health").json()["persona_cache"]
+        finally:
+            server.stop()
+            fake.stop()
+    stats = fake.stats.snapshot()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "turns": stats["requests"],
+        "sent_per_turn": stats["prompt_tokens"] / max(stats["requests"], 1),
+        "cached_per_turn": stats["cached_tokens"] / max(stats["requests"], 1),
+        "registrations": stats["caches_created"],
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "persona": persona,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--cache-ttl", type=int, default=3600, help="PERSONA_CACHE_TTL_SECONDS for the cached run")
+    parser.add_argument("--ttft", type=float, default=0.02, help="fake Gemini time to first token")
+    args = parser.parse_args()
+
+    results = [run(mode, args) for mode in ("inline", "cached")]
+    print(f"{'mode':<8} {'turns':>6} {'sent/turn':>10} {'cached/turn':>12} {'registered':>11} "
+          f"{'p50 ms':>8} {'p95 ms':>8}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['turns']:>6} {r['sent_per_turn']:>10.0f} {r['cached_per_turn']:>12.0f} "
+              f"{r['registrations']:>11} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+    inline, cached = results
+    saved = 1 - cached["sent_per_turn"] / inline["sent_per_turn"]
+    print(f"prompt tokens sent per turn: {saved:.0%} fewer with the cached persona")
+    print(f"persona cache: {cached['persona']}")
+
+
+if __name__ == "__main__":
+    main()
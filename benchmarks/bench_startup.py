@@ -0,0 +1,157 @@
+# benchmarks/bench_startup.py
+"""
+Tracks how fast the desktop backend comes up from a cold process.
+
+For each run it measures, in fresh Python processes:
+
+  * import time of backend.app (what blocks before uvicorn can listen),
+  * time from spawning `python backend/app.py` (as main.js does) to the
+    first /health 200 ("listening"),
+  * time until /health stops reporting "starting" (Gemini client created,
+    spending rollups loaded).
+
+Prints medians and the slowest imports from `python -X importtime`, and
+saves the numbers as JSON (default: benchmarks/results/) so they can be
+compared across commits.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--out startup.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+
+from benchmarks.loadtest import REPO_ROOT, RESULTS_DIR, free_port, git_commit
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import backend.app; print(time.perf_counter() - t)"
+
+
+def server_env(data_dir: str, port: int) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "LEDGER_DB_PATH": os.path.join(data_dir, "finsense.sqlite3"),
+        "RESPONSE_CACHE_PATH": os.path.join(data_dir, "response_cache.sqlite3"),
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def import_seconds(env: Dict[str, str]) -> float:
+    out = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], cwd=REPO_ROOT, env=env, text=True)
+    return float(out.strip().splitlines()[-1])
+
+
+def slowest_imports(env: Dict[str, str], top: int = 8) -> List[str]:
+    """Direct imports of backend.app by cumulative time, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.app"],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative) / 1000
+        elif depth == 0:
+            # Children are printed before their parent.
+            if name.strip() == "backend.app":
+                break
+            children = {}
+    return [f"{name:<28} {ms:7.1f} ms" for name, ms in sorted(children.items(), key=lambda i: -i[1])[:top]]
+
+
+def boot(env: Dict[str, str], port: int, timeout: float = 60) -> Dict[str, float]:
+    """Spawns backend/app.py and polls /health until it is past "starting"."""
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join("backend", "app.py")], cwd=REPO_ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {}
+    try:
+        with httpx.Client(timeout=1) as http:
+            while time.perf_counter() - started < timeout:
+                if proc.poll() is not None:
+                    raise RuntimeError("backend exited during startup")
+                try:
+                    health = http.get(url)
+                except httpx.HTTPError:
+                    time.sleep(0.01)
+                    continue
+                now = time.perf_counter() - started
+                result.setdefault("first_health_s", now)
+                if health.json()["status"] != "starting":
+                    result["ready_s"] = now
+                    result["state"] = health.json()["status"]
+                    return result
+                time.sleep(0.01)
+        raise RuntimeError(f"backend not ready after {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", default=None, help="result JSON path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    imports, boots = [], []
+    with tempfile.TemporaryDirectory(prefix="finsense-startup-") as data_dir:
+        for run in range(args.runs):
+            port = free_port()
+            env = server_env(data_dir, port)
+            imports.append(import_seconds(env))
+            boots.append(boot(env, port))
+            print(f"run {run + 1}: import {imports[-1]:.3f}s, first /health {boots[-1]['first_health_s']:.3f}s, "
+                  f"{boots[-1]['state']} {boots[-1]['ready_s']:.3f}s")
+        top = slowest_imports(server_env(data_dir, 0))
+
+    summary = {
+        "import_backend_app_s": round(statistics.median(imports), 3),
+        "first_health_200_s": round(statistics.median(b["first_health_s"] for b in boots), 3),
+        "ready_s": round(statistics.median(b["ready_s"] for b in boots), 3),
+    }
+    print()
+    for key, value in summary.items():
+        print(f"median {key:<22} {value:.3f}s")
+    print("\nslowest imports (cumulative):")
+    for line in top:
+        print("  " + line)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+        },
+        "results": summary,
+        "runs": [dict(b, import_s=round(i, 3)) for i, b in zip(imports, boots)],
+    }
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, datetime.now().strftime("startup-%Y%m%d-%H%M%S.json"))
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {out}")
+
+
+if __name__ == "__main__":
+    main()
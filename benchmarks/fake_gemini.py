@@ -0,0 +1,395 @@
+# benchmarks/fake_gemini.py
+"""
+A local stand-in for the Gemini REST API, for offline benchmarks.
+
+Serves the two endpoints both SDKs use:
+    POST /v1beta/models/{model}:generateContent
+    POST /v1beta/models/{model}:streamGenerateContent   (?alt=sse -> SSE,
+                                                         otherwise a streamed JSON array)
+
+and explicit context caching:
+    POST   /v1beta/cachedContents          (register a system instruction/contents with a ttl)
+    GET    /v1beta/cachedContents/{id}
+    PATCH  /v1beta/cachedContents/{id}     (new ttl)
+    DELETE /v1beta/cachedContents/{id}
+
+A generate request that names a `cachedContent` is billed like the real API:
+the cached tokens count towards promptTokenCount and are reported again as
+cachedContentTokenCount. Unknown or expired handles get a 404.
+
+Replies take a configurable time (time-to-first-token, then a delay per
+chunk) and report token usage, so servers under test behave as they would
+against the real API without a key or network.
+
+Point the apps at it with GEMINI_API_KEY=fake and GEMINI_BASE_URL=http://127.0.0.1:<port>.
+
+Usage:
+    python benchmarks/fake_gemini.py --port 8765 --ttft 0.3 --chunks 8 --chunk-delay 0.05
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+_ROUTE = re.compile(r"^/v1(?:beta)?/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)")
+_CACHE_ROUTE = re.compile(r"^/v1(?:beta)?/cachedContents(?:/(?P<id>[^/?]+))?")
+
+
+# ==============================================================================
+# 1. CONFIGURATION AND COUNTERS
+# ==============================================================================
+
+class FakeGeminiConfig:
+    def __init__(self, ttft: float = 0.3, chunks: int = 8, chunk_delay: float = 0.05,
+                 jitter: float = 0.1, words_per_chunk: int = 12, error_rate: float = 0.0,
+                 cache_min_tokens: int = 0):
+        self.ttft = ttft                    # seconds before the first chunk
+        self.chunks = chunks                # chunks per streamed answer
+        self.chunk_delay = chunk_delay      # seconds between chunks
+        self.jitter = jitter                # +/- fraction applied to every delay
+        self.words_per_chunk = words_per_chunk
+        self.error_rate = error_rate        # fraction of requests answered with HTTP 500
+        self.cache_min_tokens = cache_min_tokens  # smaller cachedContents are refused, like the real API
+
+    def delay(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+class FakeGeminiStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.streamed = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.caches_created = 0
+
+    def record(self, streamed: bool, prompt_tokens: int, error: bool = False, cached_tokens: int = 0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.streamed += int(streamed)
+            self.errors += int(error)
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+
+    def record_cache(self) -> None:
+        with self._lock:
+            self.caches_created += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "streamed": self.streamed,
+                "errors": self.errors,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "caches_created": self.caches_created,
+            }
+
+
+class FakeCacheStore:
+    """cachedContents by id: (model, token count, expiry in epoch seconds)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, model: str, tokens: int, ttl: float) -> Dict[str, Any]:
+        entry = {"name": f"cachedContents/{uuid.uuid4().hex[:12]}", "model": model, "tokens": tokens,
+                 "created": time.time(), "expires": time.time() + ttl}
+        with self._lock:
+            self._entries[entry["name"]] = entry
+        return entry
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry["expires"] <= time.time():
+                del self._entries[name]
+                return None
+            return entry
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            return self._entries.pop(name, None) is not None
+
+
+def _rfc3339(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def cache_payload(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": entry["name"],
+        "model": entry["model"],
+        "createTime": _rfc3339(entry["created"]),
+        "updateTime": _rfc3339(entry["created"]),
+        "expireTime": _rfc3339(entry["expires"]),
+        "usageMetadata": {"totalTokenCount": entry["tokens"]},
+    }
+
+
+def parse_ttl(value: Any, default: float = 3600) -> float:
+    """ "300s" / "1.5s" -> seconds."""
+    if isinstance(value, str) and value.endswith("s"):
+        try:
+            return float(value[:-1])
+        except ValueError:
+            pass
+    return default
+
+
+# ==============================================================================
+# 2. REQUEST HANDLING
+# ==============================================================================
+
+def count_prompt_tokens(body: Dict[str, Any]) -> int:
+    chars = 0
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            chars += len(part.get("text", ""))
+    system = body.get("systemInstruction") or body.get("system_instruction") or {}
+    for part in system.get("parts", []):
+        chars += len(part.get("text", ""))
+    return max(1, chars // 4)
+
+
+def last_user_text(body: Dict[str, Any]) -> str:
+    for content in reversed(body.get("contents", [])):
+        for part in content.get("parts", []):
+            if part.get("text"):
+                return part["text"]
+    return ""
+
+
+def fake_question(n: int) -> Dict[str, Any]:
+    return {
+        "question": f"Fake question {n}: which option is correct?",
+        "options": [f"Option {letter} {n}" for letter in "ABCD"],
+        "correct": n % 4,
+    }
+
+
+def answer_chunks(body: Dict[str, Any], config: FakeGeminiConfig) -> List[str]:
+    prompt = last_user_text(body)
+    if "multiple-choice questions" in prompt:
+        # Quiz generation: return valid JSON the quiz bank will accept.
+        match = re.search(r"Generate (\d+)", prompt)
+        count = int(match.group(1)) if match else 5
+        base = random.randrange(1_000_000)
+        questions = [fake_question(base + i) for i in range(count)]
+        return ["```json\n" + json.dumps({"questions": questions}) + "\n```"]
+    words = ["Finny", "says:", "start", "a", "₹500", "SIP", "early", "and", "stay", "consistent."]
+    return [
+        " ".join(random.choice(words) for _ in range(config.words_per_chunk)) + " "
+        for _ in range(max(1, config.chunks))
+    ]
+
+
+def response_payload(text: str, model: str, prompt_tokens: int, final: bool, cached_tokens: int = 0) -> Dict[str, Any]:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if final:
+        candidate["finishReason"] = "STOP"
+    output_tokens = max(1, len(text) // 4)
+    usage = {
+        "promptTokenCount": prompt_tokens + cached_tokens,
+        "candidatesTokenCount": output_tokens,
+        "totalTokenCount": prompt_tokens + cached_tokens + output_tokens,
+    }
+    if cached_tokens:
+        usage["cachedContentTokenCount"] = cached_tokens
+    return {"candidates": [candidate], "usageMetadata": usage, "modelVersion": model}
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: FakeGeminiConfig = FakeGeminiConfig()
+    stats: FakeGeminiStats = FakeGeminiStats()
+    caches: FakeCacheStore = FakeCacheStore()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        route = _CACHE_ROUTE.match(self.path)
+        entry = self.caches.get(f"cachedContents/{route.group('id')}") if route and route.group("id") else None
+        if entry is None:
+            return self._not_found()
+        self._send_json(200, cache_payload(entry))
+
+    def do_DELETE(self) -> None:
+        route = _CACHE_ROUTE.match(self.path)
+        if not (route and route.group("id") and self.caches.delete(f"cachedContents/{route.group('id')}")):
+            return self._not_found()
+        self._send_json(200, {})
+
+    def do_PATCH(self) -> None:
+        body = self._read_json()
+        route = _CACHE_ROUTE.match(self.path)
+        entry = self.caches.get(f"cachedContents/{route.group('id')}") if route and route.group("id") else None
+        if entry is None or body is None:
+            return self._not_found()
+        entry["expires"] = time.time() + parse_ttl(body.get("ttl"))
+        self._send_json(200, cache_payload(entry))
+
+    def do_POST(self) -> None:
+        body = self._read_json()
+        if body is None:
+            return self._send_json(400, {"error": {"code": 400, "message": "invalid JSON"}})
+
+        cache_route = _CACHE_ROUTE.match(self.path)
+        if cache_route is not None and not cache_route.group("id"):
+            return self._create_cache(body)
+
+        route = _ROUTE.match(self.path)
+        if route is None:
+            return self._send_json(404, {"error": {"code": 404, "message": f"unknown path {self.path}"}})
+
+        model = route.group("model")
+        streamed = route.group("method") == "streamGenerateContent"
+        prompt_tokens = count_prompt_tokens(body)
+        cached_tokens = 0
+        if body.get("cachedContent"):
+            entry = self.caches.get(body["cachedContent"])
+            if entry is None:
+                return self._not_found()
+            cached_tokens = entry["tokens"]
+
+        if random.random() < self.config.error_rate:
+            self.stats.record(streamed, prompt_tokens, error=True)
+            self.config.delay(self.config.ttft)
+            return self._send_json(500, {"error": {"code": 500, "message": "injected failure", "status": "INTERNAL"}})
+
+        self.stats.record(streamed, prompt_tokens, cached_tokens=cached_tokens)
+        chunks = answer_chunks(body, self.config)
+
+        if not streamed:
+            self.config.delay(self.config.ttft + self.config.chunk_delay * (len(chunks) - 1))
+            payload = response_payload("".join(chunks), model, prompt_tokens, final=True, cached_tokens=cached_tokens)
+            return self._send_json(200, payload)
+
+        sse = "alt=sse" in self.path
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if not sse:
+            self._write_chunk(b"[")
+        for i, text in enumerate(chunks):
+            self.config.delay(self.config.ttft if i == 0 else self.config.chunk_delay)
+            payload = json.dumps(response_payload(text, model, prompt_tokens, final=i == len(chunks) - 1,
+                                                  cached_tokens=cached_tokens))
+            if sse:
+                self._write_chunk(f"data: {payload}\r\n\r\n".encode("utf-8"))
+            else:
+                self._write_chunk(((",\n" if i else "") + payload).encode("utf-8"))
+        if not sse:
+            self._write_chunk(b"]")
+        self._write_chunk(b"")
+
+    def _create_cache(self, body: Dict[str, Any]) -> None:
+        tokens = count_prompt_tokens(body)
+        if tokens < self.config.cache_min_tokens:
+            return self._send_json(400, {"error": {
+                "code": 400, "status": "INVALID_ARGUMENT",
+                "message": f"Cached content is too small. total_token_count={tokens}, "
+                           f"min_total_token_count={self.config.cache_min_tokens}"}})
+        entry = self.caches.create(body.get("model", ""), tokens, parse_ttl(body.get("ttl")))
+        self.stats.record_cache()
+        self._send_json(200, cache_payload(entry))
+
+    def _read_json(self) -> Optional[Dict[str, Any]]:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return None
+
+    def _not_found(self) -> None:
+        self._send_json(404, {"error": {"code": 404, "status": "NOT_FOUND",
+                                        "message": "CachedContent not found (or permission denied)"}})
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, code: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# ==============================================================================
+# 3. SERVER LIFECYCLE
+# ==============================================================================
+
+class FakeGeminiServer:
+    """Runs the fake API on a background thread. Port 0 picks a free port."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeGeminiConfig] = None):
+        handler = type("Handler", (FakeGeminiHandler,), {
+            "config": config or FakeGeminiConfig(),
+            "stats": FakeGeminiStats(),
+            "caches": FakeCacheStore(),
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.handler = handler
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> FakeGeminiStats:
+        return self.handler.stats
+
+    def start(self) -> "FakeGeminiServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds to first chunk")
+    parser.add_argument("--chunks", type=int, default=8, help="chunks per answer")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="seconds between chunks")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- fraction applied to delays")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--cache-min-tokens", type=int, default=0, help="refuse smaller cachedContents")
+    args = parser.parse_args()
+
+    config = FakeGeminiConfig(ttft=args.ttft, chunks=args.chunks, chunk_delay=args.chunk_delay,
+                              jitter=args.jitter, error_rate=args.error_rate, cache_min_tokens=args.cache_min_tokens)
+    server = FakeGeminiServer(args.host, args.port, config).start()
+    print(f"Fake Gemini listening on {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
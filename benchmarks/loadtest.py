@@ -0,0 +1,351 @@
+# benchmarks/loadtest.py
+"""
+Offline load test for both servers against a local fake Gemini backend.
+
+Starts benchmarks/fake_gemini.py in-process, launches backend/app.py
+(uvicorn) and app.py (Flask) as subprocesses pointed at it, then drives each
+endpoint with a fixed number of requests at the chosen concurrency. For every
+endpoint it reports p50/p95/p99 latency, requests/sec, the status mix and
+the server's resident memory, and writes everything to a JSON file so runs
+can be compared.
+
+Usage:
+    python benchmarks/loadtest.py --concurrency 32 --requests 500
+    python benchmarks/loadtest.py --endpoints /chat,/health --out before.json
+    python benchmarks/loadtest.py --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+
+from benchmarks.fake_gemini import FakeGeminiConfig, FakeGeminiServer
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+# ==============================================================================
+# 1. SERVERS UNDER TEST
+# ==============================================================================
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size from /proc (Linux); None elsewhere."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class ServerProcess:
+    def __init__(self, name: str, cmd: List[str], port: int, health_path: str, env: Dict[str, str], log_path: str):
+        self.name = name
+        self.cmd = cmd
+        self.port = port
+        self.health_path = health_path
+        self.env = env
+        self.log_path = log_path
+        self.proc: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 60) -> float:
+        """Starts the server and waits until its health check stops saying "starting". Returns seconds to ready."""
+        started = time.perf_counter()
+        self._log = open(self.log_path, "w")
+        self.proc = subprocess.Popen(self.cmd, cwd=REPO_ROOT, env=self.env, stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"{self.name} exited early; see {self.log_path}")
+            try:
+                response = httpx.get(self.base_url + self.health_path, timeout=1)
+                if response.status_code == 200 and response.json().get("status") != "starting":
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError(f"{self.name} not healthy after {timeout}s; see {self.log_path}")
+
+    def rss(self) -> Optional[int]:
+        return rss_bytes(self.proc.pid) if self.proc else None
+
+    def stop(self) -> None:
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self._log.close()
+
+
+def build_servers(fake_url: str, data_dir: str, names: List[str]) -> Dict[str, ServerProcess]:
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_KEY": "fake-key",
+        "GEMINI_BASE_URL": fake_url,
+        "RESPONSE_CACHE_PATH": os.path.join(data_dir, "response_cache.sqlite3"),
+        "QUIZ_BANK_PATH": os.path.join(data_dir, "quiz_bank.json"),
+        "LEDGER_DB_PATH": os.path.join(data_dir, "finsense.sqlite3"),
+        "LEADERBOARD_PATH": os.path.join(data_dir, "leaderboard.json"),
+        # Load runs reuse 1000 user ids; per-user rate limits would turn them into 429s.
+        "CHAT_USER_RPM": "1000000",
+        "CHAT_USER_BURST": "1000000",
+        "PYTHONUNBUFFERED": "1",
+    })
+    servers = {}
+    if "backend" in names:
+        port = free_port()
+        servers["backend"] = ServerProcess(
+            "backend",
+            [sys.executable, "-m", "uvicorn", "backend.app:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning"],
+            port, "/health", env, os.path.join(data_dir, "backend.log"),
+        )
+    if "flask" in names:
+        port = free_port()
+        servers["flask"] = ServerProcess(
+            "flask",
+            [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--no-reload"],
+            port, "/api/health", env, os.path.join(data_dir, "flask.log"),
+        )
+    return servers
+
+
+# ==============================================================================
+# 2. ENDPOINT SCENARIOS
+# ==============================================================================
+
+TOPICS = ["SIP", "PPF", "CIBIL score", "NPS", "emergency fund", "budgeting", "credit cards", "inflation"]
+
+
+def chat_request(i: int, repeat: bool) -> Dict[str, Any]:
+    topic = TOPICS[i % len(TOPICS)]
+    message = f"Explain {topic}" if repeat else f"Explain {topic} (question #{i})"
+    return {"method": "POST", "json": {"message": message}, "headers": {"X-User-ID": str(i % 1000)}}
+
+
+def coach_request(i: int, repeat: bool) -> Dict[str, Any]:
+    req = chat_request(i, repeat)
+    req["json"]["mode"] = "quick"
+    return req
+
+
+def quiz_request(i: int, repeat: bool) -> Dict[str, Any]:
+    tracks = ["budgeting", "credit", "investing"]
+    return {"method": "GET", "params": {"track": tracks[i % len(tracks)]}}
+
+
+def health_request(i: int, repeat: bool) -> Dict[str, Any]:
+    return {"method": "GET"}
+
+
+# (server, path) -> request builder
+SCENARIOS: Dict[str, Dict[str, Callable[[int, bool], Dict[str, Any]]]] = {
+    "backend": {"/chat": chat_request, "/health": health_request},
+    "flask": {"/api/coach/chat": coach_request, "/api/academy/quiz": quiz_request},
+}
+
+
+# ==============================================================================
+# 3. LOAD GENERATION AND STATISTICS
+# ==============================================================================
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def drive(server: ServerProcess, path: str, build: Callable[[int, bool], Dict[str, Any]],
+                total: int, concurrency: int, warmup: int, repeat: bool) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=server.base_url, timeout=120, limits=limits) as http:
+        async def send(i: int) -> httpx.Response:
+            req = dict(build(i, repeat))
+            return await http.request(req.pop("method"), path, **req)
+
+        for i in range(warmup):
+            await send(-1 - i)
+
+        latencies: List[float] = []
+        statuses: Dict[str, int] = {}
+        errors = 0
+        rss_peak = server.rss() or 0
+        rss_before = rss_peak
+        next_index = iter(range(total))
+        done = False
+
+        async def worker():
+            nonlocal errors
+            for i in next_index:
+                started = time.perf_counter()
+                try:
+                    res = await send(i)
+                    statuses[str(res.status_code)] = statuses.get(str(res.status_code), 0) + 1
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        async def sample_memory():
+            nonlocal rss_peak
+            while not done:
+                rss_peak = max(rss_peak, server.rss() or 0)
+                await asyncio.sleep(0.1)
+
+        sampler = asyncio.ensure_future(sample_memory())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+        done = True
+        await sampler
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "req_per_sec": round(len(latencies) / wall, 2) if wall else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "statuses": statuses,
+        "transport_errors": errors,
+        "rss_before_mb": round(rss_before / 2**20, 1) if rss_before else None,
+        "rss_peak_mb": round(rss_peak / 2**20, 1) if rss_peak else None,
+    }
+
+
+# ==============================================================================
+# 4. REPORTING
+# ==============================================================================
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    header = f"{'endpoint':<28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rss MB':>8}  statuses"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<28} {r['req_per_sec']!s:>9} {r['p50_ms']!s:>9} {r['p95_ms']!s:>9} "
+              f"{r['p99_ms']!s:>9} {r['rss_peak_mb']!s:>8}  {r['statuses']}")
+        old = (baseline or {}).get(name)
+        if old:
+            deltas = []
+            for key in ("req_per_sec", "p50_ms", "p95_ms", "p99_ms"):
+                if old.get(key) and r.get(key) is not None:
+                    deltas.append(f"{key} {100 * (r[key] - old[key]) / old[key]:+.1f}%")
+            print(f"{'  vs baseline':<28} " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", default="backend,flask", help="comma separated: backend, flask")
+    parser.add_argument("--endpoints", default="", help="comma separated paths to run (default: all)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per endpoint")
+    parser.add_argument("--repeat", action="store_true", help="reuse a small set of messages (exercises caches)")
+    parser.add_argument("--ttft", type=float, default=0.3, help="fake Gemini seconds to first chunk")
+    parser.add_argument("--chunks", type=int, default=8, help="fake Gemini chunks per answer")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="fake Gemini seconds between chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake Gemini failure fraction")
+    parser.add_argument("--out", default=None, help="result JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="previous result JSON to diff against")
+    args = parser.parse_args()
+
+    server_names = [s.strip() for s in args.servers.split(",") if s.strip()]
+    only = {p.strip() for p in args.endpoints.split(",") if p.strip()}
+
+    fake_config = FakeGeminiConfig(ttft=args.ttft, chunks=args.chunks, chunk_delay=args.chunk_delay,
+                                   error_rate=args.error_rate)
+    fake = FakeGeminiServer(config=fake_config).start()
+    print(f"Fake Gemini at {fake.url}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    startup: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix="finsense-loadtest-") as data_dir:
+        servers = build_servers(fake.url, data_dir, server_names)
+        try:
+            for name, server in servers.items():
+                startup[name] = round(server.start(), 3)
+                print(f"{name} ready on {server.base_url} in {startup[name]}s")
+
+            for name, server in servers.items():
+                for path, build in SCENARIOS[name].items():
+                    if only and path not in only:
+                        continue
+                    print(f"-> {name} {path} ({args.requests} requests, concurrency {args.concurrency})")
+                    results[f"{name} {path}"] = asyncio.run(
+                        drive(server, path, build, args.requests, args.concurrency, args.warmup, args.repeat))
+        finally:
+            for server in servers.values():
+                server.stop()
+            fake.stop()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+            "startup_seconds": startup,
+            "fake_gemini": fake.stats.snapshot(),
+        },
+        "results": results,
+    }
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, datetime.now().strftime("loadtest-%Y%m%d-%H%M%S.json"))
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print()
+    print_table(results, baseline)
+    print(f"\nUpstream calls: {report['meta']['fake_gemini']}")
+    print(f"Saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,14 @@
 const { app, BrowserWindow } = require('electron');
 const path = require('path');
 const { spawn } = require('child_process');
+const http = require('http');
 
 let pythonProcess = null;
 let mainWindow = null;
 
+const HEALTH_URL = 'http://127.0.0.1:5000/health';
+const APP_TITLE = 'FinSenseAI Coach';
+
 // --- 1. PYTHON PROCESS MANAGEMENT ---
 
 function startPythonBackend() {
@@ -26,8 +30,37 @@ function startPythonBackend() {
 
     console.log('Python Flask Server spawned on port 5000...');
 
-    // Give the server a moment to start before creating the window
-    setTimeout(createWindow, 2000);
+    // The window is local HTML, so show it right away and poll the backend in parallel
+    createWindow();
+    waitForBackend(Date.now());
+}
+
+// The backend answers /health as soon as it listens; Gemini finishes loading
+// in the background, so the status goes "starting" -> "ready" (or "degraded").
+function waitForBackend(spawnedAt) {
+    const retry = () => setTimeout(() => waitForBackend(spawnedAt), 200);
+
+    http.get(HEALTH_URL, (res) => {
+        let body = '';
+        res.on('data', (chunk) => { body += chunk; });
+        res.on('end', () => {
+            let health = {};
+            try { health = JSON.parse(body); } catch (e) { /* not our server yet */ }
+            setWindowStatus(health.status);
+            if (health.status === 'starting' || !health.status) return retry();
+            console.log(`Python backend ${health.status} after ${Date.now() - spawnedAt} ms`);
+        });
+    }).on('error', () => {
+        // Not listening yet
+        setWindowStatus('starting');
+        retry();
+    });
+}
+
+function setWindowStatus(status) {
+    if (!mainWindow || mainWindow.isDestroyed()) return;
+    const suffix = { starting: ' (starting...)', degraded: ' (offline mode)' }[status] || '';
+    mainWindow.setTitle(APP_TITLE + suffix);
 }
 
 function killPythonBackend() {
@@ -22,39 +22,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
 // ... (existing DOMContentLoaded setup)
 
-async function sendMessage() {
-    const userMessage = userInput.value.trim();
-    if (!userMessage) return;
-
-    const chatDisplay = document.getElementById('chat-history');
-    const userInput = document.getElementById('user-input');
-    const API_URL = 'http://127.0.0.1:5000/chat';
-
-    // 1. Display user message (as a new HTML element)
-    chatDisplay.innerHTML += `<div class="user-message">You: ${userMessage}</div>`;
-    userInput.value = ''; // Clear input
-
-    // 2. Call the Flask endpoint
-    try {
-        const response = await fetch(API_URL, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ message: userMessage }),
-        });
-
-        if (!response.ok) {
-            const errorData = await response.json();
-            throw new Error(errorData.detail || `HTTP Status: ${response.status}`);
-        }
-
-        const data = await response.json();
-
-        // --------------------------------------------------------------------------
-        // CRITICAL FIX: MANUALLY CONVERT MARKDOWN TO RICH HTML
-
-        let finnyResponse = data.response;
+// Converts Finny's Markdown into the rich HTML used by the chat window.
+// CRITICAL FIX: MANUALLY CONVERT MARKDOWN TO RICH HTML
+function formatFinnyMarkdown(markdown) {
+        let finnyResponse = markdown;
 
         // Step A: Replace common Markdown elements with HTML tags
 
@@ -88,11 +59,87 @@ async function sendMessage() {
         finnyResponse = finnyResponse.replace(/<p>(<h3>)/g, '$1').replace(/(<\/h3>)<\/p>/g, '$1');
         finnyResponse = finnyResponse.replace(/<p>(<ul>)/g, '$1').replace(/(<\/ul>)<\/p>/g, '$1');
 
-        // 3. Display Finny's final HTML response
-        const aiMessageHTML = `<div class="ai-message">Finny: ${finnyResponse}</div>`;
-        chatDisplay.innerHTML += aiMessageHTML;
+        return finnyResponse;
+}
+
+// Reads Server-Sent Events from a streaming fetch() response.
+async function readServerEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
+async function sendMessage() {
+    const chatDisplay = document.getElementById('chat-history');
+    const userInput = document.getElementById('user-input');
+    const API_URL = 'http://127.0.0.1:5000/chat/stream';
 
-        // --------------------------------------------------------------------------
+    const userMessage = userInput.value.trim();
+    if (!userMessage) return;
+
+    // 1. Display user message (as a new HTML element)
+    chatDisplay.innerHTML += `<div class="user-message">You: ${userMessage}</div>`;
+    userInput.value = ''; // Clear input
+
+    // 2. Call the streaming endpoint and render the answer as it arrives
+    try {
+        const sentAt = performance.now();
+        const response = await fetch(API_URL, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ message: userMessage }),
+        });
+
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.detail || `HTTP Status: ${response.status}`);
+        }
+
+        // 3. Display Finny's HTML response, re-rendered on every chunk
+        const aiMessage = document.createElement('div');
+        aiMessage.className = 'ai-message';
+        chatDisplay.appendChild(aiMessage);
+
+        let markdown = '';
+        let firstTokenAt = null;
+        await readServerEvents(response, (event, data) => {
+            if (event === 'message') {
+                if (firstTokenAt === null) firstTokenAt = performance.now();
+                markdown += data.delta;
+                aiMessage.innerHTML = `Finny: ${formatFinnyMarkdown(markdown)}`;
+                chatDisplay.scrollTop = chatDisplay.scrollHeight;
+            } else if (event === 'done') {
+                console.info('[finny] time to first token', {
+                    client_ms: firstTokenAt === null ? null : Math.round(firstTokenAt - sentAt),
+                    server_ms: data.ttft_ms,
+                    total_ms: data.total_ms
+                });
+            } else if (event === 'error') {
+                throw new Error(data.detail);
+            }
+        });
 
     } catch (error) {
         console.error(error);
@@ -4,13 +4,31 @@ const academy = {
         { id: 'credit', title: 'Credit Scores', progress: 0 },
         { id: 'investing', title: 'Investing Basics', progress: 0 }
     ],
+    quiz: null,
 
-    init() {
+    headers(extra = {}) {
+        return auth.user ? { ...extra, 'X-User-ID': auth.user.uid } : extra;
+    },
+
+    async init() {
         this.renderTracks();
+        if (!auth.user) return;
+        try {
+            // Progress is kept server-side (questions answered correctly out of those in the bank)
+            const res = await fetch('/api/academy/progress', { headers: this.headers() });
+            const data = await res.json();
+            this.tracks.forEach(track => {
+                const p = data.tracks[track.id];
+                track.progress = p && p.available ? Math.min(100, Math.round(100 * p.correct / p.available)) : 0;
+            });
+            this.renderTracks();
+        } catch (e) {
+            console.error("Academy Progress Error:", e);
+        }
     },
 
     renderTracks() {
-        const container = document.querySelector('#academyScreen .glass-card');
+        const container = document.querySelector('#academyScreen .card');
         let html = '<div class="track-list">';
 
         this.tracks.forEach(track => {
@@ -32,12 +50,13 @@ const academy = {
 
     async startTrack(trackId) {
         // For now, just launch a quiz
-        const container = document.querySelector('#academyScreen .glass-card');
+        const container = document.querySelector('#academyScreen .card');
         container.innerHTML = `<h3>Quiz: ${trackId.toUpperCase()}</h3><div id="quiz-area">Loading questions...</div>`;
 
         try {
-            const res = await fetch(`/api/academy/quiz?track=${trackId}`);
+            const res = await fetch(`/api/academy/quiz?track=${encodeURIComponent(trackId)}`, { headers: this.headers() });
             const data = await res.json();
+            this.quiz = { track: data.track, answers: {} };
             this.renderQuiz(data.questions);
         } catch (e) {
             container.innerHTML = 'Error loading quiz.';
@@ -49,28 +68,85 @@ const academy = {
         let html = '';
         questions.forEach((q, idx) => {
             html += `
-                <div class="quiz-q mb-4">
+                <div class="quiz-q mb-4" id="quiz-q-${q.id}">
                     <p><strong>Q${idx + 1}:</strong> ${q.question}</p>
                     <div class="options">
                         ${q.options.map((opt, i) => `
-                            <button class="btn btn-outline mb-2" style="width:100%; text-align:left;" onclick="academy.checkAnswer(this, ${i}, ${q.correct})">${opt}</button>
+                            <button class="btn btn-outline mb-2" style="width:100%; text-align:left;" data-choice="${i}" onclick="academy.choose(this, ${q.id}, ${i})">${opt}</button>
                         `).join('')}
                     </div>
                 </div>
             `;
         });
+        html += '<button class="btn btn-primary" id="quiz-submit" onclick="academy.submitQuiz()">Submit Answers</button><div id="quiz-result" class="mt-4"></div>';
         area.innerHTML = html;
     },
 
-    checkAnswer(btn, selected, correct) {
-        if (selected === correct) {
-            btn.style.borderColor = 'var(--primary)';
-            btn.style.background = 'rgba(0, 200, 83, 0.2)';
-            utils.showToast('Correct! +10 XP', 'success');
-        } else {
-            btn.style.borderColor = '#EF4444';
-            btn.style.background = 'rgba(239, 68, 68, 0.2)';
-            utils.showToast('Try again!', 'error');
+    choose(btn, questionId, choice) {
+        this.quiz.answers[questionId] = choice;
+        btn.parentElement.querySelectorAll('button').forEach(b => {
+            b.style.borderColor = '';
+            b.style.background = '';
+        });
+        btn.style.borderColor = 'var(--accent)';
+    },
+
+    async submitQuiz() {
+        const answers = Object.entries(this.quiz.answers).map(([id, choice]) => ({ id: Number(id), choice }));
+        const result = document.getElementById('quiz-result');
+        if (!answers.length) {
+            result.textContent = 'Pick an answer first.';
+            return;
         }
+        document.getElementById('quiz-submit').disabled = true;
+        try {
+            // Graded in one call; XP is awarded server-side for first-time correct answers
+            const res = await fetch('/api/academy/submit', {
+                method: 'POST',
+                headers: this.headers({ 'Content-Type': 'application/json' }),
+                body: JSON.stringify({
+                    track: this.quiz.track,
+                    answers,
+                    name: auth.user ? auth.user.displayName || '' : ''
+                })
+            });
+            const data = await res.json();
+            if (!res.ok) throw new Error(data.error);
+            data.results.filter(r => r.status === 'graded').forEach(r => this.showAnswer(r));
+            result.innerHTML = `<strong>${data.score} / ${data.graded} correct</strong>` +
+                (data.xp_awarded ? ` <span class="text-accent">+${data.xp_awarded} XP</span>` : '') +
+                (auth.user ? '' : ' <span class="text-muted">(log in to earn XP)</span>');
+        } catch (e) {
+            console.error("Quiz Submit Error:", e);
+            result.textContent = 'Could not submit your answers. Try again.';
+            document.getElementById('quiz-submit').disabled = false;
+        }
+    },
+
+    showAnswer(r) {
+        const buttons = document.querySelectorAll(`#quiz-q-${r.id} button`);
+        buttons.forEach(b => {
+            const choice = Number(b.dataset.choice);
+            if (choice === r.answer) {
+                b.style.borderColor = 'var(--primary)';
+                b.style.background = 'rgba(0, 200, 83, 0.2)';
+            } else if (choice === this.quiz.answers[r.id]) {
+                b.style.borderColor = '#EF4444';
+                b.style.background = 'rgba(239, 68, 68, 0.2)';
+            }
+            b.disabled = true;
+        });
+    }
+};
+
+// Render the tracks when the screen is shown; this file can load after the first visit (see router.loadChunk)
+const academyGoToScreen = router.goToScreen;
+router.goToScreen = function (screenId) {
+    academyGoToScreen.call(router, screenId);
+    if (screenId === 'academyScreen') {
+        academy.init();
     }
 };
+if (!document.getElementById('academyScreen').classList.contains('hidden')) {
+    academy.init();
+}
@@ -199,14 +199,25 @@ function switchArenaTab(mode) {
     event.target.classList.add('active');
 }
 
-function loadLeaderboardData() {
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+async function loadLeaderboardData() {
     console.log('Loading leaderboard...');
     const tbody = document.getElementById('leaderboard-body');
-    tbody.innerHTML = `
-        <tr><td>1</td><td>AlphaWolf</td><td>15000</td><td>99</td><td>New York</td></tr>
-        <tr><td>2</td><td>BetaBear</td><td>14200</td><td>95</td><td>London</td></tr>
-        <tr><td>3</td><td>GammaGoat</td><td>13800</td><td>92</td><td>Mumbai</td></tr>
-    `;
+    try {
+        const res = await fetch('/api/leaderboard/top?k=10');
+        const data = await res.json();
+        tbody.innerHTML = data.entries.map(e => `
+        <tr><td>${e.rank}</td><td>${escapeHtml(e.name || 'Anonymous')}</td><td>${e.xp}</td><td>-</td><td>-</td></tr>
+        `).join('');
+    } catch (e) {
+        console.error('Leaderboard error:', e);
+        tbody.innerHTML = '<tr><td colspan="5">Leaderboard is unavailable right now.</td></tr>';
+    }
 }
 
 function toggleColorTheme() {
@@ -1,55 +1,110 @@
 const arena = {
     currentRoom: null,
+    socket: null,
+    players: {},
+    version: 0,
 
-    async createRoom() {
+    // The room hub runs in the FastAPI backend; override with window.ARENA_WS_URL.
+    wsUrl() {
+        return window.ARENA_WS_URL || 'ws://127.0.0.1:5000';
+    },
+
+    createRoom() {
         if (!auth.user) return utils.showToast('Login required', 'error');
 
         const roomCode = Math.random().toString(36).substring(2, 8).toUpperCase();
-        const roomRef = db.collection('rooms').doc(roomCode);
-
-        await roomRef.set({
-            host: auth.user.uid,
-            players: [{ uid: auth.user.uid, name: auth.user.displayName || 'Host', score: 0 }],
-            status: 'waiting',
-            created_at: new Date().toISOString()
-        });
-
-        this.joinRoomLogic(roomCode);
+        this.joinRoomLogic(roomCode, true);
     },
 
-    async joinRoom() {
-        const code = document.getElementById('room-code').value.toUpperCase();
+    joinRoom() {
+        if (!auth.user) return utils.showToast('Login required', 'error');
+
+        const code = document.getElementById('room-code').value.trim().toUpperCase();
         if (!code) return;
 
-        const roomRef = db.collection('rooms').doc(code);
-        const doc = await roomRef.get();
+        this.joinRoomLogic(code, false);
+    },
 
-        if (doc.exists) {
-            // Add player
-            const roomData = doc.data();
-            const newPlayer = { uid: auth.user.uid, name: auth.user.displayName || 'Player', score: 0 };
+    joinRoomLogic(code, create) {
+        if (this.socket) this.socket.close();
 
-            // Avoid duplicates
-            if (!roomData.players.find(p => p.uid === auth.user.uid)) {
-                roomData.players.push(newPlayer);
-                await roomRef.update({ players: roomData.players });
-            }
+        const params = new URLSearchParams({
+            uid: auth.user.uid,
+            name: auth.user.displayName || (create ? 'Host' : 'Player')
+        });
+        if (create) params.set('create', '1');
 
-            this.joinRoomLogic(code);
-        } else {
-            utils.showToast('Room not found', 'error');
+        const socket = new WebSocket(`${this.wsUrl()}/ws/arena/${code}?${params}`);
+        this.socket = socket;
+        socket.onmessage = (event) => this.handleMessage(JSON.parse(event.data));
+        socket.onclose = (event) => {
+            if (this.socket === socket) this.socket = null;
+            if (event.code === 4008) utils.showToast('Disconnected from the room (connection too slow).', 'error');
+        };
+        socket.onopen = () => {
+            this.currentRoom = code;
+            document.getElementById('arena-lobby').classList.remove('hidden');
+        };
+    },
+
+    handleMessage(msg) {
+        // Diffs carry a version; if one was missed, ask for the full state again.
+        if (msg.v !== undefined && msg.t !== 'state' && msg.v > this.version + 1) {
+            this.send({ t: 'state' });
         }
+        switch (msg.t) {
+            case 'state':
+                this.players = {};
+                msg.players.forEach(([uid, name, score, online]) => {
+                    this.players[uid] = { name, score, online };
+                });
+                break;
+            case 'join':
+                this.players[msg.p[0]] = { name: msg.p[1], score: msg.p[2], online: true };
+                break;
+            case 'leave':
+                if (this.players[msg.u]) this.players[msg.u].online = false;
+                break;
+            case 'gone':
+                msg.u.forEach(uid => delete this.players[uid]);
+                break;
+            case 'score':
+                Object.entries(msg.s).forEach(([uid, score]) => {
+                    if (this.players[uid]) this.players[uid].score = score;
+                });
+                break;
+            case 'error':
+                if (msg.code === 'room_not_found') utils.showToast('Room not found', 'error');
+                else if (msg.code === 'room_full') utils.showToast('Room is full', 'error');
+                else console.warn('Arena error:', msg.code);
+                return;
+            default:
+                return;
+        }
+        this.version = msg.t === 'state' ? msg.v : Math.max(this.version, msg.v);
+        this.renderPlayers();
+    },
+
+    // Scores are applied on the server; the new total arrives with the next diff.
+    addScore(delta) {
+        this.send({ t: 'score', d: delta });
     },
 
-    joinRoomLogic(code) {
-        this.currentRoom = code;
-        document.getElementById('arena-lobby').classList.remove('hidden');
+    send(msg) {
+        if (this.socket && this.socket.readyState === WebSocket.OPEN) {
+            this.socket.send(JSON.stringify(msg));
+        }
+    },
 
-        // Real-time listener
-        db.collection('rooms').doc(code).onSnapshot(doc => {
-            const data = doc.data();
-            const list = document.getElementById('player-list');
-            list.innerHTML = data.players.map(p => `<li>${p.name} - ${p.score} pts</li>`).join('');
-        });
+    renderPlayers() {
+        const list = document.getElementById('player-list');
+        list.innerHTML = Object.values(this.players)
+            .sort((a, b) => b.score - a.score)
+            .map(p => {
+                const li = document.createElement('li');
+                li.textContent = `${p.name} - ${p.score} pts${p.online ? '' : ' (away)'}`;
+                return li.outerHTML;
+            })
+            .join('');
     }
 };
@@ -8,20 +8,72 @@ const coach = {
         this.appendMessage(msg, 'user-msg');
         input.value = '';
 
-        // API Call
+        // API Call (streamed, so the bubble fills in as tokens arrive)
+        const bubble = this.appendMessage('', 'coach-msg');
+        const sentAt = performance.now();
         try {
-            const res = await fetch('/api/coach/chat', {
+            const res = await fetch('/api/coach/chat/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ message: msg, mode: 'quick' })
             });
-            const data = await res.json();
-            this.appendMessage(data.response, 'coach-msg');
+            if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+            let text = '';
+            let firstTokenAt = null;
+            await this.readEvents(res, (event, data) => {
+                if (event === 'message') {
+                    if (firstTokenAt === null) firstTokenAt = performance.now();
+                    text += data.delta;
+                    this.updateMessage(bubble, text);
+                } else if (event === 'done') {
+                    console.info('[coach] time to first token', {
+                        client_ms: firstTokenAt === null ? null : Math.round(firstTokenAt - sentAt),
+                        server_ms: data.ttft_ms,
+                        total_ms: data.total_ms
+                    });
+                } else if (event === 'error') {
+                    this.updateMessage(bubble, text || data.detail);
+                }
+            });
         } catch (e) {
-            this.appendMessage("Sorry, I'm having trouble connecting.", 'coach-msg');
+            this.updateMessage(bubble, "Sorry, I'm having trouble connecting.");
         }
     },
 
+    // Minimal Server-Sent Events reader for a fetch() response body.
+    async readEvents(res, onEvent) {
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    },
+
+    updateMessage(div, text) {
+        const history = document.getElementById('chat-history');
+        div.textContent = text;
+        history.scrollTop = history.scrollHeight;
+    },
+
     appendMessage(text, className) {
         const history = document.getElementById('chat-history');
         const div = document.createElement('div');
@@ -44,5 +96,6 @@ const coach = {
 
         history.appendChild(div);
         history.scrollTop = history.scrollHeight;
+        return div;
     }
 };
@@ -42,34 +42,55 @@ const dashboard = {
         `;
     },
 
-    renderSnapshot(data) {
-        // Mock Snapshot Visualization
+    async renderSnapshot(data) {
         const chart = document.getElementById('snapshot-chart');
-        chart.innerHTML = `
-            <div style="margin-top: 1rem;">
-                <div style="display:flex; justify-content:space-between; margin-bottom:0.5rem;">
-                    <span>Needs</span>
-                    <span>50%</span>
-                </div>
-                <div style="height:8px; background:rgba(255,255,255,0.1); border-radius:4px; overflow:hidden;">
-                    <div style="width:50%; height:100%; background:#3B82F6;"></div>
-                </div>
-                
-                <div style="display:flex; justify-content:space-between; margin-bottom:0.5rem; margin-top:1rem;">
-                    <span>Wants</span>
-                    <span>30%</span>
-                </div>
-                <div style="height:8px; background:rgba(255,255,255,0.1); border-radius:4px; overflow:hidden;">
-                    <div style="width:30%; height:100%; background:#F59E0B;"></div>
-                </div>
+        let snapshot;
+        try {
+            const res = await fetch('/api/spending/snapshot', {
+                headers: { 'X-User-ID': auth.user.uid }
+            });
+            if (!res.ok) throw new Error(`HTTP ${res.status}`);
+            snapshot = await res.json();
+        } catch (e) {
+            console.error("Snapshot Error:", e);
+            chart.innerHTML = '<p class="text-muted">Spending data is unavailable right now.</p>';
+            return;
+        }
 
-                <div style="display:flex; justify-content:space-between; margin-bottom:0.5rem; margin-top:1rem;">
-                    <span>Savings</span>
-                    <span>20%</span>
+        const month = snapshot.window;
+        if (!month.total) {
+            chart.innerHTML = `
+                <p class="text-muted" style="margin-top: 1rem;">No expenses logged this month yet.</p>
+                <a href="/log_expense?user_id=${encodeURIComponent(auth.user.uid)}" class="btn btn-outline">Log an expense</a>
+            `;
+            return;
+        }
+
+        const buckets = [
+            { key: 'needs', label: 'Needs', color: '#3B82F6' },
+            { key: 'wants', label: 'Wants', color: '#F59E0B' },
+            { key: 'savings', label: 'Savings', color: '#10B981' }
+        ];
+        const bars = buckets.map(({ key, label, color }, i) => {
+            const pct = Math.round(month.ratios[key] * 100);
+            const target = Math.round(snapshot.target_ratios[key] * 100);
+            return `
+                <div style="display:flex; justify-content:space-between; margin-bottom:0.5rem;${i ? ' margin-top:1rem;' : ''}">
+                    <span>${label}</span>
+                    <span>${pct}% <span class="text-muted">/ ${target}%</span></span>
                 </div>
                 <div style="height:8px; background:rgba(255,255,255,0.1); border-radius:4px; overflow:hidden;">
-                    <div style="width:20%; height:100%; background:#10B981;"></div>
-                </div>
+                    <div style="width:${pct}%; height:100%; background:${color};"></div>
+                </div>`;
+        }).join('');
+
+        const week = snapshot.rollups.weekly[snapshot.rollups.weekly.length - 1];
+        chart.innerHTML = `
+            <div style="margin-top: 1rem;">
+                ${bars}
+                <p class="text-muted" style="margin-top:1rem;">
+                    This month: ₹${month.total.toLocaleString('en-IN')} • This week: ₹${week.total.toLocaleString('en-IN')}
+                </p>
             </div>
         `;
     }
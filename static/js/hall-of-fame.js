@@ -1,3 +1,47 @@
 const hallOfFame = {
-    // Leaderboard logic
+    // Leaderboard logic (ranks are kept server-side, see /api/leaderboard/*)
+    escape(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    },
+
+    async load() {
+        const tbody = document.getElementById('leaderboard-body');
+        const headers = auth.user ? { 'X-User-ID': auth.user.uid } : {};
+        try {
+            const [top, around] = await Promise.all([
+                fetch('/api/leaderboard/top?k=10').then(res => res.json()),
+                auth.user ? fetch('/api/leaderboard/around?radius=2', { headers }).then(res => res.json()) : { entries: [] }
+            ]);
+
+            // Show the top 10, then the current user's neighbourhood if they're further down.
+            const shown = new Set(top.entries.map(e => e.user_id));
+            const rows = [...top.entries, ...around.entries.filter(e => !shown.has(e.user_id))];
+            if (!rows.length) {
+                tbody.innerHTML = '<tr><td class="p-2" colspan="4">No XP earned yet. Be the first!</td></tr>';
+                return;
+            }
+            tbody.innerHTML = rows.map(e => `
+                <tr style="border-bottom: 1px solid var(--border);${auth.user && e.user_id === auth.user.uid ? ' font-weight:600;' : ''}">
+                    <td class="p-2">#${e.rank}</td>
+                    <td class="p-2">${this.escape(e.name || 'Anonymous')}</td>
+                    <td class="p-2 text-accent">${e.xp.toLocaleString('en-IN')}</td>
+                    <td class="p-2">-</td>
+                </tr>
+            `).join('');
+        } catch (e) {
+            console.error("Leaderboard Error:", e);
+            tbody.innerHTML = '<tr><td class="p-2" colspan="4">Leaderboard is unavailable right now.</td></tr>';
+        }
+    }
+};
+
+// Hook into router to refresh the leaderboard when the screen is shown
+const hallOfFameGoToScreen = router.goToScreen;
+router.goToScreen = function (screenId) {
+    hallOfFameGoToScreen.call(router, screenId);
+    if (screenId === 'hallOfFameScreen') {
+        hallOfFame.load();
+    }
 };
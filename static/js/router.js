@@ -4,6 +4,28 @@ const router = {
         'arenaScreen', 'coachScreen', 'profileScreen', 'hallOfFameScreen', 'settingsScreen'
     ],
 
+    // Screen modules loaded on first visit (set by the page from the asset build; empty when unbundled)
+    chunks: window.ROUTE_CHUNKS || {},
+    loading: {},
+
+    loadChunk(screenId) {
+        const src = this.chunks[screenId];
+        if (!src) return Promise.resolve();
+        if (!this.loading[src]) {
+            this.loading[src] = new Promise((resolve, reject) => {
+                const script = document.createElement('script');
+                script.src = src;
+                script.onload = resolve;
+                script.onerror = () => {
+                    delete this.loading[src];
+                    reject(new Error(`Could not load ${src}`));
+                };
+                document.head.appendChild(script);
+            });
+        }
+        return this.loading[src];
+    },
+
     init() {
         window.onpopstate = (event) => {
             if (event.state && event.state.screen) {
@@ -27,6 +49,8 @@ const router = {
     },
 
     showScreen(screenId, pushState = true) {
+        this.loadChunk(screenId).catch(err => console.error(err));
+
         // Hide all screens
         this.screens.forEach(id => {
             const el = document.getElementById(id);
@@ -3,6 +3,9 @@ from datetime import datetime
 from google import genai
 from google.genai import types
 
+from backend.context_cache import ContextCache, expiry_of, is_missing_cache_error
+from backend.history import ConversationHistory, build_summary_prompt, estimate_tokens, fallback_summary
+
 # ==============================================================================
 # 1. COMPREHENSIVE SYSTEM INSTRUCTION (Core of the Chatbot Logic)
 #
@@ -50,47 +53,125 @@ GENERATION_CONFIG = types.GenerateContentConfig(
     # is the primary way to enforce professional guardrails.
 )
 
+# The persona is registered once as a cached context and referenced by handle
+# on every turn; if Gemini won't cache it, GENERATION_CONFIG sends it inline.
+# Gemini refuses prefixes below the model's minimum (1024 tokens for
+# gemini-2.5-flash), so a shorter persona isn't offered for caching at all.
+PERSONA_CACHE_TTL_SECONDS = 3600
+PERSONA_CACHE_MIN_TOKENS = 1024
+PERSONA_CACHE = ContextCache(ttl_seconds=PERSONA_CACHE_TTL_SECONDS)
+
+
+def generation_config(cached_content=None):
+    if not cached_content:
+        return GENERATION_CONFIG
+    return GENERATION_CONFIG.model_copy(update={"system_instruction": None, "cached_content": cached_content})
+
+
+def persona_handle(client, model_name: str):
+    if estimate_tokens(SYSTEM_INSTRUCTION) < PERSONA_CACHE_MIN_TOKENS:
+        return None
+
+    def register():
+        cached = client.caches.create(
+            model=model_name,
+            config=types.CreateCachedContentConfig(
+                system_instruction=SYSTEM_INSTRUCTION,
+                ttl=f"{PERSONA_CACHE_TTL_SECONDS}s",
+                display_name="finny-persona",
+            ),
+        )
+        return cached.name, expiry_of(cached, PERSONA_CACHE_TTL_SECONDS)
+
+    return PERSONA_CACHE.ensure(model_name, SYSTEM_INSTRUCTION, register)
+
 
 # ==============================================================================
 # 3. INITIALIZATION AND CONVERSATION MANAGEMENT
 # ==============================================================================
 
-def initialize_chat_client(model_name: str = "gemini-2.5-flash"):
-    """Initializes the Gemini client and starts a persistent chat session."""
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+def initialize_chat_client(model_name: str = DEFAULT_MODEL):
+    """Initializes the Gemini client and an empty, self-compacting conversation history."""
     try:
         # The client automatically picks up the GEMINI_API_KEY from the environment
         client = genai.Client()
 
-        # Create a persistent chat session with the customized configuration
-        chat_session = client.chats.create(
-            model=model_name,
-            config=GENERATION_CONFIG,
-        )
+        # The history keeps the last few turns verbatim and folds older ones
+        # into a rolling summary, so each turn's prompt stays roughly the same size
+        history = ConversationHistory(keep_turns=6, token_budget=3000, summary_max_tokens=400)
 
         print("=" * 60)
         print("✅ Finny Financial Education Chatbot Initialized for Hackathon")
         print(f"Model: {model_name} | Persona: Finny (Indian Context)")
         print("=" * 60)
 
-        return chat_session
+        return client, history
 
     except Exception as e:
         print(f"❌ Error initializing chatbot: {e}")
         print("Please ensure your GEMINI_API_KEY is correctly set.")
-        return None
+        return None, None
+
+
+def compact_history(client, history: ConversationHistory, model_name: str = DEFAULT_MODEL):
+    """Summarizes older turns once the history exceeds its token budget."""
+    if not history.needs_compaction():
+        return
+    folded = history.take_foldable()
+    try:
+        response = client.models.generate_content(
+            model=model_name,
+            contents=build_summary_prompt(history.summary, folded),
+            config=types.GenerateContentConfig(
+                temperature=0.2,
+                max_output_tokens=history.summary_max_tokens,
+                system_instruction=history.summary_instruction(),
+            ),
+        )
+        summary = response.text or fallback_summary(history.summary, folded, history.summary_max_tokens * 4)
+    except Exception:
+        summary = fallback_summary(history.summary, folded, history.summary_max_tokens * 4)
+    history.fold(folded, summary)
+
+
+def send_message(client, history: ConversationHistory, message: str, model_name: str = DEFAULT_MODEL) -> str:
+    """Sends one turn (summary + recent turns + message) and records the exchange."""
+    handle = persona_handle(client, model_name)
+    try:
+        response = client.models.generate_content(
+            model=model_name,
+            contents=history.contents(message),
+            config=generation_config(handle),
+        )
+    except Exception as e:
+        if handle is None or not is_missing_cache_error(e):
+            raise
+        PERSONA_CACHE.invalidate(handle)
+        response = client.models.generate_content(
+            model=model_name,
+            contents=history.contents(message),
+            config=GENERATION_CONFIG,
+        )
+    history.add_exchange(message, response.text or "")
+    compact_history(client, history, model_name)
+    return response.text
 
 
 def main():
     """Main function to run the interactive console chat."""
 
-    chat = initialize_chat_client()
-    if not chat:
+    client, history = initialize_chat_client()
+    if not client:
         return
 
     # Start the conversation with the mandated opening greeting
-    first_response = chat.send_message(
+    first_response = send_message(
+        client, history,
         "Start the conversation with the Opening Greeting, then ask what topic they want to learn about.")
-    print(f"\nFinny: {first_response.text}")
+    print(f"\nFinny: {first_response}")
 
     print("\nType 'exit' or 'quit' to end the session.\n")
 
@@ -106,9 +187,9 @@ def main():
             if not user_input:
                 continue
 
-            # Send the user message to the persistent chat session
-            response = chat.send_message(user_input)
-            print(f"\nFinny: {response.text}")
+            # Send the user message along with the (compacted) conversation history
+            response = send_message(client, history, user_input)
+            print(f"\nFinny: {response}")
 
         except Exception as e:
             print(f"\nFinny: I encountered an error. Please try rephrasing your question. Error: {str(e)}")
@@ -0,0 +1,54 @@
+# tests/test_calculator.py
+import pytest
+
+from backend.calculator import answer_question, calculate
+
+GOAL_QUESTIONS = [
+    "How much should I invest monthly for 10 years to reach 1 crore?",
+    "How much do I need to save per month for 5 years to buy a 10 lakh car?",
+    "I earn 40000 per month. How much should I save for 3 years?",
+    "How much to invest per month for 15 years to get 50 lakh?",
+    "My salary is 60000 a month, how much will I have after 10 years?",
+    "Can I afford a 20 lakh loan EMI at 9% for 5 years on 30k income?",
+]
+
+# Discounting, not growth: the calculator must not answer these.
+INFLATION_QUESTIONS = [
+    "What will ₹1 lakh be worth in 10 years with 6% inflation?",
+    "How much will ₹1 crore be worth in 20 years after inflation?",
+    "What will 50000 be worth in today's money after 15 years?",
+    "How much will 10 lakh grow to in real terms in 10 years?",
+]
+
+PROJECTION_QUESTIONS = [
+    ("how much will ₹5000/month become in 20 years?", "SIP of ₹5,000/month for 20 years"),
+    ("What will 2 lakh grow to in 10 years at 8%?", "₹2,00,000 invested once for 10 years"),
+    ("What is the EMI for a 10 lakh loan at 9% for 5 years?", "EMI for a ₹10,00,000 loan at 9% for 5 years"),
+    ("I am 25, how much pension from NPS with 5k per month?", "NPS: ₹5,000/month from age 25 to 60"),
+]
+
+
+@pytest.mark.parametrize("question", GOAL_QUESTIONS)
+def test_goal_questions_go_to_the_model(question):
+    assert answer_question(question) is None
+
+
+@pytest.mark.parametrize("question", INFLATION_QUESTIONS)
+def test_inflation_questions_go_to_the_model(question):
+    assert answer_question(question) is None
+
+
+@pytest.mark.parametrize("question, heading", PROJECTION_QUESTIONS)
+def test_forward_projections_are_answered(question, heading):
+    answer = answer_question(question)
+    assert answer is not None
+    assert heading in answer
+
+
+def test_sip_matches_monthly_simulation():
+    (result,) = calculate("sip", [{"monthly": 5000, "annual_rate": 12, "years": 20}])
+    value = 0.0
+    for _ in range(240):
+        value = (value + 5000) * 1.01
+    assert result["value"] == pytest.approx(value, rel=1e-6)
+    assert result["invested"] == 5000 * 240